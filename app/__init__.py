@@ -1,6 +1,6 @@
 from flask import Flask
 from dotenv import load_dotenv
-from .database import init_db
+from .database import init_db, remove_sessions
 from flask_cors import CORS
 
 
@@ -17,8 +17,24 @@ def create_app():
     # DB initialization
     init_db()
 
+    # One DB session per request, handed back to the pool when the request ends
+    app.teardown_appcontext(remove_sessions)
+
+    # Request timing + SQL counts for /metrics
+    from .utils.metrics import init_metrics
+    init_metrics(app)
+
+    # Opt-in per-request profiles (X-Profile header for admins, or PROFILE_SAMPLE_PERCENT)
+    from .utils.profiling import init_profiling
+    init_profiling(app)
+
     # Register routes
     from .routes import main
     app.register_blueprint(main)
 
+    # The agent graphs load on the first chatbot request; AGENT_WARMUP=1 starts on it now, in the background
+    from .agents.loader import AGENT_WARMUP, start_warmup
+    if AGENT_WARMUP:
+        start_warmup()
+
     return app
@@ -0,0 +1,193 @@
+"""
+Chat sessions: a conversation is one session id, not a user's whole chat history.
+
+The chatbot endpoints issue a session id with the first message and return it
+as `session_id`. The client sends it back to continue the conversation, or
+sends `new_session: true` to start over. A session that has been idle for
+CHAT_SESSION_IDLE_TIMEOUT seconds is expired, and the next message gets a new id.
+
+Each live session keeps its last CHAT_WINDOW_MESSAGES messages (user and bot)
+in process, next to its rolling summary. Messages that drop off the window are
+folded into the summary in batches, in the background after the reply has
+been sent (app/agents/tools/memory.py). Prompts get the summary plus as much
+of the window as fits in CHAT_TOKEN_BUDGET, never the whole table.
+
+ChatMessage / ChatSummary stay the source of truth. A session this process
+doesn't hold (restart, another worker, LRU eviction) is reloaded from them;
+messages still waiting in the write-behind queue aren't in the tables yet.
+"""
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+
+from app.database import unit_of_work
+from app.models import ChatMessage, ChatSummary
+
+CHAT_SESSION_IDLE_TIMEOUT = int(os.getenv("CHAT_SESSION_IDLE_TIMEOUT", "1800"))   # seconds
+CHAT_WINDOW_MESSAGES = int(os.getenv("CHAT_WINDOW_MESSAGES", "12"))              # 6 user/bot turns
+CHAT_TOKEN_BUDGET = int(os.getenv("CHAT_TOKEN_BUDGET", "1200"))                  # summary + window, ≈ chars / 4
+CHAT_SUMMARY_BATCH = int(os.getenv("CHAT_SUMMARY_BATCH", "4"))                   # evicted messages per summary refresh
+CHAT_MAX_SESSIONS = int(os.getenv("CHAT_MAX_SESSIONS", "2000"))                  # live sessions kept in process
+
+
+def estimate_tokens(text):
+    return len(text) // 4 + 1
+
+
+class ChatSession:
+    def __init__(self, session_id, user_id, summary="", summary_mark=0):
+        self.id = session_id
+        self.user_id = str(user_id)  # Cookie sessions and the DB don't agree on int vs str
+        self.last_active = time.monotonic()
+        self.window = deque()   # [ChatMessage.id, sender, message], oldest first; id is None until written
+        self.evicted = []       # Dropped off the window, not folded into the summary yet
+        self.summary = summary
+        self.summary_mark = summary_mark  # Last ChatMessage.id folded into the summary
+        self.folding = False    # A summary refresh is running for this session
+
+
+class ChatSessionStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()  # id -> ChatSession, least recently used first
+
+    def _expired(self, chat, now):
+        return now - chat.last_active > CHAT_SESSION_IDLE_TIMEOUT
+
+    def _remember(self, chat):
+        with self._lock:
+            self._sessions[chat.id] = chat
+            self._sessions.move_to_end(chat.id)
+            # Drop expired sessions from the cold end, then enforce the size cap
+            now = time.monotonic()
+            while self._sessions:
+                oldest = next(iter(self._sessions.values()))
+                if not self._expired(oldest, now) and len(self._sessions) <= CHAT_MAX_SESSIONS:
+                    break
+                self._sessions.popitem(last=False)
+        return chat
+
+    def resolve(self, user_id, requested_id=None, new=False):
+        """Id of the live session `requested_id` if it is the user's, else of a brand new session."""
+        if requested_id and not new:
+            requested_id = str(requested_id)
+            now = time.monotonic()
+            with self._lock:
+                chat = self._sessions.get(requested_id)
+                if chat and chat.user_id == str(user_id) and not self._expired(chat, now):
+                    chat.last_active = now
+                    self._sessions.move_to_end(requested_id)
+                    return requested_id
+            if not chat:
+                chat = _load_session(requested_id, user_id)
+                if chat:
+                    return self._remember(chat).id
+
+        return self._remember(ChatSession(uuid.uuid4().hex, user_id)).id
+
+    def get(self, session_id, user_id):
+        with self._lock:
+            chat = self._sessions.get(session_id)
+        if chat is None:
+            # Evicted from this process while the graph ran; rebuild it from the tables
+            chat = self._remember(_load_session(session_id, user_id) or ChatSession(session_id, user_id))
+        return chat
+
+    def append(self, session_id, user_id, message_id, sender, message):
+        """Add a message to the window; returns its entry so the writer can fill in the id later."""
+        chat = self.get(session_id, user_id)
+        entry = [message_id, sender, message]
+        with self._lock:
+            chat.window.append(entry)
+            chat.last_active = time.monotonic()
+            while len(chat.window) > CHAT_WINDOW_MESSAGES:
+                chat.evicted.append(chat.window.popleft())
+            del chat.evicted[:-2 * CHAT_WINDOW_MESSAGES]  # If summaries keep failing, forget the oldest
+        return entry
+
+    def claim_fold(self, session_id, user_id):
+        """(summary, written evicted messages) once a batch is ready and no refresh is running, else None."""
+        with self._lock:
+            chat = self._sessions.get(session_id)
+            if chat is None or chat.folding:
+                return None
+            ready = [tuple(m) for m in chat.evicted if m[0] is not None]
+            if len(ready) < CHAT_SUMMARY_BATCH:
+                return None
+            chat.folding = True
+            return chat.summary, ready
+
+    def folded(self, session_id, user_id, summary=None, mark=None):
+        """End a claimed refresh; with a summary, it replaces the old one up to `mark`."""
+        chat = self.get(session_id, user_id)
+        with self._lock:
+            chat.folding = False
+            if summary is None:
+                return
+            chat.summary = summary
+            chat.summary_mark = max(chat.summary_mark, mark)
+            chat.evicted = [m for m in chat.evicted if m[0] is None or m[0] > mark]
+
+    def context(self, session_id, user_id, budget=CHAT_TOKEN_BUDGET):
+        """Summary + the newest window messages that fit in `budget` tokens, as prompt text."""
+        chat = self.get(session_id, user_id)
+        with self._lock:
+            summary = chat.summary
+            window = list(chat.window)
+
+        budget -= estimate_tokens(summary) if summary else 0
+        lines = []
+        for _, sender, message in reversed(window):
+            line = f"{sender.capitalize()}: {message}"
+            budget -= estimate_tokens(line)
+            if budget < 0:
+                break
+            lines.append(line)
+        lines.reverse()
+
+        if not summary and not lines:
+            return "No previous messages."
+        parts = []
+        if summary:
+            parts.append(f"Earlier in this chat:\n{summary}")
+        if lines:
+            parts.append("Recent messages (most recent last):\n" + "\n".join(lines))
+        return "\n\n".join(parts)
+
+
+def _load_session(session_id, user_id):
+    """Rebuild a session from ChatMessage / ChatSummary; None if it isn't the user's or has expired."""
+    with unit_of_work(read_only=True) as db:
+        latest = db.query(ChatMessage.user_id, ChatMessage.timestamp)\
+            .filter(ChatMessage.session_id == session_id)\
+            .order_by(ChatMessage.id.desc())\
+            .first()
+        if not latest or str(latest.user_id) != str(user_id):
+            return None
+        if latest.timestamp and datetime.utcnow() - latest.timestamp > timedelta(seconds=CHAT_SESSION_IDLE_TIMEOUT):
+            return None
+
+        summary_row = db.query(ChatSummary).filter_by(session_id=session_id).first()
+        chat = ChatSession(
+            session_id,
+            user_id,
+            summary=summary_row.summary if summary_row else "",
+            summary_mark=summary_row.last_message_id if summary_row else 0
+        )
+
+        # Unfolded messages: the newest fill the window, the rest wait to be folded
+        rows = db.query(ChatMessage.id, ChatMessage.sender, ChatMessage.message)\
+            .filter(ChatMessage.session_id == session_id, ChatMessage.id > chat.summary_mark)\
+            .order_by(ChatMessage.id.desc())\
+            .limit(3 * CHAT_WINDOW_MESSAGES)\
+            .all()
+        messages = [list(row) for row in reversed(rows)]
+        chat.window.extend(messages[-CHAT_WINDOW_MESSAGES:])
+        chat.evicted = messages[:-CHAT_WINDOW_MESSAGES]
+        return chat
+
+
+chat_sessions = ChatSessionStore()
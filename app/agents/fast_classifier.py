@@ -0,0 +1,144 @@
+import math
+import os
+import re
+from collections import Counter, defaultdict
+
+# Tools each role may use (shared with classify_query)
+ROLE_TOOL_MAP = {
+    "admin": ["create_user", "other"],
+    "manager": ["assign_task", "retrieve_updates", "other"],
+    "employee": ["submit_update", "other"]
+}
+
+# Below this confidence classify_query falls back to the LLM
+FAST_PATH_THRESHOLD = float(os.getenv("INTENT_FAST_PATH_THRESHOLD", "0.85"))
+
+# Tools that change data: only the anchored RULES below may pick them, and only
+# for plain commands - never for questions, negations or delete / edit / cancel requests
+WRITE_TOOLS = {"create_user", "assign_task", "submit_update"}
+_QUESTION_RE = re.compile(
+    r"\?\s*$|^(what|did|do|does|how|when|who|which|why|where|can|could|should|would|is|are|was|were|have|has)\b",
+    re.IGNORECASE
+)
+_RETRACT_RE = re.compile(
+    r"\b(delete|remove|cancel|undo|revoke|edit|change|modify|don'?t|do not|never|not)\b",
+    re.IGNORECASE
+)
+
+# --- Rules: high-precision patterns for the obvious cases ---
+# Write-tool rules are anchored to imperative phrasing ("assign ...", "please add ...")
+RULES = {
+    "other": [
+        r"^(hi|hello|hey|hiya|yo|good (morning|afternoon|evening)|thanks|thank you|ok|okay)[\s!.,]*(rise ?pal)?[\s!.]*$",
+        r"\bhow (do i|to|can i) use rise ?pal\b",
+        r"^(help|what can you do)\??$",
+    ],
+    "create_user": [
+        r"^(please )?(add|create|register|onboard)\b.*\b(user|employee|manager|admin|intern|member)\b",
+    ],
+    "assign_task": [
+        r"^(please )?assign\b.*\bto\b",
+        r"^(please )?(give|create|new)\b.*\btask\b.*\b(for|to)\b",
+    ],
+    "retrieve_updates": [
+        r"\b(show|get|see|check|view|retrieve|what did)\b.*\b(update|updates|report|did)\b",
+    ],
+    "submit_update": [
+        r"^(please )?submit\b.*\b(my )?(daily )?update\b",
+        r"^(today|yesterday) i (worked|did|completed|finished|fixed|built|implemented)\b",
+    ],
+}
+RULE_CONFIDENCE = 0.95
+_COMPILED_RULES = {tool: [re.compile(p, re.IGNORECASE) for p in pats] for tool, pats in RULES.items()}
+
+# --- Training examples for the bag-of-words model (mirrors classify.tool_descriptions) ---
+TRAINING_EXAMPLES = {
+    "create_user": [
+        "add new intern", "register team member", "create a user",
+        "add employee jake james for hr team", "add manager john doe for software team",
+        "new user in marketing", "register a new employee",
+    ],
+    "assign_task": [
+        "give task", "assign work to ramesh", "new task for team",
+        "assign the report to sam by friday", "sam should finish the api by monday",
+        "task for taylor due tomorrow", "create a task for the backend",
+    ],
+    "retrieve_updates": [
+        "see today's update", "get what ramesh did", "check report",
+        "show sam's update for yesterday", "what did taylor work on today",
+        "daily update of sam wilson", "view updates",
+    ],
+    "submit_update": [
+        "today i worked on", "submit my update", "i finished the login page today",
+        "my update for today", "worked on bug fixes", "completed the dashboard",
+        "here is my daily update",
+    ],
+    "other": [
+        "hi", "hello", "hey there", "how to use rise pal", "thanks", "what can you do",
+        "who are you", "good morning",
+    ],
+}
+
+_TOKEN_RE = re.compile(r"[a-z']+")
+
+
+def tokenize(text: str) -> list:
+    return _TOKEN_RE.findall(text.lower())
+
+
+class NaiveBayesIntent:
+    def __init__(self, examples: dict):
+        self.word_counts = defaultdict(Counter)
+        self.doc_counts = Counter()
+        self.vocab = set()
+        for tool, phrases in examples.items():
+            for phrase in phrases:
+                tokens = tokenize(phrase)
+                self.word_counts[tool].update(tokens)
+                self.doc_counts[tool] += 1
+                self.vocab.update(tokens)
+        self.totals = {tool: sum(c.values()) for tool, c in self.word_counts.items()}
+
+    def predict(self, text: str, tools: list):
+        tokens = [t for t in tokenize(text) if t in self.vocab]
+        tools = [t for t in tools if t in self.doc_counts]
+        if not tokens or not tools:
+            return None, 0.0
+
+        total_docs = sum(self.doc_counts[t] for t in tools)
+        vocab_size = len(self.vocab)
+        scores = {}
+        for tool in tools:
+            score = math.log(self.doc_counts[tool] / total_docs)
+            for token in tokens:
+                score += math.log((self.word_counts[tool][token] + 1) / (self.totals[tool] + vocab_size))
+            scores[tool] = score
+
+        # Softmax over the allowed tools gives the confidence
+        best = max(scores, key=scores.get)
+        norm = sum(math.exp(s - scores[best]) for s in scores.values())
+        return best, 1.0 / norm
+
+
+_model = NaiveBayesIntent(TRAINING_EXAMPLES)
+
+
+def fast_classify(message: str, available_tools: list):
+    """Return (tool, confidence) without calling the LLM. tool is None when nothing matches."""
+    text = message.strip()
+    # "did I submit my update?" / "delete my update" must not submit one: those go to the LLM
+    writes_allowed = not _QUESTION_RE.search(text) and not _RETRACT_RE.search(text)
+
+    for tool in available_tools:
+        if tool in WRITE_TOOLS and not writes_allowed:
+            continue
+        for pattern in _COMPILED_RULES.get(tool, []):
+            if pattern.search(text):
+                return tool, RULE_CONFIDENCE
+
+    # The bag-of-words model can't tell "delete my update" from "my update", so it
+    # only answers for read-only tools; a write tool it picks is left to the LLM
+    tool, confidence = _model.predict(text, available_tools)
+    if tool in WRITE_TOOLS:
+        return None, 0.0
+    return tool, confidence
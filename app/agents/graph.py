@@ -1,56 +1,93 @@
 from langgraph.graph import StateGraph, END, START
 from app.agents.state import AgentState
+from app.utils.metrics import instrument_node  # Per-node latency / queries for /metrics
+from app.utils.profiling import profiled_node  # Profiles the node's thread when its request is profiled
+
+# Tools (sync + async variants)
+from app.agents.tools.classify import classify_query, aclassify_query
+from app.agents.tools.retrieve_update import retrieve_updates, aretrieve_updates
+from app.agents.tools.assign_task import assign_task, aassign_task
+from app.agents.tools.extract_info import extract_info, aextract_info
+from app.agents.tools.other import other_task, aother_task
+from app.agents.tools.add_user import create_user, acreate_user
+from app.agents.tools.employee_update import submit_update, asubmit_update
+from app.agents.tools.memory import handle_memory_node, ahandle_memory_node  # 🧠 new import
+from app.agents.tools.session_user import load_session_user, aload_session_user
 
-# Tools
-from app.agents.tools.classify import classify_query
-from app.agents.tools.retrieve_update import retrieve_updates
-from app.agents.tools.assign_task import assign_task
-from app.agents.tools.extract_info import extract_info
-from app.agents.tools.other import other_task
-from app.agents.tools.add_user import create_user
-from app.agents.tools.employee_update import submit_update
-from app.agents.tools.memory import handle_memory_node  # 🧠 new import
-
-# LangGraph setup
-graph = StateGraph(AgentState)
-
-# Add nodes
-graph.add_node("memory", handle_memory_node)  # 🧠 New memory node
-graph.add_node("extract_info", extract_info)
-graph.add_node("classify_query", classify_query)
-graph.add_node("retrieve_updates", retrieve_updates)
-graph.add_node("assign_task", assign_task)
-graph.add_node("other", other_task)
-graph.add_node("create_user", create_user)
-graph.add_node("submit_update", submit_update)
-
-# Start → memory → extract_info → classify_query
-graph.add_edge(START, "memory")                # 🧠 first
-graph.add_edge("memory", "extract_info")
-graph.add_edge("extract_info", "classify_query")
 
 # Classify → route to tools
 def router(state: AgentState):
     return state["query_type"]
 
-graph.add_conditional_edges(
-    "classify_query",
-    router,
-    {
-        "assign_task": "assign_task",
-        "retrieve_updates": "retrieve_updates",
-        "other": "other",
-        "create_user": "create_user",
-        "submit_update": "submit_update"
-    }
-)
-
-# Tool outputs → END
-graph.add_edge("assign_task", END)
-graph.add_edge("other", END)
-graph.add_edge("create_user", END)
-graph.add_edge("submit_update", END)
-graph.add_edge("retrieve_updates", END)
-
-# Compile
-chatbot_agent = graph.compile()
\ No newline at end of file
+
+def build_graph(nodes: dict):
+    # LangGraph setup
+    graph = StateGraph(AgentState)
+
+    # Add nodes (each timed and tagged with role / query_type, and profiled on request)
+    for name, node in nodes.items():
+        graph.add_node(name, instrument_node(name, profiled_node(node)))
+
+    graph.add_node("join", lambda state: {})      # waits for both branches
+
+    # Fan out from START:
+    #   branch 1: memory → classify_query        (classify needs the memory summary)
+    #   branch 2: session_user → extract_info    (identity loaded once, alongside memory)
+    # classify_query also waits for session_user (it needs the role).
+    # Each node returns only the keys it owns, so the parallel updates never collide.
+    graph.add_edge(START, "memory")                # 🧠 first
+    graph.add_edge(START, "session_user")
+    graph.add_edge("session_user", "extract_info")
+    graph.add_edge(["memory", "session_user"], "classify_query")
+    graph.add_edge(["classify_query", "extract_info"], "join")
+
+    # Join → route to tools
+    graph.add_conditional_edges(
+        "join",
+        router,
+        {
+            "assign_task": "assign_task",
+            "retrieve_updates": "retrieve_updates",
+            "other": "other",
+            "create_user": "create_user",
+            "submit_update": "submit_update"
+        }
+    )
+
+    # Tool outputs → END
+    graph.add_edge("assign_task", END)
+    graph.add_edge("other", END)
+    graph.add_edge("create_user", END)
+    graph.add_edge("submit_update", END)
+    graph.add_edge("retrieve_updates", END)
+
+    # Compile
+    return graph.compile()
+
+
+# Sync graph: chatbot_agent.invoke(...)
+chatbot_agent = build_graph({
+    "session_user": load_session_user,
+    "memory": handle_memory_node,  # 🧠 New memory node
+    "extract_info": extract_info,
+    "classify_query": classify_query,
+    "retrieve_updates": retrieve_updates,
+    "assign_task": assign_task,
+    "other": other_task,
+    "create_user": create_user,
+    "submit_update": submit_update,
+})
+
+# Async graph: await async_chatbot_agent.ainvoke(...) — LLM calls use llm.ainvoke,
+# DB work runs in worker threads so the event loop never blocks on SQLite.
+async_chatbot_agent = build_graph({
+    "session_user": aload_session_user,
+    "memory": ahandle_memory_node,
+    "extract_info": aextract_info,
+    "classify_query": aclassify_query,
+    "retrieve_updates": aretrieve_updates,
+    "assign_task": aassign_task,
+    "other": aother_task,
+    "create_user": acreate_user,
+    "submit_update": asubmit_update,
+})
@@ -0,0 +1,50 @@
+"""
+Lazy access to the compiled agent graphs.
+
+Importing app.agents.graph pulls in langgraph and langchain, builds the LLM
+client (app/utils/llm.py) and compiles both graphs - most of a worker's boot
+time. The routes go through get_agents() instead, so that cost is paid on the
+first chatbot request, not before the worker can answer /api/login.
+
+With AGENT_WARMUP=1, create_app() starts loading the graphs on a background
+thread right away: boot stays fast and the first chat usually finds them ready.
+"""
+import os
+import threading
+import time
+
+AGENT_WARMUP = os.getenv("AGENT_WARMUP", "0") == "1"
+
+_agents = None
+_lock = threading.Lock()
+
+
+def get_agents():
+    """(chatbot_agent, async_chatbot_agent), importing and compiling them on first use."""
+    global _agents
+    if _agents is None:
+        with _lock:
+            if _agents is None:
+                started = time.perf_counter()
+                from app.agents.graph import chatbot_agent, async_chatbot_agent
+                _agents = (chatbot_agent, async_chatbot_agent)
+                print(f"🧠 Agent graphs loaded in {time.perf_counter() - started:.2f}s")
+    return _agents
+
+
+def agents_loaded():
+    return _agents is not None
+
+
+def _warm_up():
+    try:
+        get_agents()
+    except Exception as e:
+        # The first chatbot request will try again and report the error
+        print(f"[AGENT WARMUP ERROR] {e}")
+
+
+def start_warmup():
+    thread = threading.Thread(target=_warm_up, name="agent-warmup", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,56 @@
+import os
+
+# Combined mode: classify_query asks for intent + every tool's fields in one
+# structured call, and the tool nodes read them from state["slots"] instead of
+# running their own extraction prompt. Set AGENT_COMBINED_EXTRACTION=0 to disable.
+COMBINED_EXTRACTION = os.getenv("AGENT_COMBINED_EXTRACTION", "1") != "0"
+
+# Fields each tool needs, with the instruction given to the model for each one.
+# Values the user did not mention come back as an empty string.
+SLOT_FIELDS = {
+    "create_user": {
+        "f_name": "First name, capitalized",
+        "l_name": "Last name, capitalized",
+        "role": "One of Admin, Manager, Employee",
+        "team": "Team name (e.g., HR, Software, Marketing)",
+    },
+    "assign_task": {
+        "assignee_name": "Full name of the person receiving the task, first letter of each name capitalized",
+        "title": "Short 2-6 word task title generated from the message",
+        "description": "Short description of the task (may be generated if there is enough context)",
+        "due_date": "Due date as YYYY-MM-DD; convert relative dates using today's date",
+    },
+    "retrieve_updates": {
+        "employee_name": "Employee's full name (First Last) with capitalized initials",
+        "date": "Requested date as YYYY-MM-DD; today's date if none is mentioned",
+    },
+    "submit_update": {
+        "title": "Short label for the work done (max 10 words)",
+        "summary": "Detailed description of the work completed",
+        "reference": "URL if mentioned",
+    },
+}
+
+
+def build_intent_schema(tools: list) -> dict:
+    """JSON schema for {"intent": <tool>, <tool>: {<field>: str, ...}, ...} over the allowed tools."""
+    properties = {"intent": {"type": "string", "enum": list(tools)}}
+    for tool in tools:
+        fields = SLOT_FIELDS.get(tool)
+        if not fields:
+            continue
+        properties[tool] = {
+            "type": "object",
+            "properties": {name: {"type": "string", "description": desc} for name, desc in fields.items()},
+            "required": list(fields),
+        }
+    return {"type": "object", "properties": properties, "required": ["intent"]}
+
+
+def get_slots(state: dict, tool: str):
+    """Pre-extracted fields for `tool`, or None when the node should extract them itself."""
+    slots = state.get("slots") or {}
+    fields = slots.get(tool)
+    if not isinstance(fields, dict):
+        return None
+    return {name: str(fields.get(name) or "").strip() for name in SLOT_FIELDS.get(tool, {})}
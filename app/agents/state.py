@@ -6,6 +6,12 @@ class AgentState(TypedDict):
     query_type: Optional[str]
     retrieved_data: Optional[str]
     session_user_id: Optional[str]  
+    session_user: Optional[dict]  # id/role/team/full_name/status, loaded once at graph entry
     target_employee: Optional[dict]  
     update_id : Optional[dict]
-    memory_summary: Optional[str]
\ No newline at end of file
+    memory_summary: Optional[str]
+    user_role: Optional[str]
+    team: Optional[str]
+    employee_candidates: Optional[list]  # Ambiguous name matches from extract_info
+    slots: Optional[dict]  # Fields pre-extracted by classify_query, keyed by tool
+    chat_session_id: Optional[str]  # Conversation this turn belongs to (app/agents/chat_sessions.py)
\ No newline at end of file
@@ -1,12 +1,19 @@
-from app.utils.llm import llm_call
-from app.agents.state import AgentState
-from langchain_core.messages import HumanMessage, AIMessage
+import os
+import threading
+import time
+from app.database import unit_of_work
+from app.models import User
+
+# Imported by the admin routes (invalidate_session_user), so langchain stays out
+# of module import: it is only needed once the chatbot runs.
 
 # --- Message serializers ---
 def serialize_messages(messages):
+    from langchain_core.messages import HumanMessage
     return [{"type": "human" if isinstance(m, HumanMessage) else "ai", "content": m.content} for m in messages]
 
 def deserialize_messages(data):
+    from langchain_core.messages import HumanMessage, AIMessage
     messages = []
     for msg in data:
         if msg["type"] == "human":
@@ -14,3 +21,55 @@ def deserialize_messages(data):
         else:
             messages.append(AIMessage(content=msg["content"]))
     return messages
+
+# --- Session user (resolved once per graph run, cached across turns) ---
+SESSION_USER_TTL = int(os.getenv("SESSION_USER_TTL", "60"))  # seconds
+
+_session_users = {}  # str(user_id) -> (expires_at, user dict or None)
+_session_users_lock = threading.Lock()
+
+
+def _load_session_user(user_id):
+    with unit_of_work(read_only=True) as db:
+        user = db.query(User).filter_by(id=user_id).first()
+        if not user:
+            return None
+        return {
+            "id": user.id,
+            "role": user.role.lower() if user.role else "",
+            "team": user.team,
+            "full_name": user.full_name,
+            "status": user.status
+        }
+
+
+def get_session_user(user_id):
+    """Plain dict (id, role, team, full_name, status) for the logged-in user, or None."""
+    if not user_id:
+        return None
+    key = str(user_id)
+    now = time.monotonic()
+    with _session_users_lock:
+        cached = _session_users.get(key)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    user = _load_session_user(user_id)
+    with _session_users_lock:
+        _session_users[key] = (now + SESSION_USER_TTL, user)
+    return user
+
+
+def invalidate_session_user(user_id=None):
+    """Drop one cached user (or all of them) after their role/team/status changes."""
+    with _session_users_lock:
+        if user_id is None:
+            _session_users.clear()
+        else:
+            _session_users.pop(str(user_id), None)
+
+
+def state_role(state, default=""):
+    """Role of the session user loaded into the state at graph entry."""
+    user = state.get("session_user")
+    return user["role"] if user and user["role"] else default
@@ -1,7 +1,8 @@
 from app.utils.llm import llm_call
 from app.agents.state import AgentState
-from app.database import SessionLocal
+from app.database import unit_of_work
 from app.models import DailyUpdate
+from app.utils.http_cache import versions, updates_key
 
 
 def add_comment(state: AgentState):
@@ -29,13 +30,14 @@ def add_comment(state: AgentState):
         return {"retrieved_data": "❌ Could not extract a comment from your message."}
 
     # Update the comment in DB
-    with SessionLocal() as session:
+    with unit_of_work() as session:
         update = session.query(DailyUpdate).filter_by(id=update_id).first()
         if not update:
             return {"retrieved_data": f"❌ No daily update found with ID {update_id}"}
 
         update.comment = comment_text
         session.commit()
+        versions.bump(updates_key(update.user_id))
 
         return {
             "retrieved_data": (
@@ -1,13 +1,15 @@
-from app.utils.llm import llm_call
+import asyncio
+from app.utils.llm import llm_call, allm_call, llm_stream_call, allm_stream_call
 from app.agents.state import AgentState
-from app.database import SessionLocal
+from app.database import unit_of_work
 from app.models import User
+from app.agents.slots import get_slots
+from app.utils.name_index import employee_index
+from app.utils.http_cache import bump_user_changed
 
-def create_user(state: AgentState):
-    user_input = state["messages"][-1].content
-    memory_summary = state.get("memory_summary", "")
 
-    # ✨ Step 1: Combine context
+def _extraction_prompt(user_input, memory_summary):
+    # ✨ Combine context
     full_context = f"""
 📌 Summary of Previous Conversation:
 {memory_summary}
@@ -16,8 +18,8 @@ def create_user(state: AgentState):
 {user_input}
 """
 
-    # ✂️ STEP 1: Extract fields (no logic)
-    extraction_prompt = f"""
+    # ✂️ Extract fields (no logic)
+    return f"""
 You are a data extractor helping an admin add a new employee.
 
 Below is the full conversation context:
@@ -38,7 +40,8 @@ role: <role or blank('')>
 team: <team or blank('')>
 """
 
-    raw_output = llm_call(extraction_prompt)
+
+def _parse_extraction(raw_output):
     print("[DEBUG] Extracted Output:\n", raw_output)
 
     # Parse extracted fields
@@ -51,21 +54,22 @@ team: <team or blank('')>
             if key in extracted:
                 extracted[key] = val
 
-    # Check if all required fields are available
-    if all(extracted.values()):
-        f_name = extracted["f_name"]
-        l_name = extracted["l_name"]
-        role = extracted["role"]
-        team = extracted["team"]
-        full_name = f"{f_name} {l_name}"
-        email = f"{f_name.lower()}.{l_name.lower()}@risetechvillage.com"
-        password = f"{f_name.lower()}123"
+    return extracted
 
-        session = SessionLocal()
 
+def _save_user(extracted):
+    f_name = extracted["f_name"]
+    l_name = extracted["l_name"]
+    role = extracted["role"]
+    team = extracted["team"]
+    full_name = f"{f_name} {l_name}"
+    email = f"{f_name.lower()}.{l_name.lower()}@risetechvillage.com"
+    password = f"{f_name.lower()}123"
+
+    with unit_of_work() as session:
         # Check for duplicate email
         if session.query(User).filter_by(email=email).first():
-            return {"retrieved_data": f"❌ A user with email `{email}` already exists."}
+            return f"❌ A user with email `{email}` already exists."
 
         try:
             new_user = User(
@@ -80,21 +84,22 @@ team: <team or blank('')>
             )
             session.add(new_user)
             session.commit()
+            employee_index.invalidate()
+            bump_user_changed(team)
         except Exception as e:
-            return {"retrieved_data": f"❌ Error while creating user: {e}"}
-
-        return {
-            "retrieved_data": (
-                f"✅ User created successfully!\n\n"
-                f"• Name: {full_name}\n"
-                f"• Email: {email}\n"
-                f"• Role: {role.capitalize()}\n"
-                f"• Team: {team}"
-            )
-        }
+            return f"❌ Error while creating user: {e}"
 
-    # 🛑 STEP 2: Missing values → Ask for clarification
-    clarification_prompt = f"""
+    return (
+        f"✅ User created successfully!\n\n"
+        f"• Name: {full_name}\n"
+        f"• Email: {email}\n"
+        f"• Role: {role.capitalize()}\n"
+        f"• Team: {team}"
+    )
+
+
+def _clarification_prompt(extracted):
+    return f"""
 You're helping an admin add a user. The following information is available:
 
 - First Name: {extracted['f_name'] or '❌ missing'}
@@ -110,6 +115,37 @@ Your task:
 Format: A clear, user-friendly sentence asking for the missing parts.
 """
 
-    clarification = llm_call(clarification_prompt)
 
-    return {"retrieved_data": f"👋 RisePal needs a bit more info:\n\n{clarification}"}
\ No newline at end of file
+def create_user(state: AgentState):
+    user_input = state["messages"][-1].content
+    memory_summary = state.get("memory_summary", "")
+
+    # ✨ Step 1: Fields (from combined-mode slots, else a dedicated extraction call)
+    extracted = get_slots(state, "create_user") or _parse_extraction(
+        llm_call(_extraction_prompt(user_input, memory_summary))
+    )
+
+    # Check if all required fields are available
+    if all(extracted.values()):
+        return {"retrieved_data": _save_user(extracted)}
+
+    # 🛑 STEP 2: Missing values → Ask for clarification
+    clarification = llm_stream_call(_clarification_prompt(extracted))
+
+    return {"retrieved_data": f"👋 RisePal needs a bit more info:\n\n{clarification}"}
+
+
+async def acreate_user(state: AgentState):
+    user_input = state["messages"][-1].content
+    memory_summary = state.get("memory_summary", "")
+
+    extracted = get_slots(state, "create_user") or _parse_extraction(
+        await allm_call(_extraction_prompt(user_input, memory_summary))
+    )
+
+    if all(extracted.values()):
+        return {"retrieved_data": await asyncio.to_thread(_save_user, extracted)}
+
+    clarification = await allm_stream_call(_clarification_prompt(extracted))
+
+    return {"retrieved_data": f"👋 RisePal needs a bit more info:\n\n{clarification}"}
@@ -1,35 +1,42 @@
-from app.utils.llm import llm_call
+import asyncio
+from app.utils.llm import llm_call, allm_call
 from app.agents.state import AgentState
-from app.database import SessionLocal 
+from app.database import unit_of_work
 from app.models import Task, User
-from datetime import date, datetime
+from app.agents.slots import get_slots
+from app.utils.http_cache import bump_tasks
+from app.agents.tools.extract_info import resolve_employee_name, candidates_message
+from app.utils.date import get_sri_lanka_date, unambiguous_date
+from datetime import date
 
 
-def assign_task(state: AgentState):
-    print("Assigning task...")
-    user_input = state["messages"][-1].content
-    session_user_id = state.get("session_user_id")  # Logged-in manager
-    today = datetime.today().date()
+def _extraction_prompt(user_input, today, due_date=None):
+    # 📅 Only ask the LLM to work out the due date when the local parser couldn't
+    if due_date:
+        due_date_rule = f"4. Due date: already resolved, output exactly {due_date}"
+    else:
+        due_date_rule = f"""4. Due date (in format YYYY-MM-DD).
+   If the message contains a relative date (e.g., "next Monday", "tomorrow", "this Friday"),
+   convert it into the correct absolute date based on today's date ({today}).
+   If no date is mentioned, leave it blank."""
 
-    # 🧠 Step 1: Extract fields
-    extraction_prompt = f"""
+    return f"""
 You are a task-extracting assistant.
 
 From the following instruction, extract:
 1. Full name of the person receiving the task(capitalized the first letter of each name)
 2. Task title(generate a short title from the user message)
 3. A short description of the task (you can generate one if there's enough context)
-4. Due date (in format YYYY-MM-DD). 
-   If the message contains a relative date (e.g., "next Monday", "tomorrow", "this Friday"), 
-   convert it into the correct absolute date based on today's date ({today}). 
-   If no date is mentioned, leave it blank.
-   
+{due_date_rule}
+
 Only output the values in order, one per line.
 
 Message:
 \"{user_input}\"
 """
-    response = llm_call(extraction_prompt)
+
+
+def _parse_extraction(response):
     lines = [line.strip() for line in response.strip().splitlines() if line.strip()]
     print("🔍 Extracted lines:", lines)
 
@@ -39,9 +46,24 @@ Message:
     description = lines[2] if len(lines) >= 3 and lines[2].lower() != "no description provided" else None
     due_date_str = lines[3] if len(lines) >= 4 and lines[3] else None
 
-    # 🔁 Fix: If description is provided but title is missing → regenerate title from description
-    if description and not title:
-        title_prompt = f"""
+    return assigned_to_name, title, description, due_date_str
+
+
+def _from_slots(state):
+    # Fields pre-extracted by classify_query in combined mode
+    slots = get_slots(state, "assign_task")
+    if not slots:
+        return None
+    return (
+        slots["assignee_name"] or None,
+        slots["title"] or None,
+        slots["description"] or None,
+        slots["due_date"] or None
+    )
+
+
+def _title_prompt(description):
+    return f"""
 You are an assistant generating a title from a task description.
 
 Description:
@@ -49,8 +71,9 @@ Description:
 
 Provide a 2-4 word task title:
 """
-        title = llm_call(title_prompt).strip()
 
+
+def _missing_message(assigned_to_name, description, due_date_str):
     # 🧩 Collect what's still missing
     missing = []
     if not assigned_to_name:
@@ -60,45 +83,104 @@ Provide a 2-4 word task title:
     if not due_date_str:
         missing.append("a due date (e.g., 2025-07-20)")
 
-    if missing:
-        clarification_msg = (
-            f"⚠️ I need a bit more info to assign the task properly.\n\n"
-            f"Please provide: {', '.join(missing)}."
-        )
-        return {"retrieved_data": clarification_msg}
+    if not missing:
+        return None
+    return (
+        f"⚠️ I need a bit more info to assign the task properly.\n\n"
+        f"Please provide: {', '.join(missing)}."
+    )
 
-    # ✅ Step 2: Save task
-    session = SessionLocal()
-    assigner = session.query(User).filter_by(id=session_user_id).first()
+
+def _save_task(assigner, assigned_to_name, title, description, due_date_str):
+    # assigner is the session user dict loaded at graph entry
     if not assigner:
-        return {"retrieved_data": "❌ Could not find the logged-in assigner in the system."}
-
-    assignee = session.query(User).filter_by(full_name=assigned_to_name).first()
-    if not assignee:
-        return {"retrieved_data": f"❌ Could not find assignee '{assigned_to_name}' in the system."}
-
-    try:
-        task = Task(
-            title=title,
-            description=description,
-            due_date=date.fromisoformat(due_date_str),
-            assigned_by_id=assigner.id,
-            assigned_to_id=assignee.id,
-            status="open",
-            assigned_date=date.today()
-        )
-        session.add(task)
-        session.commit()
-    except Exception as e:
-        return {"retrieved_data": f"❌ Failed to save task: {e}"}
+        return "❌ Could not find the logged-in assigner in the system."
 
-    return {
-        "retrieved_data": (
+    with unit_of_work() as session:
+        assignee = session.query(User).filter_by(full_name=assigned_to_name).first()
+        if not assignee:
+            return f"❌ Could not find assignee '{assigned_to_name}' in the system."
+
+        try:
+            task = Task(
+                title=title,
+                description=description,
+                due_date=date.fromisoformat(due_date_str),
+                assigned_by_id=assigner["id"],
+                assigned_to_id=assignee.id,
+                status="open",
+                assigned_date=get_sri_lanka_date()
+            )
+            session.add(task)
+            session.commit()
+            bump_tasks(assignee.id, assignee.team)
+        except Exception as e:
+            return f"❌ Failed to save task: {e}"
+
+        return (
             f"✅ Task assigned!\n\n"
             f"• Title: {title}\n"
             f"• Description: {description}\n"
-            f"• Assigned by: {assigner.full_name}\n"
+            f"• Assigned by: {assigner['full_name']}\n"
             f"• Assigned to: {assigned_to_name}\n"
             f"• Due Date: {due_date_str}"
         )
-    }
\ No newline at end of file
+
+
+def assign_task(state: AgentState):
+    print("Assigning task...")
+    user_input = state["messages"][-1].content
+    assigner = state.get("session_user")  # Logged-in manager
+    today = get_sri_lanka_date()
+    local_due = unambiguous_date(user_input, today, prefer="future")
+
+    # 🧠 Step 1: Extract fields (from combined-mode slots, else a dedicated extraction call)
+    assigned_to_name, title, description, due_date_str = _from_slots(state) or _parse_extraction(
+        llm_call(_extraction_prompt(user_input, today, local_due))
+    )
+    if local_due:
+        due_date_str = local_due.isoformat()  # The local parser beats the LLM's date arithmetic
+
+    # 🔎 Match the name against the employee index (fixes casing/spelling slips)
+    if not assigned_to_name and candidates_message(state):
+        return {"retrieved_data": candidates_message(state)}
+    assigned_to_name = resolve_employee_name(state, assigned_to_name)
+
+    # 🔁 Fix: If description is provided but title is missing → regenerate title from description
+    if description and not title:
+        title = llm_call(_title_prompt(description)).strip()
+
+    clarification_msg = _missing_message(assigned_to_name, description, due_date_str)
+    if clarification_msg:
+        return {"retrieved_data": clarification_msg}
+
+    # ✅ Step 2: Save task
+    return {"retrieved_data": _save_task(assigner, assigned_to_name, title, description, due_date_str)}
+
+
+async def aassign_task(state: AgentState):
+    print("Assigning task...")
+    user_input = state["messages"][-1].content
+    assigner = state.get("session_user")
+    today = get_sri_lanka_date()
+    local_due = unambiguous_date(user_input, today, prefer="future")
+
+    assigned_to_name, title, description, due_date_str = _from_slots(state) or _parse_extraction(
+        await allm_call(_extraction_prompt(user_input, today, local_due))
+    )
+    if local_due:
+        due_date_str = local_due.isoformat()
+
+    if not assigned_to_name and candidates_message(state):
+        return {"retrieved_data": candidates_message(state)}
+    assigned_to_name = resolve_employee_name(state, assigned_to_name)
+
+    if description and not title:
+        title = (await allm_call(_title_prompt(description))).strip()
+
+    clarification_msg = _missing_message(assigned_to_name, description, due_date_str)
+    if clarification_msg:
+        return {"retrieved_data": clarification_msg}
+
+    saved = await asyncio.to_thread(_save_task, assigner, assigned_to_name, title, description, due_date_str)
+    return {"retrieved_data": saved}
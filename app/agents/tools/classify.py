@@ -1,44 +1,77 @@
-from app.utils.llm import llm_call
+from app.utils.llm import llm_call, llm_json_call, allm_call, allm_json_call
 from app.agents.state import AgentState
-from app.database import SessionLocal
-from app.models import User
+from app.agents.state_helper import state_role
+from app.agents.fast_classifier import fast_classify, FAST_PATH_THRESHOLD, ROLE_TOOL_MAP
+from app.agents.slots import COMBINED_EXTRACTION, SLOT_FIELDS, build_intent_schema
+from app.utils.date import get_sri_lanka_date
 
-def classify_query(state: AgentState) -> AgentState:
-    user_input = state["messages"][-1].content
-    memory_summary = state.get("memory_summary", "")
-    session_user_id = state.get("session_user_id")
+# Tool descriptions (more detailed)
+tool_descriptions = {
+    "create_user": "Register a new employee or user (e.g., when user says 'add new intern', 'register team member', 'create a user')",
+    "assign_task": "Assign a task to employees (e.g., when user says 'give task', 'assign work to Ramesh', 'new task for team')",
+    "retrieve_updates": "View employee updates (e.g., when user says 'see today's update', 'get what Ramesh did', 'check report')",
+    "submit_update": "Submit your own daily work update (e.g., when user says 'today I worked on...', 'submit my update')",
+    "other": "None of the above fits clearly"
+}
 
-    # 🧠 Step 1: Get role from DB based on session_user_id
-    db = SessionLocal()
-    user = db.query(User).filter_by(id=session_user_id).first()
-    session_role = user.role.lower() if user and user.role else ""
-    db.close()
 
+def _available_tools(session_role):
     if not session_role:
         print("⚠️ Warning: session_role is missing or not found for user.")
-    
-    # 🔐 Step 2: Map allowed tools for each role
-    role_tool_map = {
-        "admin": ["create_user", "other"],
-        "manager": ["assign_task", "retrieve_updates", "other"],
-        "employee": ["submit_update", "other"]
-    }
-
-    # Tool descriptions (more detailed)
-    tool_descriptions = {
-        "create_user": "Register a new employee or user (e.g., when user says 'add new intern', 'register team member', 'create a user')",
-        "assign_task": "Assign a task to employees (e.g., when user says 'give task', 'assign work to Ramesh', 'new task for team')",
-        "retrieve_updates": "View employee updates (e.g., when user says 'see today's update', 'get what Ramesh did', 'check report')",
-        "submit_update": "Submit your own daily work update (e.g., when user says 'today I worked on...', 'submit my update')",
-        "other": "None of the above fits clearly"
-    }
-
-    available_tools = role_tool_map.get(session_role, ["other"])
 
+    # 🔐 Map allowed tools for each role
+    available_tools = ROLE_TOOL_MAP.get(session_role, ["other"])
     print(f"[CLASSIFY] Available tools for role '{session_role}': {available_tools}")
+    return available_tools
 
-    # 🧾 Step 3: Classify using summary + message
-    classification_prompt = f"""
+
+def _fast_path(user_input, available_tools):
+    # ⚡ Skip the LLM when the local classifier is confident
+    fast_tool, confidence = fast_classify(user_input, available_tools)
+    if fast_tool and confidence >= FAST_PATH_THRESHOLD:
+        print(f"[CLASSIFY] Fast path: {fast_tool} (confidence {confidence:.2f})")
+        return {"query_type": fast_tool}
+    return None
+
+
+def _combined_prompt(session_role, available_tools, memory_summary, user_input):
+    today = get_sri_lanka_date()
+    return f"""
+You are an intelligent assistant in an employee management system.
+
+The current user's role is **{session_role}**, so they are allowed to perform ONLY the following actions:
+
+{chr(10).join(f"- `{tool}`: {tool_descriptions[tool]}" for tool in available_tools)}
+
+Analyze the combined conversation context:
+1. Set `intent` to the single action that fits best.
+2. For every action listed below, fill in its fields from the context.
+   Only use what the user clearly said (titles/descriptions may be generated as noted).
+   Use an empty string for anything not mentioned. Do NOT fabricate names or dates.
+
+{chr(10).join(f"- `{tool}`: " + "; ".join(f"{name} = {desc}" for name, desc in SLOT_FIELDS[tool].items()) for tool in available_tools if tool in SLOT_FIELDS)}
+
+Today's date is {today}.
+
+🧠 Previous Summary:
+{memory_summary}
+
+🗣️ Latest User Message:
+{user_input}
+"""
+
+
+def _parse_combined(result, available_tools):
+    intent = str(result.get("intent", "")).strip().lower()
+    print(f"[CLASSIFY] Combined call: intent={intent}")
+    if intent not in available_tools:
+        return None
+    slots = {tool: result[tool] for tool in available_tools if isinstance(result.get(tool), dict)}
+    return {"query_type": intent, "slots": slots}
+
+
+def _classification_prompt(session_role, available_tools, memory_summary, user_input):
+    return f"""
 You are an intelligent assistant in an employee management system.
 
 The current user's role is **{session_role}**, so they are allowed to perform ONLY the following actions:
@@ -53,12 +86,72 @@ Now analyze the combined conversation context and classify the intent.
 🗣️ Latest User Message:
 {user_input}
 
---- 
+---
 Respond with just **one** of these keywords: {', '.join(f"`{tool}`" for tool in available_tools)}
 """
 
-    result = llm_call(classification_prompt).strip().lower()
+
+def _parse_classification(raw, available_tools):
+    result = raw.strip().lower()
     print(f"[CLASSIFY] User intent classified as: {result}")
 
-    state["query_type"] = result if result in available_tools else "other"
-    return state
\ No newline at end of file
+    # Only return the key this node owns (runs in parallel with extract_info)
+    return {"query_type": result if result in available_tools else "other"}
+
+
+def classify_query(state: AgentState) -> dict:
+    user_input = state["messages"][-1].content
+    memory_summary = state.get("memory_summary", "")
+
+    # 🧠 Step 1: Role of the session user (loaded once at graph entry)
+    session_role = state_role(state)
+
+    # 🔐 Step 2: Allowed tools, then the local fast path
+    available_tools = _available_tools(session_role)
+    fast = _fast_path(user_input, available_tools)
+    if fast:
+        return fast
+
+    # 🧩 Combined mode: intent + all tool fields in one structured call
+    if COMBINED_EXTRACTION:
+        try:
+            result = llm_json_call(
+                _combined_prompt(session_role, available_tools, memory_summary, user_input),
+                build_intent_schema(available_tools)
+            )
+            combined = _parse_combined(result, available_tools)
+            if combined:
+                return combined
+        except Exception as e:
+            print(f"[CLASSIFY] Combined call failed, falling back: {e}")
+
+    # 🧾 Step 3: Classify using summary + message
+    raw = llm_call(_classification_prompt(session_role, available_tools, memory_summary, user_input))
+    return _parse_classification(raw, available_tools)
+
+
+async def aclassify_query(state: AgentState) -> dict:
+    user_input = state["messages"][-1].content
+    memory_summary = state.get("memory_summary", "")
+
+    session_role = state_role(state)
+
+    available_tools = _available_tools(session_role)
+    fast = _fast_path(user_input, available_tools)
+    if fast:
+        return fast
+
+    if COMBINED_EXTRACTION:
+        try:
+            result = await allm_json_call(
+                _combined_prompt(session_role, available_tools, memory_summary, user_input),
+                build_intent_schema(available_tools)
+            )
+            combined = _parse_combined(result, available_tools)
+            if combined:
+                return combined
+        except Exception as e:
+            print(f"[CLASSIFY] Combined call failed, falling back: {e}")
+
+    raw = await allm_call(_classification_prompt(session_role, available_tools, memory_summary, user_input))
+    return _parse_classification(raw, available_tools)
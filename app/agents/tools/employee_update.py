@@ -1,18 +1,14 @@
-from app.utils.llm import llm_call
+import asyncio
+from app.utils.llm import llm_call, allm_call, llm_stream_call, allm_stream_call
 from app.agents.state import AgentState
-from app.database import SessionLocal
-from app.models import DailyUpdate, User
+from app.database import unit_of_work
+from app.models import DailyUpdate
+from app.agents.slots import get_slots
+from app.utils.http_cache import bump_updates
 from datetime import date
 
 
-def submit_update(state: AgentState):
-    user_input = state["messages"][-1].content
-    session_user_id = state.get("session_user_id")
-    memory_summary = state.get("memory_summary", "")
-
-    if not session_user_id:
-        return {"retrieved_data": "❌ Session user ID missing. Cannot submit update."}
-
+def _extraction_prompt(user_input, memory_summary):
     # Combine context
     full_context = f"""
 📌 Summary of Previous Conversation:
@@ -22,8 +18,8 @@ def submit_update(state: AgentState):
 {user_input}
 """
 
-    # STEP 1️⃣: Extract update fields (with strict formatting)
-    extraction_prompt = f"""
+    # Extract update fields (with strict formatting)
+    return f"""
 You're an assistant helping an employee submit their daily work update.
 
 Below is the full conversation context:
@@ -48,8 +44,10 @@ reference: <URL or 'None'>
 📌 Do NOT fabricate or guess. Only extract what is explicitly mentioned.
 """
 
+
+def _parse_extraction(raw_output):
     # Extract lines
-    lines = [line.strip() for line in llm_call(extraction_prompt).splitlines() if line.strip()]
+    lines = [line.strip() for line in raw_output.splitlines() if line.strip()]
 
     extracted = {"title": "", "work_done": "", "reference_link": "None"}
 
@@ -61,9 +59,23 @@ reference: <URL or 'None'>
         elif line.lower().startswith("reference:"):
             extracted["reference_link"] = line[10:].strip()
 
-    # STEP 2️⃣: Clarify if title or work summary is missing
-    if extracted["title"] == "" or extracted["work_done"] == "":
-        clarification_prompt = f"""
+    return extracted
+
+
+def _from_slots(state):
+    # Fields pre-extracted by classify_query in combined mode
+    slots = get_slots(state, "submit_update")
+    if not slots:
+        return None
+    return {
+        "title": slots["title"],
+        "work_done": slots["summary"],
+        "reference_link": slots["reference"] or "None"
+    }
+
+
+def _clarification_prompt(extracted):
+    return f"""
 You're helping an employee submit their daily update to RisePal.
 
 The following information is currently available:
@@ -75,42 +87,86 @@ Please generate a short and friendly message asking ONLY for the missing fields.
 Do NOT fill in or assume anything.
 """
 
-        clarification_msg = llm_call(clarification_prompt)
-        return {"retrieved_data": f"👋 RisePal needs a bit more info:\n\n{clarification_msg}"}
 
+def _save_update(user, extracted):
     # Normalize reference link
     reference_link = extracted["reference_link"]
     reference_link = None if reference_link.lower() == "none" else reference_link
 
-    session = SessionLocal()
-
-    # Verify user exists
-    user = session.query(User).filter_by(id=session_user_id).first()
+    # user is the session user dict loaded at graph entry
     if not user:
-        return {"retrieved_data": "❌ Could not find the logged-in employee in the system."}
+        return "❌ Could not find the logged-in employee in the system."
+
+    with unit_of_work() as session:
+        # Save update (one per day: a second submission is added to the first)
+        try:
+            update = session.query(DailyUpdate).filter_by(user_id=user["id"], date=date.today()).first()
+            if update:
+                update.title = f"{update.title}; {extracted['title']}"
+                update.work_done = f"{update.work_done}\n\n{extracted['work_done']}"
+                if reference_link:
+                    update.reference_link = f"{update.reference_link}\n{reference_link}" if update.reference_link else reference_link
+                heading = "✅ Added to today's update!"
+            else:
+                update = DailyUpdate(
+                    user_id=user["id"],
+                    date=date.today(),
+                    title=extracted["title"],
+                    work_done=extracted["work_done"],
+                    reference_link=reference_link
+                )
+                session.add(update)
+                heading = "✅ Update submitted successfully!"
+            session.commit()
+            bump_updates(user["id"], user["team"])
+        except Exception as e:
+            return f"❌ Failed to save update: {e}"
+
+    return (
+        f"{heading}\n\n"
+        f"• Title: {extracted['title']}\n"
+        f"• Date: {date.today()}\n"
+        f"• Summary: {extracted['work_done']}\n"
+        + (f"• Reference: {reference_link}" if reference_link else "")
+    )
+
+
+def submit_update(state: AgentState):
+    user_input = state["messages"][-1].content
+    session_user_id = state.get("session_user_id")
+    memory_summary = state.get("memory_summary", "")
+
+    if not session_user_id:
+        return {"retrieved_data": "❌ Session user ID missing. Cannot submit update."}
+
+    # STEP 1️⃣: Update fields (from combined-mode slots, else a dedicated extraction call)
+    extracted = _from_slots(state) or _parse_extraction(
+        llm_call(_extraction_prompt(user_input, memory_summary))
+    )
+
+    # STEP 2️⃣: Clarify if title or work summary is missing
+    if extracted["title"] == "" or extracted["work_done"] == "":
+        clarification_msg = llm_stream_call(_clarification_prompt(extracted))
+        return {"retrieved_data": f"👋 RisePal needs a bit more info:\n\n{clarification_msg}"}
 
     # STEP 3️⃣: Save update
-    try:
-        update = DailyUpdate(
-            user_id=user.id,
-            date=date.today(),
-            title=extracted["title"],
-            work_done=extracted["work_done"],
-            reference_link=reference_link
-        )
-        session.add(update)
-        session.commit()
-    except Exception as e:
-        return {"retrieved_data": f"❌ Failed to save update: {e}"}
-    finally:
-        session.close()
+    return {"retrieved_data": _save_update(state.get("session_user"), extracted)}
 
-    return {
-        "retrieved_data": (
-            f"✅ Update submitted successfully!\n\n"
-            f"• Title: {extracted['title']}\n"
-            f"• Date: {date.today()}\n"
-            f"• Summary: {extracted['work_done']}\n"
-            + (f"• Reference: {reference_link}" if reference_link else "")
-        )
-    }
\ No newline at end of file
+
+async def asubmit_update(state: AgentState):
+    user_input = state["messages"][-1].content
+    session_user_id = state.get("session_user_id")
+    memory_summary = state.get("memory_summary", "")
+
+    if not session_user_id:
+        return {"retrieved_data": "❌ Session user ID missing. Cannot submit update."}
+
+    extracted = _from_slots(state) or _parse_extraction(
+        await allm_call(_extraction_prompt(user_input, memory_summary))
+    )
+
+    if extracted["title"] == "" or extracted["work_done"] == "":
+        clarification_msg = await allm_stream_call(_clarification_prompt(extracted))
+        return {"retrieved_data": f"👋 RisePal needs a bit more info:\n\n{clarification_msg}"}
+
+    return {"retrieved_data": await asyncio.to_thread(_save_update, state.get("session_user"), extracted)}
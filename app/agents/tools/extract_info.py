@@ -1,37 +1,54 @@
-from app.database import SessionLocal
-from app.models import User
-from app.utils.llm import llm_call
+import asyncio
+from app.utils.name_index import employee_index
 from app.agents.state import AgentState
 
-def extract_info(state: AgentState) -> dict:
+
+def _team_scope(state):
+    # Managers only talk about their own team; admins/employees search everyone
+    user = state.get("session_user") or {"role": state.get("user_role"), "team": state.get("team")}
+    return user["team"] if user["role"] == "manager" else None
+
+
+def _find_employee(state):
     message = state["messages"][-1].content
-    session_user_id = state.get("session_user_id")
+    target_employee, candidates = employee_index.find(message, team=_team_scope(state))
+    if target_employee:
+        target_employee = {
+            "id": target_employee["id"],
+            "full_name": target_employee["full_name"],
+            "email": target_employee["email"]
+        }
+
+    # session_user_id is input-only here; writing it back would clash with the parallel branch
+    return {
+        "target_employee": target_employee,
+        "employee_candidates": [
+            {"id": c["id"], "full_name": c["full_name"], "email": c["email"]} for c in candidates
+        ]
+    }
 
-    session = SessionLocal()
-    manager = session.query(User).filter_by(id=session_user_id).first()
 
-    # You can use LLM to extract target employee name
-    prompt = f"""
-From this query, extract the full name of the employee mentioned (if any).
+def resolve_employee_name(state, name):
+    """Canonical full name for an extracted `name`, else the employee spotted in the message."""
+    if name:
+        return employee_index.resolve(name, team=_team_scope(state)) or name
+    target = state.get("target_employee")
+    return target["full_name"] if target else None
 
-Query: "{message}"
 
-Return only the name.
-If no employee is mentioned, return an empty string.
-"""
-    employee_name = llm_call(prompt)
+def candidates_message(state):
+    """Clarification listing ambiguous matches, or None when there were none."""
+    candidates = state.get("employee_candidates") or []
+    if not candidates:
+        return None
+    names = ", ".join(c["full_name"] for c in candidates)
+    return f"🤔 I found more than one matching employee: {names}. Which one did you mean?"
 
-    target_employee = None
-    if employee_name:
-        target = session.query(User).filter_by(full_name=employee_name).first()
-        if target:
-            target_employee = {
-                "id": target.id,
-                "full_name": target.full_name,
-                "email": target.email
-            }
 
-    return {
-        "session_user_id": session_user_id,
-        "target_employee": target_employee
-    }
+def extract_info(state: AgentState) -> dict:
+    return _find_employee(state)
+
+
+async def aextract_info(state: AgentState) -> dict:
+    # The index rebuild (rare) touches the DB, so keep it off the event loop
+    return await asyncio.to_thread(_find_employee, state)
@@ -1,14 +1,30 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from sqlalchemy.orm import Session
-from app.models import ChatMessage
+from sqlalchemy.exc import IntegrityError
+from app.models import ChatMessage, ChatSummary
 from app.utils.llm import llm_call
+from app.utils.write_behind import WriteBehindQueue
 from langchain_core.messages import HumanMessage, BaseMessage
-from app.database import SessionLocal  # this is your DB session creator
-
-
-def handle_memory_node(state: dict) -> dict:
-    db = SessionLocal()
-
+from app.database import unit_of_work  # One session per DB step, returned to the pool afterwards
+from app.agents.chat_sessions import chat_sessions
+
+# The recent messages of the chat session are kept in process (chat_sessions);
+# only the ones that fall out of that window get folded into the rolling summary.
+#
+# None of the upkeep runs on the request path: the memory node only reads the
+# in-process window. Messages are written to chat_messages by a write-behind
+# queue, and once a batch of them has scrolled out of the window the summary is
+# refreshed on a small thread pool - after the reply went out - so the next turn
+# finds it ready.
+CHAT_WRITE_BEHIND = os.getenv("CHAT_WRITE_BEHIND", "1") == "1"   # 0 = write and summarize inline
+CHAT_WRITE_BATCH = int(os.getenv("CHAT_WRITE_BATCH", "50"))       # messages per INSERT transaction
+CHAT_WRITE_DELAY_MS = int(os.getenv("CHAT_WRITE_DELAY_MS", "50"))  # wait this long to fill a batch
+CHAT_SUMMARY_WORKERS = int(os.getenv("CHAT_SUMMARY_WORKERS", "2"))
+
+
+def _validate(state: dict):
     user_id = state.get("session_user_id")  # This is the actual user ID
     messages: list[BaseMessage] = state.get("messages", [])
 
@@ -19,25 +35,24 @@ def handle_memory_node(state: dict) -> dict:
     if not isinstance(new_message, HumanMessage):
         raise ValueError("Last message must be a HumanMessage")
 
-    user_input = new_message.content
+    return user_id, new_message.content
 
-    # Step 1: Get all previous messages (excluding this new one)
-    previous_msgs = db.query(ChatMessage)\
-        .filter(ChatMessage.user_id == user_id)\
-        .order_by(ChatMessage.timestamp.asc()).all()
 
-    history_lines = [f"{msg.sender.capitalize()}: {msg.message}" for msg in previous_msgs]
-    history_text = "\n".join(history_lines) if history_lines else "No previous messages."
+def _summary_prompt(previous_summary, new_msgs):
+    history_lines = [f"{sender.capitalize()}: {message}" for _, sender, message in new_msgs]
+    history_text = "\n".join(history_lines)
 
-    # Step 2: Summarize with Gemini
-    prompt = f"""
+    return f"""
 You are a summarizer assistant for an employee management chatbot system.
 
 The user may interact over multiple turns, sometimes trying different ways to express the same request or refining information over time.
 
+You maintain a rolling summary of the conversation. Update it with the new messages below.
+
 Your job is to:
 - Understand what the user is currently trying to do (e.g., add user, assign task, retrieve updates, submit update).
-- Focus **only on the last 3–5 messages** in the conversation. Prioritize the **most recent valid data** — ignore earlier conflicting or incomplete ones.
+- Prioritize the **new messages** — they override earlier conflicting or incomplete data in the existing summary.
+- Drop details from the existing summary that belong to a request the user has clearly moved on from.
 - Identify and remember any critical entities:
     - 👤 Name(s) of employees/managers
     - 🏢 Role (Admin, Manager, Employee)
@@ -46,9 +61,10 @@ Your job is to:
     - 🧑‍💼 Team (Software, HR, Operations, etc.)
     - 📓 Daily updates (summary of what they did)
 
-Below is the recent conversation history between the user and the assistant (most recent last):
+Existing summary:
+{previous_summary or "No previous summary."}
 
-Conversation:
+New messages (most recent last):
 {history_text}
 
 ⬇️ Please return a **clear summary** of:
@@ -70,22 +86,129 @@ or
 Keep the summary concise and structured. Do NOT explain or speculate.
 """
 
+
+def _save_summary(session_id, user_id, new_summary, last_message_id):
+    with unit_of_work() as db:
+        summary_row = db.query(ChatSummary).filter_by(session_id=session_id).first()
+        if not summary_row:
+            summary_row = ChatSummary(session_id=session_id, user_id=user_id, summary="", last_message_id=0)
+            db.add(summary_row)
+            try:
+                db.flush()
+            except IntegrityError:
+                # Another worker process created it first
+                db.rollback()
+                summary_row = db.query(ChatSummary).filter_by(session_id=session_id).first()
+
+        # Never move the mark backwards if another process already folded further
+        if last_message_id >= summary_row.last_message_id:
+            summary_row.summary = new_summary
+            summary_row.last_message_id = last_message_id
+            summary_row.updated_at = datetime.utcnow()
+        db.commit()
+
+
+def _refresh_summary(session_id, user_id):
+    """Fold the messages that scrolled out of the window into the session summary."""
+    claimed = chat_sessions.claim_fold(session_id, user_id)
+    if not claimed:
+        return
+    previous_summary, new_msgs = claimed
     try:
-        summary = llm_call(prompt).strip()
+        new_summary = llm_call(_summary_prompt(previous_summary, new_msgs), cache=False).strip()  # Rolling state, never reused
+        mark = new_msgs[-1][0]
+        _save_summary(session_id, user_id, new_summary, mark)
     except Exception as e:
-        summary = "⚠️ Failed to generate summary."
         print(f"[SUMMARY ERROR] {e}")
+        chat_sessions.folded(session_id, user_id)  # Retried after the next message
+        return
+    chat_sessions.folded(session_id, user_id, new_summary, mark)
+    print(f"[SUMMARY] Session {session_id} summary refreshed: {new_summary}")
+
+
+_summary_pool = ThreadPoolExecutor(max_workers=CHAT_SUMMARY_WORKERS, thread_name_prefix="chat-summary")
+
+
+def _write_messages(batch):
+    """Write-behind flush: one transaction for the batch, then hand the ids back to the session windows."""
+    with unit_of_work() as db:
+        rows = [ChatMessage(
+            session_id=session_id,
+            user_id=user_id,
+            sender=sender,
+            message=entry[2],
+            timestamp=timestamp
+        ) for session_id, user_id, sender, entry, timestamp in batch]
+        db.add_all(rows)
+        db.flush()
+        ids = [row.id for row in rows]
+        db.commit()
+
+    sessions = {}
+    for (session_id, user_id, _, entry, _), message_id in zip(batch, ids):
+        entry[0] = message_id
+        sessions[session_id] = user_id
+
+    for session_id, user_id in sessions.items():
+        if CHAT_WRITE_BEHIND:
+            try:
+                _summary_pool.submit(_refresh_summary, session_id, user_id)
+            except RuntimeError:
+                pass  # Interpreter exiting (atexit drain); the session's next flush catches up
+        else:
+            _refresh_summary(session_id, user_id)
+
+
+chat_writer = WriteBehindQueue(
+    "chat-writer",
+    _write_messages,
+    batch_size=CHAT_WRITE_BATCH,
+    max_delay_ms=CHAT_WRITE_DELAY_MS,
+    enabled=CHAT_WRITE_BEHIND
+)
+
+
+def _remember(session_id, user_id, sender, message):
+    entry = chat_sessions.append(session_id, user_id, None, sender, message)
+    chat_writer.put((session_id, user_id, sender, entry, datetime.utcnow()))
+
+
+def _memory_for_turn(session_id, user_id, user_input):
+    """Prompt memory (summary + recent window within the token budget), then queue the user's message."""
+    memory = chat_sessions.context(session_id, user_id)
+    _remember(session_id, user_id, "user", user_input)
+    return memory
+
+
+def save_bot_reply(state: dict, reply: str):
+    """Record the assistant's answer so the next turn sees both sides of the conversation."""
+    session_id = state.get("chat_session_id")
+    user_id = state.get("session_user_id")
+    if not session_id or not user_id or not reply:
+        return
+    try:
+        _remember(session_id, user_id, "bot", reply)
+    except Exception as e:
+        print(f"[CHAT HISTORY ERROR] {e}")
+
+
+def handle_memory_node(state: dict) -> dict:
+    user_id, user_input = _validate(state)
+    # Endpoints resolve the session before the graph runs; direct graph callers get a fresh one
+    session_id = state.get("chat_session_id") or chat_sessions.resolve(user_id)
+
+    memory = _memory_for_turn(session_id, user_id, user_input)
+
+    print(f"[SUMMARY] Memory for this turn: {memory}")
+    return {"memory_summary": memory}
+
+
+async def ahandle_memory_node(state: dict) -> dict:
+    user_id, user_input = _validate(state)
+    session_id = state.get("chat_session_id") or await asyncio.to_thread(chat_sessions.resolve, user_id)
+
+    # Only reads the in-process window, but a session missing from it is reloaded from the DB
+    memory = await asyncio.to_thread(_memory_for_turn, session_id, user_id, user_input)
 
-    # Step 3: Save the new message
-    db.add(ChatMessage(
-        session_id=user_id,  # If you have a real session_id, use it here
-        user_id=user_id,
-        sender="user",
-        message=user_input,
-        timestamp=datetime.utcnow()
-    ))
-    db.commit()
-
-    print(f"[SUMMARY] Summary generated: {summary}")
-    state["memory_summary"] = summary
-    return state
\ No newline at end of file
+    print(f"[SUMMARY] Memory for this turn: {memory}")
+    return {"memory_summary": memory}
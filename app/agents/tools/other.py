@@ -1,20 +1,10 @@
-from app.utils.llm import llm_call
+from app.utils.llm import llm_stream_call, allm_stream_call
 from app.agents.state import AgentState
-from app.database import SessionLocal
-from app.models import User
+from app.agents.state_helper import state_role
 
 
-def other_task(state: AgentState):
-    last_msg = state["messages"][-1].content
-    session_user_id = state.get("session_user_id")
-
-    # Get role from database using session_user_id
-    db = SessionLocal()
-    user = db.query(User).filter_by(id=session_user_id).first()
-    session_role = user.role.lower() if user else "user"
-    db.close()
-
-    prompt = f"""
+def _other_prompt(last_msg, session_role):
+    return f"""
 You are **Rise Pal**, the friendly assistant at **RiseTech Village**.
 The current user role is: **{session_role.upper()}**
 
@@ -47,7 +37,26 @@ Provide a short, point-wise guide based on the user role:
 
 ✨ Keep it simple, polite, and bullet-point friendly. Avoid long paragraphs. Only show what’s relevant to their role.
 """
-    response = llm_call(prompt)
+
+
+def other_task(state: AgentState):
+    last_msg = state["messages"][-1].content
+
+    # Role of the session user (loaded once at graph entry)
+    session_role = state_role(state, default="user")
+
+    response = llm_stream_call(_other_prompt(last_msg, session_role))
+    return {
+        "retrieved_data": response
+    }
+
+
+async def aother_task(state: AgentState):
+    last_msg = state["messages"][-1].content
+
+    session_role = state_role(state, default="user")
+
+    response = await allm_stream_call(_other_prompt(last_msg, session_role))
     return {
         "retrieved_data": response
     }
\ No newline at end of file
@@ -1,16 +1,16 @@
-from app.utils.llm import llm_call
+import asyncio
+from app.utils.llm import llm_call, allm_call, llm_stream_call, allm_stream_call
 from app.agents.state import AgentState
-from app.database import SessionLocal
-from app.models import DailyUpdate, User
-from datetime import datetime
+from app.database import unit_of_work
+from app.queries import daily_update_for
+from app.agents.slots import get_slots
+from app.agents.tools.extract_info import resolve_employee_name, candidates_message
+from app.utils.date import get_sri_lanka_date, unambiguous_date, mentions_date
+from datetime import date
 
 
-def retrieve_updates(state: AgentState):
-    user_input = state["messages"][-1].content
-    memory_summary = state.get("memory_summary", "")
-    today = datetime.today().date()
-
-    # 🧠 STEP 1: Combine context and extract name + date
+def _extraction_prompt(user_input, memory_summary, today):
+    # 🧠 Combine context and extract name + date
     full_context = f"""
 📌 Memory Summary:
 {memory_summary}
@@ -21,7 +21,7 @@ def retrieve_updates(state: AgentState):
 Today is {today}.
 """
 
-    extraction_prompt = f"""
+    return f"""
 You're a helpful assistant extracting required information for retrieving an employee's daily update.
 
 Use the following conversation context:
@@ -39,7 +39,9 @@ name: <full name or ''>
 date: <YYYY-MM-DD or ''>
 """
 
-    lines = [line.strip() for line in llm_call(extraction_prompt).splitlines() if line.strip()]
+
+def _parse_extraction(raw_output):
+    lines = [line.strip() for line in raw_output.splitlines() if line.strip()]
     extracted = {"name": "", "date": ""}
 
     for line in lines:
@@ -48,9 +50,31 @@ date: <YYYY-MM-DD or ''>
         elif line.lower().startswith("date:"):
             extracted["date"] = line[5:].strip()
 
-    # ❓ STEP 2: Clarify if missing
-    if not extracted["name"] or not extracted["date"]:
-        clarification_prompt = f"""
+    return extracted
+
+
+def _from_slots(state, today):
+    # Name + date pre-extracted by classify_query in combined mode
+    slots = get_slots(state, "retrieve_updates")
+    if not slots:
+        return None
+    return {"name": slots["employee_name"], "date": slots["date"] or str(today)}
+
+
+def _local_extraction(state, user_input, local_date, today):
+    # 📅 Name from the employee index + date from the local parser → no LLM call needed
+    target = state.get("target_employee")
+    if not target:
+        return None
+    if local_date is None:
+        if mentions_date(user_input):
+            return None  # Some date phrase we can't read → let the LLM have a go
+        local_date = today
+    return {"name": target["full_name"], "date": local_date.isoformat()}
+
+
+def _clarification_prompt(extracted):
+    return f"""
 You're assisting a manager trying to retrieve an employee's daily update.
 
 However, some required fields are missing:
@@ -59,51 +83,123 @@ However, some required fields are missing:
 
 👉 Write a **polite clarification message** asking ONLY for the missing parts. Do not assume anything.
 """
-        clarification_message = llm_call(clarification_prompt)
-        return {"retrieved_data": f"🤖 RisePal needs more info:\n\n{clarification_message}"}
 
-    emp_name = extracted["name"]
-    req_date = extracted["date"]
 
-    # 📦 STEP 3: Retrieve & summarize
-    with SessionLocal() as session:
-        user = session.query(User).filter(User.full_name == emp_name).first()
-        if not user:
-            return {"retrieved_data": f"❌ No employee found with the name '{emp_name}'."}
+def _find_update(emp_name, req_date):
+    """Returns (error_message, None) or (None, {"user": {...}, "update": {...}})."""
+    try:
+        req_day = date.fromisoformat(req_date)
+    except ValueError:
+        return f"❌ '{req_date}' is not a valid date. Please use YYYY-MM-DD.", None
 
-        update = (
-            session.query(DailyUpdate)
-            .filter(DailyUpdate.user_id == user.id, DailyUpdate.date == req_date)
-            .order_by(DailyUpdate.id.desc())
-            .first()
-        )
+    with unit_of_work(read_only=True) as session:
+        user, update = daily_update_for(session, emp_name, req_day)
+        if not user:
+            return f"❌ No employee found with the name '{emp_name}'.", None
 
         if not update:
-            return {"retrieved_data": f"ℹ️ No updates found for {emp_name} on {req_date}."}
+            return f"ℹ️ No updates found for {emp_name} on {req_date}.", None
+
+        return None, {
+            "user": {"id": user.id, "name": user.full_name},
+            "update": {
+                "id": update.id,
+                "date": str(update.date),
+                "title": update.title,
+                "work_done": update.work_done
+            }
+        }
 
-        summary_prompt = f"""
+
+def _summary_prompt(emp_name, update):
+    return f"""
 You're summarizing a daily work update for manager view.
 
 Employee: {emp_name}
-Date: {update.date}
+Date: {update['date']}
 
 Work Details:
-• Title: {update.title}
-• Summary: {update.work_done}
+• Title: {update['title']}
+• Summary: {update['work_done']}
 
 📝 Write a clear and short summary for this update.
 """
-        summary = llm_call(summary_prompt)
-
-        return {
-            "retrieved_data": f"📋 Summary for {emp_name} on {req_date}:\n\n{summary}",
-            "target_employee": {
-                "id": user.id,
-                "name": user.full_name
-            },
-            "update_id": {
-                "id": update.id,
-                "date": str(update.date),
-                "title": update.title
-            }
-        }
\ No newline at end of file
+
+
+def _result(emp_name, req_date, found, summary):
+    update = found["update"]
+    return {
+        "retrieved_data": f"📋 Summary for {emp_name} on {req_date}:\n\n{summary}",
+        "target_employee": found["user"],
+        "update_id": {
+            "id": update["id"],
+            "date": update["date"],
+            "title": update["title"]
+        }
+    }
+
+
+def retrieve_updates(state: AgentState):
+    user_input = state["messages"][-1].content
+    memory_summary = state.get("memory_summary", "")
+    today = get_sri_lanka_date()
+    local_date = unambiguous_date(user_input, today, prefer="past")
+
+    # 🧠 STEP 1: Name + date (locally if possible, else combined-mode slots, else a dedicated extraction call)
+    extracted = _local_extraction(state, user_input, local_date, today) or _from_slots(state, today) or _parse_extraction(
+        llm_call(_extraction_prompt(user_input, memory_summary, today))
+    )
+    if local_date:
+        extracted["date"] = local_date.isoformat()
+
+    # 🔎 Match the name against the employee index (fixes casing/spelling slips)
+    if not extracted["name"] and candidates_message(state):
+        return {"retrieved_data": candidates_message(state)}
+    extracted["name"] = resolve_employee_name(state, extracted["name"]) or ""
+
+    # ❓ STEP 2: Clarify if missing
+    if not extracted["name"] or not extracted["date"]:
+        clarification_message = llm_stream_call(_clarification_prompt(extracted))
+        return {"retrieved_data": f"🤖 RisePal needs more info:\n\n{clarification_message}"}
+
+    emp_name = extracted["name"]
+    req_date = extracted["date"]
+
+    # 📦 STEP 3: Retrieve & summarize
+    error, found = _find_update(emp_name, req_date)
+    if error:
+        return {"retrieved_data": error}
+
+    summary = llm_stream_call(_summary_prompt(emp_name, found["update"]))
+    return _result(emp_name, req_date, found, summary)
+
+
+async def aretrieve_updates(state: AgentState):
+    user_input = state["messages"][-1].content
+    memory_summary = state.get("memory_summary", "")
+    today = get_sri_lanka_date()
+    local_date = unambiguous_date(user_input, today, prefer="past")
+
+    extracted = _local_extraction(state, user_input, local_date, today) or _from_slots(state, today) or _parse_extraction(
+        await allm_call(_extraction_prompt(user_input, memory_summary, today))
+    )
+    if local_date:
+        extracted["date"] = local_date.isoformat()
+
+    if not extracted["name"] and candidates_message(state):
+        return {"retrieved_data": candidates_message(state)}
+    extracted["name"] = resolve_employee_name(state, extracted["name"]) or ""
+
+    if not extracted["name"] or not extracted["date"]:
+        clarification_message = await allm_stream_call(_clarification_prompt(extracted))
+        return {"retrieved_data": f"🤖 RisePal needs more info:\n\n{clarification_message}"}
+
+    emp_name = extracted["name"]
+    req_date = extracted["date"]
+
+    error, found = await asyncio.to_thread(_find_update, emp_name, req_date)
+    if error:
+        return {"retrieved_data": error}
+
+    summary = await allm_stream_call(_summary_prompt(emp_name, found["update"]))
+    return _result(emp_name, req_date, found, summary)
@@ -0,0 +1,12 @@
+import asyncio
+from app.agents.state import AgentState
+from app.agents.state_helper import get_session_user
+
+
+# Graph entry: resolve the logged-in user once so later nodes read it from the state
+def load_session_user(state: AgentState) -> dict:
+    return {"session_user": get_session_user(state.get("session_user_id"))}
+
+
+async def aload_session_user(state: AgentState) -> dict:
+    return {"session_user": await asyncio.to_thread(get_session_user, state.get("session_user_id"))}
@@ -0,0 +1,173 @@
+"""
+ASGI serving mode.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000 --workers 2
+
+Chatbot POSTs (/api/admin|manager|employee/chatbot and their SSE variants
+under .../chatbot/stream) are handled natively on the event loop with the
+async agent graph, so a single worker process can keep hundreds of chats in
+flight while they wait on Gemini. Every other route is passed through to the
+Flask app via asgiref's WsgiToAsgi adapter.
+
+The native routes skip Flask, so request_hooks() does for them what the Flask
+hooks do for every other route: request duration / SQL count metrics, opt-in
+profiling (X-Profile header or ?profile=, answered with X-Profile-Id) and DB
+session cleanup. In cprofile mode the profiler runs on the event loop thread,
+so it also sees other requests' coroutines running on that loop while the
+profiled chat is in flight, and only one cprofile request per process is
+profiled at a time: others that overlap it go unprofiled (use sample mode for
+concurrent profiles).
+
+The plain WSGI mode (python run.py / gunicorn run:app) keeps working; there
+the chatbot routes drive the same async graph through Flask's ensure_sync,
+one request per worker thread.
+"""
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from http.cookies import SimpleCookie
+from urllib.parse import parse_qs
+
+from asgiref.wsgi import WsgiToAsgi
+
+ALLOWED_ORIGINS = ["http://localhost:3000"]
+
+CHATBOT_ROLES = {
+    "/api/admin/chatbot": "admin",
+    "/api/manager/chatbot": "manager",
+    "/api/employee/chatbot": "employee",
+}
+STREAM_ROLES = {f"{path}/stream": role for path, role in CHATBOT_ROLES.items()}
+
+
+def create_asgi_app(flask_app=None):
+    if flask_app is None:
+        from app import create_app
+        flask_app = create_app()
+
+    from app.routes import run_chatbot, build_initial_state, chat_session_for, achatbot_events, sse_event
+    from app.database import remove_sessions
+    from app.utils.metrics import start_request, finish_request
+    from app.utils import profiling
+
+    wsgi_app = WsgiToAsgi(flask_app)
+    serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+    cookie_name = flask_app.config["SESSION_COOKIE_NAME"]
+    max_age = int(flask_app.permanent_session_lifetime.total_seconds())
+
+    def load_session(headers):
+        # Read the signed Flask session cookie without going through WSGI
+        cookie = SimpleCookie(headers.get("cookie", ""))
+        if serializer is None or cookie_name not in cookie:
+            return {}
+        try:
+            return serializer.loads(cookie[cookie_name].value, max_age=max_age)
+        except Exception:
+            return {}
+
+    async def read_body(receive):
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                return body
+
+    def cors_headers(origin):
+        if origin not in ALLOWED_ORIGINS:
+            return []
+        return [
+            (b"access-control-allow-origin", origin.encode()),
+            (b"access-control-allow-credentials", b"true"),
+            (b"vary", b"Origin"),
+        ]
+
+    async def start_response(send, request, status, headers):
+        request["status"] = status
+        headers = headers + cors_headers(request["origin"]) + request["extra_headers"]
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+
+    async def send_json(send, request, payload, status):
+        await start_response(send, request, status, [(b"content-type", b"application/json")])
+        await send({"type": "http.response.body", "body": json.dumps(payload).encode()})
+
+    @asynccontextmanager
+    async def request_hooks(scope, endpoint):
+        """
+        What the Flask hooks do for every WSGI route, for the native ones:
+        request metrics, opt-in profiling (X-Profile / ?profile=) and DB session cleanup.
+        """
+        headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+        user_session = load_session(headers)
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+
+        start_request()
+        profile_value = headers.get("x-profile") or (query.get("profile") or [None])[0]
+        profiled = profiling.begin_request(profile_value, user_session.get("role"), scope["method"], scope["path"])
+        request = {
+            "session": user_session,
+            "origin": headers.get("origin", ""),
+            "status": 500,  # Until a response starts
+            "extra_headers": [(b"x-profile-id", profiled[0].meta["id"].encode())] if profiled else [],
+        }
+        try:
+            yield request
+        finally:
+            finish_request(endpoint, scope["method"], request["status"])
+            if profiled:
+                profiling.end_request(profiled, request["status"])
+            remove_sessions()  # DB work itself runs in worker threads through unit_of_work
+
+    async def read_data(request, receive, role):
+        """Returns the JSON body, or None when the caller isn't logged in with this role."""
+        if request["session"].get("role") != role:
+            return None
+        try:
+            data = json.loads(await read_body(receive) or b"{}")
+        except ValueError:
+            data = {}
+        return data if isinstance(data, dict) else {}
+
+    async def chatbot(scope, receive, send):
+        role = CHATBOT_ROLES[scope["path"]]
+        async with request_hooks(scope, scope["path"]) as request:
+            data = await read_data(request, receive, role)
+            if data is None:
+                return await send_json(send, request, {"error": "Unauthorized access"}, 403)
+
+            # The cookie can't be updated from here; clients keep the returned session_id
+            payload, status = await run_chatbot(role, request["session"], data.get("message"), data)
+            await send_json(send, request, payload, status)
+
+    async def chatbot_stream(scope, receive, send):
+        role = STREAM_ROLES[scope["path"]]
+        async with request_hooks(scope, "/api/<role>/chatbot/stream") as request:
+            data = await read_data(request, receive, role)
+            if data is None:
+                return await send_json(send, request, {"error": "Unauthorized access"}, 403)
+            message = data.get("message")
+            if not message:
+                return await send_json(send, request, {"error": "Message is required"}, 400)
+
+            await start_response(send, request, 200, [
+                (b"content-type", b"text/event-stream"),
+                (b"cache-control", b"no-cache"),
+                (b"x-accel-buffering", b"no"),
+            ])
+
+            chat_session_id = await asyncio.to_thread(chat_session_for, request["session"], data)
+            initial_state = build_initial_state(role, request["session"], message, chat_session_id)
+            async for event, payload in achatbot_events(initial_state):
+                await send({"type": "http.response.body", "body": sse_event(event, payload).encode(), "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+
+    async def app(scope, receive, send):
+        is_post = scope["type"] == "http" and scope["method"] == "POST"
+        if is_post and scope["path"] in CHATBOT_ROLES:
+            await chatbot(scope, receive, send)
+        elif is_post and scope["path"] in STREAM_ROLES:
+            await chatbot_stream(scope, receive, send)
+        else:
+            await wsgi_app(scope, receive, send)
+
+    return app
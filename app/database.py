@@ -1,19 +1,162 @@
-from sqlalchemy import create_engine
+import os
+import time
+from contextlib import contextmanager
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, scoped_session
 from .models import Base
+from .migrations import run_migrations
 
-# SQLite database URI
-DATABASE_URL = "sqlite:///employee_task4.db"
+load_dotenv()  # This module reads its settings at import time, before create_app() runs
 
-# Create engine
-engine = create_engine(DATABASE_URL, echo=False)
+# Database URI (any SQLAlchemy URL; SQLite file by default)
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///employee_task4.db")
+# Optional separate URL for reads (e.g. a replica); defaults to the same database
+READ_DATABASE_URL = os.getenv("READ_DATABASE_URL", DATABASE_URL)
+
+# Connection pool
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", str(DB_POOL_SIZE)))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))        # seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "-1"))        # seconds; set for server DBs that drop idle connections
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "0") == "1"
+DB_ECHO = os.getenv("DB_ECHO", "0") == "1"
+
+# SQLite connect-time pragmas
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))   # wait for locks instead of failing
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", str(64 * 1024)))
+
+# A pooled connection held longer than this counts as a suspected leak in pool_stats()
+DB_LEAK_WARN_SECONDS = float(os.getenv("DB_LEAK_WARN_SECONDS", "30"))
+
+
+def _is_sqlite(url):
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def _is_sqlite_memory(url):
+    return _is_sqlite(url) and make_url(url).database in (None, "", ":memory:")
+
+
+def _sqlite_pragmas(read_only):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if not read_only:
+            # WAL: readers no longer block behind a writer (persisted in the file)
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")   # Durable with WAL, far fewer fsyncs
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")   # negative = KiB
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+    return on_connect
+
+
+def _make_engine(url, pool_size, read_only=False):
+    options = {"echo": DB_ECHO, "pool_pre_ping": DB_POOL_PRE_PING, "pool_recycle": DB_POOL_RECYCLE}
+    if not _is_sqlite_memory(url):
+        # In-memory SQLite uses a single shared connection; there is no pool to size
+        options.update(pool_size=pool_size, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT)
+
+    new_engine = create_engine(url, **options)
+    if _is_sqlite(url):
+        event.listen(new_engine, "connect", _sqlite_pragmas(read_only))
+    return new_engine
+
+
+# Write engine (and the default session used for anything that writes)
+engine = _make_engine(DATABASE_URL, DB_POOL_SIZE)
+
+# Read engine: its own pool, so chatbot/list reads never queue behind the
+# ChatMessage insert path. An in-memory SQLite DB can't be opened twice, so it shares the write engine.
+if READ_DATABASE_URL == DATABASE_URL and _is_sqlite_memory(DATABASE_URL):
+    read_engine = engine
+else:
+    read_engine = _make_engine(READ_DATABASE_URL, DB_READ_POOL_SIZE, read_only=True)
 
 # Create session
 SessionLocal = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine))
 
-# Initialize tables
+# Read-only session for lookups and list endpoints
+ReadSession = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=read_engine))
+
+
+# ----------------------------------------------------------------------------------------
+# 🧹 Session lifecycle
+#
+# Both registries are thread-local. An HTTP request gets one session per registry,
+# removed by remove_sessions() on app-context teardown (registered in create_app).
+# Agent tools and other helpers wrap their DB work in unit_of_work(): inside a
+# request it shares that request's session; in a graph worker thread it opens one
+# and removes it (closed, connection back in the pool) when the block ends.
+
+@contextmanager
+def unit_of_work(read_only=False):
+    registry = ReadSession if read_only else SessionLocal
+    if registry.registry.has():
+        # Already inside a request / outer unit of work → share its session
+        yield registry()
+        return
+
+    session = registry()
+    try:
+        yield session
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        registry.remove()
+
+
+def remove_sessions(exc=None):
+    SessionLocal.remove()
+    ReadSession.remove()
+
+
+# 📈 Pool / leak gauge
+_checkouts = {}  # (pool name, connection record id) -> monotonic checkout time
+
+
+def _track_pool(name, tracked_engine):
+    @event.listens_for(tracked_engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        _checkouts[(name, id(connection_record))] = time.monotonic()
+
+    @event.listens_for(tracked_engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        _checkouts.pop((name, id(connection_record)), None)
+
+
+ENGINES = {"write": engine} if read_engine is engine else {"write": engine, "read": read_engine}
+for _name, _engine in ENGINES.items():
+    _track_pool(_name, _engine)
+
+
+def pool_stats():
+    """Per-engine pool usage; suspected_leaks counts connections held over DB_LEAK_WARN_SECONDS."""
+    now = time.monotonic()
+    stats = {}
+    for name, tracked_engine in ENGINES.items():
+        pool = tracked_engine.pool
+        held = [now - started for (pool_name, _), started in list(_checkouts.items()) if pool_name == name]
+        stats[name] = {
+            "pool_size": pool.size() if hasattr(pool, "size") else None,
+            "checked_in": pool.checkedin() if hasattr(pool, "checkedin") else None,
+            "overflow": pool.overflow() if hasattr(pool, "overflow") else None,
+            "checked_out": len(held),
+            "longest_held_seconds": round(max(held, default=0.0), 3),
+            "suspected_leaks": sum(1 for seconds in held if seconds > DB_LEAK_WARN_SECONDS),
+        }
+    return stats
+
+
+# Initialize tables, then upgrade older databases in place
 def init_db():
     Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
     print("✅ Database initialized and session is ready.")
-
-
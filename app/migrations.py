@@ -0,0 +1,91 @@
+"""
+Versioned schema migrations for databases created before a model change.
+
+init_db() runs create_all() (which only creates *missing tables*) and then
+run_migrations(), which applies every migration not yet recorded in the
+schema_migrations table, each in its own transaction. To change the schema,
+append a new (version, description, function) entry to MIGRATIONS — never
+edit or reorder entries that have already shipped.
+"""
+from datetime import datetime
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+
+def _blank(value):
+    return value is None or value.strip() in ("", "''", '""', "None")
+
+
+def _join(values, sep):
+    seen = []
+    for value in values:
+        if not _blank(value) and value not in seen:
+            seen.append(value)
+    return sep.join(seen)
+
+
+def _merge_duplicate_daily_updates(conn):
+    # Older chatbot builds saved several updates per user per day; fold them into
+    # the earliest row so (user_id, date) can become unique without losing text
+    groups = conn.execute(text(
+        "SELECT user_id, date FROM daily_updates GROUP BY user_id, date HAVING COUNT(*) > 1"
+    )).fetchall()
+
+    for user_id, day in groups:
+        rows = conn.execute(text(
+            "SELECT id, title, work_done, reference_link, comment, task_id FROM daily_updates "
+            "WHERE user_id = :user_id AND date = :day ORDER BY id"
+        ), {"user_id": user_id, "day": day}).fetchall()
+
+        keep = rows[0]
+        conn.execute(text(
+            "UPDATE daily_updates SET title = :title, work_done = :work_done, "
+            "reference_link = :reference_link, comment = :comment, task_id = :task_id WHERE id = :id"
+        ), {
+            "id": keep.id,
+            "title": _join([r.title for r in rows], "; ") or keep.title,
+            "work_done": _join([r.work_done for r in rows], "\n\n") or keep.work_done,
+            "reference_link": _join([r.reference_link for r in rows], "\n") or None,
+            "comment": _join([r.comment for r in rows], "\n") or None,
+            "task_id": next((r.task_id for r in rows if r.task_id), None),
+        })
+        conn.execute(text("DELETE FROM daily_updates WHERE user_id = :user_id AND date = :day AND id != :id"),
+                     {"user_id": user_id, "day": day, "id": keep.id})
+        print(f"🛠️ Merged {len(rows)} daily updates for user {user_id} on {day}")
+
+
+def _m001_hot_query_indexes(conn):
+    _merge_duplicate_daily_updates(conn)
+    conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS uq_daily_updates_user_date ON daily_updates (user_id, date)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_chat_messages_user_timestamp ON chat_messages (user_id, timestamp)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_chat_messages_session_id ON chat_messages (session_id, id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_tasks_assignee_due ON tasks (assigned_to_id, due_date)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_users_team_role ON users (team, role)"))
+
+
+MIGRATIONS = [
+    (1, "Indexes for hot lookups; one daily update per user per day", _m001_hot_query_indexes),
+]
+
+
+def run_migrations(engine):
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version INTEGER PRIMARY KEY, description VARCHAR NOT NULL, applied_at VARCHAR NOT NULL)"
+        ))
+        applied = {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+    for version, description, migrate in MIGRATIONS:
+        if version in applied:
+            continue
+        try:
+            with engine.begin() as conn:
+                migrate(conn)
+                conn.execute(text(
+                    "INSERT INTO schema_migrations (version, description, applied_at) VALUES (:v, :d, :t)"
+                ), {"v": version, "d": description, "t": datetime.utcnow().isoformat()})
+            print(f"🛠️ Applied migration {version}: {description}")
+        except IntegrityError:
+            # Another worker process applied it first
+            pass
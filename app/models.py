@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, String, Text, Date, ForeignKey, DateTime
+from sqlalchemy import create_engine, Column, Integer, String, Text, Date, ForeignKey, DateTime, Index
 from sqlalchemy.orm import declarative_base, relationship, sessionmaker
 from datetime import date, datetime
 
@@ -18,6 +18,11 @@ class User(Base):
     status = Column(String, default="active")  # 'active', 'inactive', etc.
     pword = Column(String, nullable=False)  # Hashed password ideally
 
+    # Index names must match app/migrations.py, which adds them to older databases
+    __table_args__ = (
+        Index("ix_users_team_role", "team", "role"),  # Team member lists
+    )
+
     # Relationships
     updates = relationship("DailyUpdate", back_populates="user", cascade="all, delete-orphan")
     assigned_tasks = relationship("Task", back_populates="assignee", foreign_keys='Task.assigned_to_id')
@@ -43,6 +48,10 @@ class Task(Base):
     assigner = relationship("User", back_populates="created_tasks", foreign_keys=[assigned_by_id])
     updates = relationship("DailyUpdate", back_populates="task")
 
+    __table_args__ = (
+        Index("ix_tasks_assignee_due", "assigned_to_id", "due_date"),  # Employee task list
+    )
+
 
 class DailyUpdate(Base):
     __tablename__ = 'daily_updates'
@@ -60,6 +69,10 @@ class DailyUpdate(Base):
     user = relationship("User", back_populates="updates")
     task = relationship("Task", back_populates="updates")
 
+    __table_args__ = (
+        Index("uq_daily_updates_user_date", "user_id", "date", unique=True),  # One update per user per day
+    )
+
 class ChatMessage(Base):
     __tablename__ = "chat_messages"
 
@@ -71,3 +84,20 @@ class ChatMessage(Base):
     timestamp = Column(DateTime, default=datetime.utcnow)
 
     user = relationship("User", backref="chat_messages")
+
+    __table_args__ = (
+        Index("ix_chat_messages_user_timestamp", "user_id", "timestamp"),
+        Index("ix_chat_messages_session_id", "session_id", "id"),  # Memory loads after the summary's high-water mark
+    )
+
+class ChatSummary(Base):
+    __tablename__ = "chat_summaries"
+
+    id = Column(Integer, primary_key=True)
+    session_id = Column(String, nullable=False, unique=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    summary = Column(Text, nullable=False, default="")
+    last_message_id = Column(Integer, nullable=False, default=0)  # High-water mark: last ChatMessage.id folded in
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+    user = relationship("User", backref="chat_summaries")
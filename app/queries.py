@@ -0,0 +1,319 @@
+"""
+Read models shared by the routes and agent tools.
+
+Each function takes an open session and returns plain JSON-ready dicts, with
+related rows loaded up front (joinedload / selectinload) so a list endpoint
+costs a fixed number of queries however many rows it returns.
+
+List queries are keyset-paginated: rows come back in a stable order ending in a
+unique column, and `next_cursor` encodes the last row's sort key, so fetching
+page N costs the same as page 1 (no OFFSET scans).
+
+team_compliance() is a fixed set of GROUP BY / anti-join queries over a team,
+so a manager's report doesn't grow with one query per employee or per day.
+"""
+import base64
+import json
+from datetime import date, timedelta
+from sqlalchemy import and_, or_, false, true, func, case, literal, select, union_all, Date
+from sqlalchemy.orm import joinedload, selectinload
+from app.models import User, Task, DailyUpdate
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+MAX_COMPLIANCE_DAYS = 92      # One quarter; also keeps the calendar UNION under SQLite's 500-select limit
+CLOSED_TASK_STATUSES = ["completed"]
+
+
+def _iso(value):
+    return value.strftime("%Y-%m-%d") if value else None
+
+
+# --- Serializers ---
+def user_to_dict(user):
+    return {
+        "id": user.id,
+        "full_name": user.full_name,
+        "email": user.email,
+        "role": user.role,
+        "team": user.team,
+        "status": user.status
+    }
+
+
+def task_to_dict(task):
+    return {
+        "id": task.id,
+        "title": task.title,
+        "description": task.description,
+        "assigned_date": _iso(task.assigned_date),
+        "due_date": _iso(task.due_date),
+        "status": task.status,
+        "assigned_by": task.assigner.full_name if task.assigner else "Unknown"
+    }
+
+
+def daily_update_to_dict(update):
+    return {
+        "id": update.id,
+        "title": update.title,
+        "date": _iso(update.date),
+        "work_done": update.work_done,
+        "reference_link": update.reference_link,
+        "comment": update.comment,
+        "task_id": update.task_id,
+        "task_title": update.task.title if update.task else None
+    }
+
+
+# --- Request arguments (raise ValueError → 400 in the routes) ---
+USER_FIELDS = ["id", "full_name", "email", "role", "team", "status"]
+TASK_FIELDS = ["id", "title", "description", "assigned_date", "due_date", "status", "assigned_by"]
+DAILY_UPDATE_FIELDS = ["id", "title", "date", "work_done", "reference_link", "comment", "task_id", "task_title"]
+
+
+def page_args(args, allowed_fields):
+    """limit / cursor / fields from the query string."""
+    try:
+        limit = int(args.get("limit", DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise ValueError("limit must be a number")
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    fields = None
+    if args.get("fields"):
+        fields = [f.strip() for f in args["fields"].split(",") if f.strip()]
+        unknown = [f for f in fields if f not in allowed_fields]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(allowed_fields)}")
+
+    return {"limit": limit, "cursor": args.get("cursor") or None, "fields": fields}
+
+
+def date_arg(args, name):
+    value = args.get(name)
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid {name}. Use YYYY-MM-DD")
+
+
+# --- Keyset pagination ---
+def _encode_cursor(values):
+    raw = json.dumps([v.isoformat() if isinstance(v, date) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor, order):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(order):
+            raise ValueError
+        return [
+            date.fromisoformat(v) if v is not None and isinstance(column.type, Date) else v
+            for v, (column, _, _) in zip(values, order)
+        ]
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+def _after(column, value, descending, nullable):
+    # Rows strictly after `value` in this column's order (NULLs sort last)
+    if value is None:
+        return false()
+    after = column < value if descending else column > value
+    return or_(after, column.is_(None)) if nullable else after
+
+
+def _equal(column, value):
+    return column.is_(None) if value is None else column == value
+
+
+def keyset_page(query, order, serialize, limit, cursor=None, fields=None):
+    """
+    One page of `query`. `order` is a list of (column, descending, nullable)
+    whose last column is unique. Returns {"items": [...], "next_cursor": str or None}.
+    """
+    for column, descending, nullable in order:
+        if nullable:
+            query = query.order_by(column.is_(None))
+        query = query.order_by(column.desc() if descending else column.asc())
+
+    if cursor:
+        values = _decode_cursor(cursor, order)
+        branches = []
+        for i, (column, descending, nullable) in enumerate(order):
+            ties = [_equal(c, v) for (c, _, _), v in zip(order[:i], values[:i])]
+            branches.append(and_(*ties, _after(column, values[i], descending, nullable)))
+        query = query.filter(or_(*branches))
+
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    items = [serialize(row) for row in rows]
+    if fields:
+        items = [{f: item[f] for f in fields} for item in items]
+
+    next_cursor = None
+    if has_more:
+        next_cursor = _encode_cursor([getattr(rows[-1], column.key) for column, _, _ in order])
+    return {"items": items, "next_cursor": next_cursor}
+
+
+# --- Queries ---
+def all_users(db, page, status=None, role=None, team=None):
+    query = db.query(User)
+    if status:
+        query = query.filter(User.status == status)
+    if role:
+        query = query.filter(User.role == role)
+    if team:
+        query = query.filter(User.team == team)
+    return keyset_page(query, [(User.id, False, False)], user_to_dict, **page)
+
+
+def team_employees(db, team, page, status=None):
+    # Served by ix_users_team_role; full_name is unique, so it is a complete sort key
+    query = db.query(User).filter(User.team == team, User.role == "employee")
+    if status:
+        query = query.filter(User.status == status)
+    return keyset_page(query, [(User.full_name, False, False)], user_to_dict, **page)
+
+
+def count_team_employees(db, team, status=None):
+    query = db.query(func.count(User.id)).filter(User.team == team, User.role == "employee")
+    if status:
+        query = query.filter(User.status == status)
+    return query.scalar()
+
+
+def employee_tasks(db, user_id, page, status=None, due_from=None, due_to=None):
+    # task → assigner in the same SELECT (was one extra query per task); tasks without a due date come last
+    query = db.query(Task)\
+        .options(joinedload(Task.assigner))\
+        .filter(Task.assigned_to_id == user_id)
+    if status:
+        query = query.filter(Task.status == status)
+    if due_from:
+        query = query.filter(Task.due_date >= due_from)
+    if due_to:
+        query = query.filter(Task.due_date <= due_to)
+    return keyset_page(query, [(Task.due_date, False, True), (Task.id, False, False)], task_to_dict, **page)
+
+
+def employee_daily_updates(db, user_id, page, date_from=None, date_to=None):
+    # update → task in one extra IN (...) query per page; newest first
+    query = db.query(DailyUpdate)\
+        .options(selectinload(DailyUpdate.task))\
+        .filter(DailyUpdate.user_id == user_id)
+    if date_from:
+        query = query.filter(DailyUpdate.date >= date_from)
+    if date_to:
+        query = query.filter(DailyUpdate.date <= date_to)
+    order = [(DailyUpdate.date, True, False), (DailyUpdate.id, True, False)]
+    return keyset_page(query, order, daily_update_to_dict, **page)
+
+
+def daily_update_for(db, full_name, day):
+    """(user, update) for an employee's update on `day` in one joined query; update may be None."""
+    row = db.query(User, DailyUpdate)\
+        .outerjoin(DailyUpdate, (DailyUpdate.user_id == User.id) & (DailyUpdate.date == day))\
+        .filter(User.full_name == full_name)\
+        .order_by(DailyUpdate.id.desc())\
+        .first()
+    return (row[0], row[1]) if row else (None, None)
+
+
+# --- Team compliance ---
+def compliance_days(date_from, date_to, workdays_only=True):
+    """The dates an update is expected on, oldest first (Mon-Fri only by default)."""
+    if date_from > date_to:
+        raise ValueError("date_from must be on or before date_to")
+    total = (date_to - date_from).days + 1
+    if total > MAX_COMPLIANCE_DAYS:
+        raise ValueError(f"Date range too long. Maximum is {MAX_COMPLIANCE_DAYS} days")
+    days = [date_from + timedelta(days=i) for i in range(total)]
+    if workdays_only:
+        days = [d for d in days if d.weekday() < 5]
+    return days
+
+
+def _calendar(days):
+    # Expected dates as a derived table: SELECT ? AS day UNION ALL SELECT ? ... (works on any backend)
+    return union_all(*[select(literal(d, Date).label("day")) for d in days]).subquery("calendar")
+
+
+def team_compliance(db, team, date_from, date_to, today, workdays_only=True, status="active"):
+    """
+    Per-employee daily-update compliance and task load for a team, in four queries:
+    the roster, update counts, missing (employee, day) pairs, and task counts.
+    """
+    days = compliance_days(date_from, date_to, workdays_only)
+
+    # 1️⃣ Roster (ix_users_team_role)
+    roster = db.query(User.id, User.full_name, User.status)\
+        .filter(User.team == team, User.role == "employee")
+    if status:
+        roster = roster.filter(User.status == status)
+    employees = roster.order_by(User.full_name).all()
+    if not employees:
+        return []
+    ids = [e.id for e in employees]
+
+    # 2️⃣ Submissions in range + last update ever, one GROUP BY (uq_daily_updates_user_date)
+    in_range = and_(DailyUpdate.date >= date_from, DailyUpdate.date <= date_to)
+    submitted = {
+        row.user_id: row
+        for row in db.query(
+            DailyUpdate.user_id,
+            func.sum(case((in_range, 1), else_=0)).label("submitted"),
+            func.max(DailyUpdate.date).label("last_update")
+        ).filter(DailyUpdate.user_id.in_(ids)).group_by(DailyUpdate.user_id)
+    }
+
+    # 3️⃣ Missing days: employees × calendar, anti-joined against daily_updates
+    missing = {user_id: [] for user_id in ids}
+    if days:
+        calendar = _calendar(days)
+        rows = db.query(User.id, calendar.c.day)\
+            .select_from(User)\
+            .join(calendar, true())\
+            .outerjoin(DailyUpdate, and_(DailyUpdate.user_id == User.id, DailyUpdate.date == calendar.c.day))\
+            .filter(User.id.in_(ids), DailyUpdate.id.is_(None))\
+            .order_by(User.id, calendar.c.day)
+        for user_id, day in rows:
+            missing[user_id].append(day)
+
+    # 4️⃣ Open / overdue tasks per assignee (ix_tasks_assignee_due)
+    is_open = Task.status.notin_(CLOSED_TASK_STATUSES)
+    tasks = {
+        row.assigned_to_id: row
+        for row in db.query(
+            Task.assigned_to_id,
+            func.sum(case((is_open, 1), else_=0)).label("open"),
+            func.sum(case((and_(is_open, Task.due_date < today), 1), else_=0)).label("overdue")
+        ).filter(Task.assigned_to_id.in_(ids)).group_by(Task.assigned_to_id)
+    }
+
+    report = []
+    for employee in employees:
+        updates = submitted.get(employee.id)
+        task_counts = tasks.get(employee.id)
+        missed = missing[employee.id]
+        report.append({
+            "id": employee.id,
+            "full_name": employee.full_name,
+            "status": employee.status,
+            "submitted": int(updates.submitted or 0) if updates else 0,
+            "expected": len(days),
+            "missing": len(missed),
+            "missing_dates": [_iso(d) for d in missed],
+            "compliance": round(100 * (len(days) - len(missed)) / len(days), 1) if days else 100.0,
+            "last_update": _iso(updates.last_update) if updates else None,
+            "open_tasks": int(task_counts.open or 0) if task_counts else 0,
+            "overdue_tasks": int(task_counts.overdue or 0) if task_counts else 0
+        })
+    return report
@@ -1,13 +1,23 @@
-from flask import Blueprint, render_template, request, redirect, session, flash, url_for, jsonify
+from flask import Blueprint, render_template, request, redirect, session, flash, url_for, jsonify, current_app, Response, send_file
 from flask_cors import cross_origin, CORS
-from langchain_core.messages import HumanMessage
-from app.agents.graph import chatbot_agent  # This is your compiled LangGraph agent
-from app.agents.state import AgentState     # Your shared agent state structure
+from app.agents.loader import get_agents  # Compiled LangGraph agents, loaded on first chatbot use
 from flask import render_template
 from app.models import User, DailyUpdate, Task  # Add Task to imports
-from app.database import SessionLocal
-from datetime import date
+from app.database import SessionLocal, ReadSession, pool_stats
+from app.utils.metrics import registry as metrics_registry  # Prometheus text for /metrics
+from app.utils import profiling  # Stored request profiles for the admin endpoints
+from app import queries  # Eager-loading read models shared with the agent tools
+from app.user_import import validate_new_user, import_users, iter_csv, iter_ndjson
+from app.utils.name_index import employee_index  # In-memory name lookup used by the chatbot
+from app.agents.state_helper import invalidate_session_user
+from app.agents.chat_sessions import chat_sessions  # Chat session ids + recent-message windows
+from app.utils.http_cache import conditional_get, tasks_key, updates_key, team_key, compliance_key, bump_user_changed, bump_updates, USERS_KEY  # ETag / 304 for polled endpoints
+from app.utils.date import get_sri_lanka_date
+from datetime import date, timedelta
+from sqlalchemy.exc import IntegrityError
 from werkzeug.security import check_password_hash  # Optional for future hashed passwords
+import asyncio
+import json
 import os 
 
 print("GEMINI_API_KEY:", os.getenv("GEMINI_API_KEY"))  # Debugging line to check if the key is set
@@ -54,8 +64,6 @@ def login():
             
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
 
 # check user session
 @main.route("/api/user", methods=["GET", "OPTIONS"])
@@ -107,61 +115,31 @@ def add_user():
     
     try:
         data = request.get_json()
-        full_name = data.get("full_name")
-        email = data.get("email")
-        password = data.get("password")
-        role = data.get("role")
-        status = data.get("status")
-        team = data.get("team")  # Optional field
-        
-        # Validate required fields
-        if not all([full_name, email, password, role, status]):
-            return jsonify({"error": "All fields are required (full_name, email, password, role, status)"}), 400
         
-        # Validate role
-        valid_roles = ["admin", "manager", "employee"]
-        if role not in valid_roles:
-            return jsonify({"error": f"Invalid role. Must be one of: {', '.join(valid_roles)}"}), 400
-        
-        # Validate status
-        valid_statuses = ["active", "inactive"]
-        if status not in valid_statuses:
-            return jsonify({"error": f"Invalid status. Must be one of: {', '.join(valid_statuses)}"}), 400
-        
-        # Split full name into first and last name
-        name_parts = full_name.strip().split()
-        if len(name_parts) < 2:
-            return jsonify({"error": "Full name must contain at least first and last name"}), 400
-        
-        f_name = name_parts[0]
-        l_name = " ".join(name_parts[1:])  # Join remaining parts as last name
+        # Same rules as the bulk import (app/user_import.py)
+        error, values = validate_new_user(data)
+        if error:
+            return jsonify({"error": error}), 400
         
         db = SessionLocal()
         
         # Check if email already exists
-        existing_user = db.query(User).filter(User.email == email).first()
+        existing_user = db.query(User).filter(User.email == values["email"]).first()
         if existing_user:
             return jsonify({"error": "Email already exists"}), 409
         
         # Check if full name already exists
-        existing_full_name = db.query(User).filter(User.full_name == full_name).first()
+        existing_full_name = db.query(User).filter(User.full_name == values["full_name"]).first()
         if existing_full_name:
             return jsonify({"error": "Full name already exists"}), 409
         
         # Create new user
-        new_user = User(
-            f_name=f_name,
-            l_name=l_name,
-            full_name=full_name,
-            email=email,
-            pword=password,  # In production, hash this password
-            role=role,
-            team=team,
-            status=status
-        )
+        new_user = User(**values)
         
         db.add(new_user)
         db.commit()
+        employee_index.invalidate()  # New name for the chatbot's employee lookup
+        bump_user_changed(new_user.team)
         
         return jsonify({
             "message": "User created successfully",
@@ -177,12 +155,64 @@ def add_user():
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
+
+# Bulk import users API endpoint - Admin only
+# Body: CSV (text/csv, header full_name,email,password,role,status,team) or
+# NDJSON (application/x-ndjson, one object per line), or either as a multipart "file" upload.
+@main.route("/api/admin/import-users", methods=["POST", "OPTIONS"])
+@cross_origin(origins=["http://localhost:3000"], supports_credentials=True)
+def import_users_api():
+    if request.method == "OPTIONS":
+        return jsonify({}), 200
+    
+    # Check if user is admin
+    if session.get("role") != "admin":
+        return jsonify({"error": "Unauthorized access"}), 403
+    
+    try:
+        upload = request.files.get("file")
+        if upload:
+            stream, hint = upload.stream, (upload.filename or "").lower()
+        else:
+            stream, hint = request.stream, request.mimetype
+        
+        # ?format=csv|ndjson overrides the content type / file extension
+        fmt = request.args.get("format")
+        if not fmt:
+            if "ndjson" in hint or "jsonl" in hint:
+                fmt = "ndjson"
+            elif "csv" in hint:
+                fmt = "csv"
+        if fmt not in ("csv", "ndjson"):
+            return jsonify({"error": "Send CSV (text/csv) or NDJSON (application/x-ndjson)"}), 415
+        
+        rows = iter_csv(stream) if fmt == "csv" else iter_ndjson(stream)
+        
+        db = SessionLocal()
+        report, teams = import_users(db, rows)
+        
+        if teams:
+            employee_index.invalidate()  # New names for the chatbot's employee lookup
+            for team in teams:
+                bump_user_changed(team)
+        
+        created = sum(1 for entry in report if entry["status"] == "created")
+        only_errors = request.args.get("report") == "errors"
+        
+        return jsonify({
+            "total": len(report),
+            "created": created,
+            "failed": len(report) - created,
+            "results": [entry for entry in report if not only_errors or entry["status"] == "error"]
+        }), 200
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
 # Get all users API endpoint
 @main.route("/api/admin/users", methods=["GET", "OPTIONS"])
 @cross_origin(origins=["http://localhost:3000"], supports_credentials=True)
+@conditional_get(lambda: [USERS_KEY])
 def get_all_users():
     if request.method == "OPTIONS":
         return jsonify({}), 200
@@ -192,28 +222,26 @@ def get_all_users():
         return jsonify({"error": "Unauthorized access"}), 403
     
     try:
-        db = SessionLocal()
-        users = db.query(User).all()
-        
-        users_list = []
-        for user in users:
-            users_list.append({
-                "id": user.id,
-                "full_name": user.full_name,
-                "email": user.email,
-                "role": user.role,
-                "team": user.team,
-                "status": user.status
-            })
+        db = ReadSession()
+        
+        # ?limit=&cursor=&fields=id,full_name&status=&role=&team=
+        page = queries.all_users(
+            db,
+            queries.page_args(request.args, queries.USER_FIELDS),
+            status=request.args.get("status"),
+            role=request.args.get("role"),
+            team=request.args.get("team")
+        )
         
         return jsonify({
-            "users": users_list
+            "users": page["items"],
+            "next_cursor": page["next_cursor"]
         }), 200
         
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
 
 
 
@@ -224,7 +252,7 @@ def manager_dashboard():
     if session.get("role") != "manager":
         return "Unauthorized", 403
 
-    db = SessionLocal()
+    db = ReadSession()
     team = session.get("team")
 
     employees = db.query(User).filter(
@@ -242,11 +270,13 @@ def chatbot():
 
 
 @main.route("/get", methods=["GET", "POST"])
-def chat():
+async def chat():
     msg = request.form.get("msg")
     if not msg:
         return "No message received."
     
+    from langchain_core.messages import HumanMessage  # Deferred with the agent stack (app/agents/loader.py)
+
     user_input = msg
     user_role = session.get("role", "employee")  # Default to employee if no role
     print(f"[LEGACY CHAT] {user_role.upper()} User: {user_input}")
@@ -258,13 +288,17 @@ def chat():
         "retrieved_data": "",
         "user_role": user_role,
         "session_user_id": session.get("user_id"),  # Changed to session_user_id
-        "team": session.get("team")
+        "team": session.get("team"),
+        "chat_session_id": chat_session_for(session, {})
     }
+    session["chat_session_id"] = initial_state["chat_session_id"]
 
     try:
         # Use the same role-aware chatbot as your API endpoints
-        final_state = chatbot_agent.invoke(initial_state)
+        _, async_chatbot_agent = await asyncio.to_thread(get_agents)
+        final_state = await async_chatbot_agent.ainvoke(initial_state)
         response = final_state.get("retrieved_data", "⚠️ No data returned.")
+        await asyncio.to_thread(save_bot_reply, initial_state, response)
         print(f"[LEGACY CHAT] Bot Response: {response}")
         return response
 
@@ -275,6 +309,7 @@ def chat():
 # Get manager team members API endpoint
 @main.route("/api/manager/team-members", methods=["GET", "OPTIONS"])
 @cross_origin(origins=["http://localhost:3000"], supports_credentials=True)
+@conditional_get(lambda: [team_key(session.get("team"))])
 def get_manager_team_members():
     if request.method == "OPTIONS":
         return jsonify({}), 200
@@ -289,35 +324,80 @@ def get_manager_team_members():
         if not manager_team:
             return jsonify({"error": "Manager team not found"}), 400
         
-        db = SessionLocal()
+        db = ReadSession()
 
-        # Get all employees in the same team as the manager
-        employees = db.query(User).filter(
-            User.team == manager_team,
-            User.role == "employee"
-        ).order_by(User.full_name).all()
-
-        employees_list = []
-        for employee in employees:
-            employees_list.append({
-                "id": employee.id,
-                "full_name": employee.full_name,
-                "email": employee.email,
-                "role": employee.role,
-                "team": employee.team,
-                "status": employee.status
-            })
+        # Get the employees in the same team as the manager, one page at a time
+        status = request.args.get("status")
+        page = queries.team_employees(
+            db, manager_team, queries.page_args(request.args, queries.USER_FIELDS), status=status
+        )
 
         return jsonify({
-            "employees": employees_list,
+            "employees": page["items"],
             "team": manager_team,
-            "total_count": len(employees_list)
+            "total_count": queries.count_team_employees(db, manager_team, status=status),
+            "next_cursor": page["next_cursor"]
         }), 200
     
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# Team compliance report for managers: who submitted daily updates, which days are missing, task load
+@main.route("/api/manager/team-compliance", methods=["GET", "OPTIONS"])
+@cross_origin(origins=["http://localhost:3000"], supports_credentials=True)
+@conditional_get(lambda: [
+    team_key(session.get("team")),
+    compliance_key(session.get("team")),
+    ("today", get_sri_lanka_date().isoformat())  # "overdue" and the default range move at midnight
+])
+def get_team_compliance():
+    if request.method == "OPTIONS":
+        return jsonify({}), 200
+
+    # Check if user is manager
+    if session.get("role") != "manager":
+        return jsonify({"error": "Unauthorized access"}), 403
+
+    try:
+        manager_team = session.get("team")
+
+        if not manager_team:
+            return jsonify({"error": "Manager team not found"}), 400
+
+        # Default range: the last 7 days including today (Sri Lanka time)
+        today = get_sri_lanka_date()
+        date_to = queries.date_arg(request.args, "date_to") or today
+        date_from = queries.date_arg(request.args, "date_from") or date_to - timedelta(days=6)
+        workdays_only = request.args.get("workdays_only", "1") != "0"
+        status = request.args.get("status", "active")
+        if status == "all":
+            status = None
+
+        db = ReadSession()
+        employees = queries.team_compliance(
+            db, manager_team, date_from, date_to, today, workdays_only=workdays_only, status=status
+        )
+
+        return jsonify({
+            "team": manager_team,
+            "date_from": date_from.isoformat(),
+            "date_to": date_to.isoformat(),
+            "workdays_only": workdays_only,
+            "employees": employees,
+            "summary": {
+                "employees": len(employees),
+                "fully_compliant": sum(1 for e in employees if e["missing"] == 0),
+                "average_compliance": round(sum(e["compliance"] for e in employees) / len(employees), 1) if employees else None,
+                "overdue_tasks": sum(e["overdue_tasks"] for e in employees)
+            }
+        }), 200
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
 
 # ----------------------------------------------------------------------------------------
 # Update user status API endpoint - Admin only
@@ -351,6 +431,9 @@ def update_user_status_api(user_id):
         
         user.status = new_status
         db.commit()
+        employee_index.invalidate()  # Only active users are matchable
+        invalidate_session_user(user_id)  # Chatbot's cached identity for this user
+        bump_user_changed(user.team)
         
         return jsonify({
             "message": f"Status for {user.full_name} updated to {new_status}",
@@ -366,8 +449,66 @@ def update_user_status_api(user_id):
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
+
+# DB connection pool gauge - Admin only
+@main.route("/api/admin/db-pool", methods=["GET", "OPTIONS"])
+@cross_origin(origins=["http://localhost:3000"], supports_credentials=True)
+def db_pool_api():
+    if request.method == "OPTIONS":
+        return jsonify({}), 200
+    
+    # Check if user is admin
+    if session.get("role") != "admin":
+        return jsonify({"error": "Unauthorized access"}), 403
+    
+    # checked_out that never drops back / suspected_leaks > 0 → a session isn't being released
+    return jsonify({"pools": pool_stats()}), 200
+
+# Prometheus scrape endpoint (set METRICS_TOKEN to require "Authorization: Bearer <token>")
+@main.route("/metrics", methods=["GET"])
+def metrics():
+    token = os.getenv("METRICS_TOKEN")
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return jsonify({"error": "Unauthorized access"}), 403
+
+    return Response(metrics_registry.render(), mimetype="text/plain; version=0.0.4")
+
+# Request profiles - Admin only
+# Profile a request by sending it with "X-Profile: 1" (or "cprofile" / "sample") while logged in as admin
+@main.route("/api/admin/profiles", methods=["GET", "OPTIONS"])
+@cross_origin(origins=["http://localhost:3000"], supports_credentials=True)
+def list_profiles_api():
+    if request.method == "OPTIONS":
+        return jsonify({}), 200
+
+    # Check if user is admin
+    if session.get("role") != "admin":
+        return jsonify({"error": "Unauthorized access"}), 403
+
+    return jsonify({"profiles": profiling.list_profiles()}), 200
+
+
+@main.route("/api/admin/profiles/<profile_id>", methods=["GET", "OPTIONS"])
+@cross_origin(origins=["http://localhost:3000"], supports_credentials=True)
+def download_profile_api(profile_id):
+    if request.method == "OPTIONS":
+        return jsonify({}), 200
+
+    # Check if user is admin
+    if session.get("role") != "admin":
+        return jsonify({"error": "Unauthorized access"}), 403
+
+    path = profiling.profile_path(profile_id)
+    if not path:
+        return jsonify({"error": "Profile not found"}), 404
+
+    # ?format=text → top functions by cumulative time, readable in the browser (pstats only)
+    if request.args.get("format") == "text" and path.endswith(".pstats"):
+        return Response(profiling.pstats_text(path), mimetype="text/plain")
+
+    mimetype = "application/octet-stream" if path.endswith(".pstats") else "text/plain"
+    return send_file(os.path.abspath(path), mimetype=mimetype, as_attachment=True,
+                     download_name=os.path.basename(path))
 
 # Submit Daily Update API endpoint - Employee only
 @main.route("/api/employee/submit-daily-update", methods=["POST", "OPTIONS"])
@@ -444,7 +585,13 @@ def submit_daily_update():
         )
         
         db.add(daily_update)
-        db.commit()
+        try:
+            db.commit()
+        except IntegrityError:
+            # Lost a race with a concurrent submission for the same day
+            db.rollback()
+            return jsonify({"error": "Daily update already submitted for this date"}), 409
+        bump_updates(user_id, user.team)
         
         return jsonify({
             "message": "Daily update submitted successfully",
@@ -461,12 +608,11 @@ def submit_daily_update():
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
 
 # Get Employee Daily Updates API endpoint
 @main.route("/api/employee/daily-updates", methods=["GET", "OPTIONS"])
 @cross_origin(origins=["http://localhost:3000"], supports_credentials=True)
+@conditional_get(lambda: [updates_key(session.get("user_id"))])
 def get_employee_daily_updates():
     if request.method == "OPTIONS":
         return jsonify({}), 200
@@ -477,37 +623,31 @@ def get_employee_daily_updates():
     
     try:
         user_id = session.get("user_id")
-        db = SessionLocal()
-        
-        # Get all daily updates for this user
-        updates = db.query(DailyUpdate).filter(
-            DailyUpdate.user_id == user_id
-        ).order_by(DailyUpdate.date.desc()).all()
-        
-        updates_list = []
-        for update in updates:
-            updates_list.append({
-                "id": update.id,
-                "title": update.title,
-                "date": update.date.strftime("%Y-%m-%d"),
-                "work_done": update.work_done,
-                "reference_link": update.reference_link,
-                "comment": update.comment,
-                "task_id": update.task_id
-            })
+        db = ReadSession()
+        
+        # Get this user's daily updates, newest first (with their linked task)
+        page = queries.employee_daily_updates(
+            db,
+            user_id,
+            queries.page_args(request.args, queries.DAILY_UPDATE_FIELDS),
+            date_from=queries.date_arg(request.args, "date_from"),
+            date_to=queries.date_arg(request.args, "date_to")
+        )
         
         return jsonify({
-            "daily_updates": updates_list
+            "daily_updates": page["items"],
+            "next_cursor": page["next_cursor"]
         }), 200
         
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
 
 # Get Employee Tasks API endpoint
 @main.route("/api/employee/tasks", methods=["GET", "OPTIONS"])
 @cross_origin(origins=["http://localhost:3000"], supports_credentials=True)
+@conditional_get(lambda: [tasks_key(session.get("user_id"))])
 def get_employee_tasks():
     if request.method == "OPTIONS":
         return jsonify({}), 200
@@ -518,37 +658,91 @@ def get_employee_tasks():
     
     try:
         user_id = session.get("user_id")
-        db = SessionLocal()
-        
-        # Get all tasks assigned to this user
-        tasks = db.query(Task).filter(
-            Task.assigned_to_id == user_id
-        ).order_by(Task.due_date.asc()).all()
-        
-        tasks_list = []
-        for task in tasks:
-            # Get assigner name
-            assigner = db.query(User).get(task.assigned_by_id)
-            assigner_name = assigner.full_name if assigner else "Unknown"
-            
-            tasks_list.append({
-                "id": task.id,
-                "title": task.title,
-                "description": task.description,
-                "assigned_date": task.assigned_date.strftime("%Y-%m-%d") if task.assigned_date else None,
-                "due_date": task.due_date.strftime("%Y-%m-%d") if task.due_date else None,
-                "status": task.status,
-                "assigned_by": assigner_name
-            })
+        db = ReadSession()
+        
+        # Get tasks assigned to this user by due date (assigner joined in, no per-task lookup)
+        page = queries.employee_tasks(
+            db,
+            user_id,
+            queries.page_args(request.args, queries.TASK_FIELDS),
+            status=request.args.get("status"),
+            due_from=queries.date_arg(request.args, "due_from"),
+            due_to=queries.date_arg(request.args, "due_to")
+        )
         
         return jsonify({
-            "tasks": tasks_list
+            "tasks": page["items"],
+            "next_cursor": page["next_cursor"]
         }), 200
         
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
+
+# Chat session for this message: the id the client sent back (or the one in its
+# cookie) while it is live and theirs, a new one otherwise or on `new_session`
+def chat_session_for(user_session, data):
+    requested = data.get("session_id") or user_session.get("chat_session_id")
+    return chat_sessions.resolve(user_session.get("user_id"), requested, new=bool(data.get("new_session")))
+
+
+# Bot replies go through the chat write-behind queue (app/agents/tools/memory.py)
+def save_bot_reply(state, reply):
+    from app.agents.tools.memory import save_bot_reply as save  # Loaded along with the agent graph
+    save(state, reply)
+
+
+# Initial agent state with role context
+def build_initial_state(user_role, user_session, user_input, chat_session_id=None):
+    from langchain_core.messages import HumanMessage  # Deferred with the agent stack (app/agents/loader.py)
+
+    return {
+        "messages": [HumanMessage(content=user_input)],
+        "query_type": "",
+        "retrieved_data": "",
+        "user_role": user_role,
+        "session_user_id": user_session.get("user_id"),
+        "team": user_session.get("team"),
+        "chat_session_id": chat_session_id
+    }
+
+
+# Shared chatbot runner - awaited natively by the ASGI entry (app/asgi.py),
+# driven through Flask's ensure_sync by the WSGI routes below
+async def run_chatbot(user_role, user_session, user_input, data=None):
+    label = f"{user_role.upper()} CHATBOT"
+
+    if not user_input:
+        return {"error": "Message is required"}, 400
+
+    print(f"[{label}] User: {user_session.get('full_name')} - Input: {user_input}")
+    chat_session_id = await asyncio.to_thread(chat_session_for, user_session, data or {})
+    initial_state = build_initial_state(user_role, user_session, user_input, chat_session_id)
+
+    try:
+        # same role-aware chatbot for every role (graphs load on the first chat)
+        _, async_chatbot_agent = await asyncio.to_thread(get_agents)
+        final_state = await async_chatbot_agent.ainvoke(initial_state)
+
+        response = final_state.get("retrieved_data", "⚠️ No data returned.")
+        print(f"[{label}] Bot Response: {response}")
+        await asyncio.to_thread(save_bot_reply, initial_state, response)
+
+        return {
+            "success": True,
+            "response": response,
+            "session_id": chat_session_id
+        }, 200
+
+    except Exception as e:
+        print(f"[{label} ERROR] {e}")
+        return {
+            "success": False,
+            "error": f"Chatbot error: {str(e)}",
+            "session_id": chat_session_id
+        }, 500
+
 
 # Manager Chatbot API endpoint
 @main.route("/api/manager/chatbot", methods=["POST", "OPTIONS"])
@@ -560,43 +754,12 @@ def manager_chatbot_api():
     # Check if user is manager
     if session.get("role") != "manager":
         return jsonify({"error": "Unauthorized access"}), 403
-    
-    try:
-        data = request.get_json()
-        user_input = data.get("message")
-        
-        if not user_input:
-            return jsonify({"error": "Message is required"}), 400
-        
-        print(f"[MANAGER CHATBOT] User: {session.get('full_name')} - Input: {user_input}")
-
-        # Initial state with role context - FIXED the field name
-        initial_state = {
-            "messages": [HumanMessage(content=user_input)],
-            "query_type": "",
-            "retrieved_data": "",
-            "user_role": "manager",
-            "session_user_id": session.get("user_id"),  # Changed to session_user_id
-            "team": session.get("team")
-        }
-
-        # Use the single role-aware chatbot
-        final_state = chatbot_agent.invoke(initial_state)
-
-        response = final_state.get("retrieved_data", "⚠️ No data returned.")
-        print(f"[MANAGER CHATBOT] Bot Response: {response}")
-        
-        return jsonify({
-            "success": True,
-            "response": response
-        }), 200
 
-    except Exception as e:
-        print(f"[MANAGER CHATBOT ERROR] {e}")
-        return jsonify({
-            "success": False,
-            "error": f"Chatbot error: {str(e)}"
-        }), 500
+    data = request.get_json(silent=True) or {}
+    payload, status = current_app.ensure_sync(run_chatbot)("manager", session, data.get("message"), data)
+    if payload.get("session_id"):
+        session["chat_session_id"] = payload["session_id"]
+    return jsonify(payload), status
 
 # Employee chatbot API endpoint
 @main.route("/api/employee/chatbot", methods=["POST", "OPTIONS"])
@@ -608,43 +771,12 @@ def employee_chatbot_api():
     # Check if user is employee
     if session.get("role") != "employee":
         return jsonify({"error": "Unauthorized access"}), 403
-    
-    try:
-        data = request.get_json()
-        user_input = data.get("message")
-
-        if not user_input:
-            return jsonify({"error": "Message is required"}), 400
-        
-        print(f"[EMPLOYEE CHATBOT] User: {session.get('full_name')} - Input: {user_input}")
-
-        # Initial state with employee role context - FIXED the field name
-        initial_state = {
-            "messages": [HumanMessage(content=user_input)],
-            "query_type": "",
-            "retrieved_data": "",
-            "user_role": "employee",
-            "session_user_id": session.get("user_id"),  # Changed to session_user_id
-            "team": session.get("team")
-        }
 
-        # same chatbot with employee context
-        final_state = chatbot_agent.invoke(initial_state)
-
-        response = final_state.get("retrieved_data", "⚠️ No data returned.")
-        print(f"[EMPLOYEE CHATBOT] Bot Response: {response}")
-
-        return jsonify({
-            "success": True,
-            "response": response
-        }), 200
-    
-    except Exception as e:
-        print(f"[EMPLOYEE CHATBOT ERROR] {e}")
-        return jsonify({
-            "success": False,
-            "error": f"Chatbot error: {str(e)}"
-        }), 500
+    data = request.get_json(silent=True) or {}
+    payload, status = current_app.ensure_sync(run_chatbot)("employee", session, data.get("message"), data)
+    if payload.get("session_id"):
+        session["chat_session_id"] = payload["session_id"]
+    return jsonify(payload), status
     
 # Admin chatbot API endpoint
 @main.route("/api/admin/chatbot", methods=["POST", "OPTIONS"])
@@ -656,44 +788,102 @@ def admin_chatbot_api():
     # check if user is admin
     if session.get("role") != "admin":
         return jsonify({"error": "Unauthorized access"}), 403
+
+    data = request.get_json(silent=True) or {}
+    payload, status = current_app.ensure_sync(run_chatbot)("admin", session, data.get("message"), data)
+    if payload.get("session_id"):
+        session["chat_session_id"] = payload["session_id"]
+    return jsonify(payload), status
     
+# -----------------------------------------------------------------------------
+# Streaming chatbot (Server-Sent Events)
+#
+#   event: node   data: {"node": "classify_query"}     a graph node started
+#   event: token  data: {"text": "..."}                reply tokens as Gemini streams them
+#   event: done   data: {"success": true, "response": "...", "session_id": "..."}   full final reply
+#   event: error  data: {"success": false, "error": "..."}
+#
+# Tokens cover the LLM-written part of the reply; the `done` payload is authoritative.
+CHATBOT_ROLES = ["admin", "manager", "employee"]
+STREAM_MODES = ["tasks", "custom", "updates"]
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _chatbot_event(mode, chunk, final):
+    # Maps one graph stream item to an (event, data) pair, or None to skip it
+    if mode == "tasks" and "input" in chunk and chunk["name"] != "join":
+        return "node", {"node": chunk["name"]}
+    if mode == "custom" and isinstance(chunk, dict) and chunk.get("token"):
+        return "token", {"text": chunk["token"]}
+    if mode == "updates":
+        for update in chunk.values():
+            if isinstance(update, dict) and update.get("retrieved_data"):
+                final["response"] = update["retrieved_data"]
+    return None
+
+
+def chatbot_events(initial_state):
+    final = {"response": "⚠️ No data returned."}
     try:
-        data = request.get_json()
-        user_input = data.get("message")
+        chatbot_agent, _ = get_agents()
+        for mode, chunk in chatbot_agent.stream(initial_state, stream_mode=STREAM_MODES):
+            event = _chatbot_event(mode, chunk, final)
+            if event:
+                yield event
+        save_bot_reply(initial_state, final["response"])
+        yield "done", {"success": True, "response": final["response"], "session_id": initial_state["chat_session_id"]}
+    except Exception as e:
+        print(f"[CHATBOT STREAM ERROR] {e}")
+        yield "error", {"success": False, "error": f"Chatbot error: {str(e)}"}
 
-        if not user_input:
-            return jsonify({"error": "Message is required"}), 400
-        
-        print(f"[ADMIN CHATBOT] User: {session.get('full_name')} - Input: {user_input}")
 
-        # Initial state with admin role context - FIXED the field name
-        initial_state = {
-            "messages": [HumanMessage(content=user_input)],
-            "query_type": "",
-            "retrieved_data": "",
-            "user_role": "admin",
-            "session_user_id": session.get("user_id"),  # Changed to session_user_id
-            "team": session.get("team")
-        }
+async def achatbot_events(initial_state):
+    final = {"response": "⚠️ No data returned."}
+    try:
+        _, async_chatbot_agent = await asyncio.to_thread(get_agents)
+        async for mode, chunk in async_chatbot_agent.astream(initial_state, stream_mode=STREAM_MODES):
+            event = _chatbot_event(mode, chunk, final)
+            if event:
+                yield event
+        await asyncio.to_thread(save_bot_reply, initial_state, final["response"])
+        yield "done", {"success": True, "response": final["response"], "session_id": initial_state["chat_session_id"]}
+    except Exception as e:
+        print(f"[CHATBOT STREAM ERROR] {e}")
+        yield "error", {"success": False, "error": f"Chatbot error: {str(e)}"}
 
-        # same chatbot with admin context
-        final_state = chatbot_agent.invoke(initial_state)
 
-        response = final_state.get("retrieved_data", "⚠️ No data returned.")
-        print(f"[ADMIN CHATBOT] Bot Response: {response}")
+@main.route("/api/<role>/chatbot/stream", methods=["POST", "OPTIONS"])
+@cross_origin(origins=["http://localhost:3000"], supports_credentials=True)
+def chatbot_stream_api(role):
+    if request.method == "OPTIONS":
+        return jsonify({}), 200
+
+    # Role in the URL must match the logged-in user
+    if role not in CHATBOT_ROLES or session.get("role") != role:
+        return jsonify({"error": "Unauthorized access"}), 403
+
+    data = request.get_json(silent=True) or {}
+    user_input = data.get("message")
+    if not user_input:
+        return jsonify({"error": "Message is required"}), 400
+
+    print(f"[{role.upper()} CHATBOT STREAM] User: {session.get('full_name')} - Input: {user_input}")
+    session["chat_session_id"] = chat_session_for(session, data)
+    initial_state = build_initial_state(role, session, user_input, session["chat_session_id"])
+
+    def generate():
+        for event, payload in chatbot_events(initial_state):
+            yield sse_event(event, payload)
+
+    return Response(generate(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"  # stop nginx from buffering the stream
+    })
+
 
-        return jsonify({
-            "success": True,
-            "response": response
-        }), 200
-    
-    except Exception as e:
-        print(f"[ADMIN CHATBOT ERROR] {e}")
-        return jsonify({
-            "success": False,
-            "error": f"Chatbot error: {str(e)}"
-        }), 500
-    
 # legacy chatbot endpoint
 
 
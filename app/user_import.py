@@ -0,0 +1,178 @@
+"""
+User validation shared by /api/admin/add-user and the bulk import endpoint.
+
+import_users() streams rows (CSV or NDJSON), validates each with the same rules
+as add-user, checks email / full_name uniqueness a chunk at a time with two
+IN (...) queries, and inserts each chunk in one transaction.
+"""
+import csv
+import io
+import json
+import os
+
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+from app.models import User
+
+VALID_ROLES = ["admin", "manager", "employee"]
+VALID_STATUSES = ["active", "inactive"]
+TEXT_FIELDS = ["full_name", "email", "password", "role", "status", "team"]
+JSON_TYPES = {dict: "object", list: "array", str: "string", int: "number", float: "number", bool: "boolean", type(None): "null"}
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "500"))
+
+
+def validate_new_user(data):
+    """Returns (error, None) or (None, column values for a new User)."""
+    if not isinstance(data, dict):
+        return f"Each row must be an object with the user's fields, got {JSON_TYPES.get(type(data), type(data).__name__)}", None
+
+    # NDJSON rows can hold any JSON type; everything here must be text (or missing)
+    not_text = [field for field in TEXT_FIELDS if data.get(field) is not None and not isinstance(data.get(field), str)]
+    if not_text:
+        return f"Fields must be text: {', '.join(not_text)}", None
+
+    full_name = (data.get("full_name") or "").strip()
+    email = (data.get("email") or "").strip()
+    password = data.get("password")
+    role = data.get("role")
+    status = data.get("status")
+    team = data.get("team") or None  # Optional field
+
+    # Validate required fields
+    if not all([full_name, email, password, role, status]):
+        return "All fields are required (full_name, email, password, role, status)", None
+
+    if role not in VALID_ROLES:
+        return f"Invalid role. Must be one of: {', '.join(VALID_ROLES)}", None
+
+    if status not in VALID_STATUSES:
+        return f"Invalid status. Must be one of: {', '.join(VALID_STATUSES)}", None
+
+    # Split full name into first and last name
+    name_parts = full_name.split()
+    if len(name_parts) < 2:
+        return "Full name must contain at least first and last name", None
+
+    return None, {
+        "f_name": name_parts[0],
+        "l_name": " ".join(name_parts[1:]),  # Join remaining parts as last name
+        "full_name": full_name,
+        "email": email,
+        "pword": password,  # In production, hash this password
+        "role": role,
+        "team": team,
+        "status": status
+    }
+
+
+# --- Streaming parsers: yield (row number, parsed row, parse error or None) ---
+def iter_csv(stream):
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""))
+    for number, row in enumerate(reader, start=1):
+        yield number, row, None
+
+
+def iter_ndjson(stream):
+    number = 0
+    for line in io.TextIOWrapper(stream, encoding="utf-8"):
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            yield number, None, f"Invalid JSON: {e}"
+            continue
+        yield number, data, None
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _insert_chunk(db, valid):
+    """Insert [(number, values)] in one transaction; on a race, fall back to row by row."""
+    try:
+        db.execute(insert(User), [values for _, values in valid])
+        db.commit()
+        return {number: None for number, _ in valid}
+    except IntegrityError:
+        db.rollback()
+
+    results = {}
+    for number, values in valid:
+        try:
+            db.execute(insert(User), [values])
+            db.commit()
+            results[number] = None
+        except IntegrityError:
+            db.rollback()
+            results[number] = "Email or full name already exists"
+    return results
+
+
+def import_users(db, rows, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Import (row number, data, parse error) rows from iter_csv / iter_ndjson.
+    Returns (report, teams) where report is a list of {"row", "status":
+    "created"|"error", "email", "error"?} and teams the teams that gained users.
+    """
+    report = []
+    teams = set()
+    seen_emails, seen_names = set(), set()
+
+    for chunk in _chunks(rows, chunk_size):
+        # 1️⃣ Validate + catch duplicates within the file itself
+        candidates = []
+        for number, data, parse_error in chunk:
+            error, values = (parse_error, None) if parse_error else validate_new_user(data)
+            if not error and values["email"] in seen_emails:
+                error = "Duplicate email in this file"
+            elif not error and values["full_name"] in seen_names:
+                error = "Duplicate full name in this file"
+            if error:
+                email = data.get("email") if isinstance(data, dict) and isinstance(data.get("email"), str) else None
+                report.append({"row": number, "status": "error", "email": email, "error": error})
+                continue
+            seen_emails.add(values["email"])
+            seen_names.add(values["full_name"])
+            candidates.append((number, values))
+
+        if not candidates:
+            continue
+
+        # 2️⃣ Set-based uniqueness check against the table
+        emails = [values["email"] for _, values in candidates]
+        names = [values["full_name"] for _, values in candidates]
+        taken_emails = {e for (e,) in db.query(User.email).filter(User.email.in_(emails))}
+        taken_names = {n for (n,) in db.query(User.full_name).filter(User.full_name.in_(names))}
+
+        valid = []
+        for number, values in candidates:
+            if values["email"] in taken_emails:
+                report.append({"row": number, "status": "error", "email": values["email"], "error": "Email already exists"})
+            elif values["full_name"] in taken_names:
+                report.append({"row": number, "status": "error", "email": values["email"], "error": "Full name already exists"})
+            else:
+                valid.append((number, values))
+
+        # 3️⃣ One transaction per chunk
+        if valid:
+            results = _insert_chunk(db, valid)
+            for number, values in valid:
+                if results[number]:
+                    report.append({"row": number, "status": "error", "email": values["email"], "error": results[number]})
+                else:
+                    report.append({"row": number, "status": "created", "email": values["email"]})
+                    teams.add(values["team"])
+
+    report.sort(key=lambda entry: entry["row"])
+    return report, teams
@@ -1,6 +1,228 @@
-from datetime import datetime
+from datetime import datetime, date, timedelta
+import calendar
+import re
 import pytz
 
 def get_sri_lanka_date():
     colombo_tz = pytz.timezone("Asia/Colombo")
     return datetime.now(colombo_tz).date()
+
+
+# ----------------------------------------------------------------------------------------
+# 📅 Local relative-date parser ("tomorrow", "next Monday", "20 July", "2025-07-20" ...)
+#
+# Resolves the date phrases managers actually type without an LLM call.
+# prefer="future" is for due dates, prefer="past" for looking up updates; it only
+# matters for open-ended phrases like a bare "Monday" or "20 July".
+# "next <weekday>" means that weekday in the following (Mon-Sun) week.
+# A message can name more than one date ("today, due by Friday"): the one after a
+# marker like "by" / "due" / "on" wins, and the tools leave a message whose dates
+# the markers don't settle to the LLM (unambiguous_date).
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+MONTHS = {name.lower(): i for i, name in enumerate(calendar.month_name) if name}
+MONTHS.update({name.lower(): i for i, name in enumerate(calendar.month_abbr) if name})
+MONTHS["sept"] = 9
+
+# Full names plus the unambiguous short forms ("sat"/"sun" are ordinary words)
+_WEEKDAY = r"(monday|tuesday|wednesday|thursday|friday|saturday|sunday|mon|tue|tues|wed|thu|thur|thurs|fri)"
+_MONTH = r"(" + "|".join(sorted(MONTHS, key=len, reverse=True)) + r")\.?"
+_DAY = r"(\d{1,2})(?:st|nd|rd|th)?"
+_NUMBER_WORDS = {"one": 1, "a": 1, "an": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+                 "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10}
+_COUNT = r"(\d+|" + "|".join(_NUMBER_WORDS) + r")"
+
+ISO_RE = re.compile(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b")
+DMY_RE = re.compile(r"\b(\d{1,2})[/.-](\d{1,2})[/.-](\d{4}|\d{2})\b")   # day-first, as used locally
+DM_RE = re.compile(r"\b(\d{1,2})/(\d{1,2})\b")
+DAY_MONTH_RE = re.compile(rf"\b{_DAY}(?:\s+of)?\s+{_MONTH}(?:,?\s+(\d{{4}}))?\b")
+MONTH_DAY_RE = re.compile(rf"\b{_MONTH}\s+{_DAY}(?:,?\s+(\d{{4}}))?\b")
+RELATIVE_DAY_RE = re.compile(r"\b(day after tomorrow|day before yesterday|today|tonight|tomorrow|tmrw|yesterday)\b")
+IN_COUNT_RE = re.compile(rf"\b(?:in|within)\s+{_COUNT}\s+(day|week)s?\b")
+AGO_RE = re.compile(rf"\b{_COUNT}\s+(day|week)s?\s+ago\b")
+WEEKDAY_RE = re.compile(rf"\b(?:(this|next|last|coming|previous|on|by)\s+)?{_WEEKDAY}\b")
+WEEK_RE = re.compile(r"\b(?:(end of (?:the |this )?week|eow)|(next week)|(last week)|(end of (?:the |this )?month|eom))\b")
+
+# Anything that looks like a date phrase; used to tell "no date mentioned" from "couldn't parse"
+DATE_HINT_RE = re.compile(
+    rf"\d|\b{_WEEKDAY}\b|\b(today|tonight|tomorrow|tmrw|yesterday|week|month|ago|day|days|weekend)\b"
+)
+
+
+def _count(word):
+    return int(word) if word.isdigit() else _NUMBER_WORDS[word]
+
+
+def _weekday_index(word):
+    return next(i for i, name in enumerate(WEEKDAYS) if name.startswith(word[:3]))
+
+
+def _safe_date(year, month, day):
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def _month_day(today, month, day, year, prefer):
+    if year:
+        return _safe_date(int(year), month, day)
+    candidate = _safe_date(today.year, month, day)
+    if candidate is None:
+        return None
+    if prefer == "future" and candidate < today:
+        return _safe_date(today.year + 1, month, day)
+    if prefer == "past" and candidate > today:
+        return _safe_date(today.year - 1, month, day)
+    return candidate
+
+
+def _weekday(today, modifier, target, prefer):
+    ahead = (target - today.weekday()) % 7
+    if modifier == "next":
+        # Same weekday in the following Monday-to-Sunday week
+        return today + timedelta(days=7 - today.weekday() + target)
+    if modifier in ("last", "previous"):
+        return today - timedelta(days=(today.weekday() - target) % 7 or 7)
+    if modifier == "coming":
+        return today + timedelta(days=ahead or 7)
+    # "this" / "on" / "by" / bare weekday: nearest one in the preferred direction
+    if prefer == "past":
+        return today - timedelta(days=(today.weekday() - target) % 7)
+    return today + timedelta(days=ahead)
+
+
+# Resolvers for each pattern's match: (today, match, prefer) -> date or None
+
+def _iso(today, m, prefer):
+    return _safe_date(int(m.group(1)), int(m.group(2)), int(m.group(3)))
+
+
+def _day_month(today, m, prefer):
+    return _month_day(today, MONTHS[m.group(2)], int(m.group(1)), m.group(3), prefer)
+
+
+def _month_name_day(today, m, prefer):
+    return _month_day(today, MONTHS[m.group(1)], int(m.group(2)), m.group(3), prefer)
+
+
+def _dmy(today, m, prefer):
+    year = m.group(3) if len(m.group(3)) == 4 else "20" + m.group(3)
+    return _safe_date(int(year), int(m.group(2)), int(m.group(1)))
+
+
+def _dm(today, m, prefer):
+    return _month_day(today, int(m.group(2)), int(m.group(1)), None, prefer)
+
+
+def _relative_day(today, m, prefer):
+    offsets = {
+        "today": 0, "tonight": 0, "tomorrow": 1, "tmrw": 1, "yesterday": -1,
+        "day after tomorrow": 2, "day before yesterday": -2,
+    }
+    return today + timedelta(days=offsets[m.group(1)])
+
+
+def _in_count(today, m, prefer):
+    return today + timedelta(days=_count(m.group(1)) * (7 if m.group(2) == "week" else 1))
+
+
+def _ago(today, m, prefer):
+    return today - timedelta(days=_count(m.group(1)) * (7 if m.group(2) == "week" else 1))
+
+
+def _named_weekday(today, m, prefer):
+    return _weekday(today, m.group(1), _weekday_index(m.group(2)), prefer)
+
+
+def _week_boundary(today, m, prefer):
+    if m.group(1):
+        return today + timedelta(days=4 - today.weekday()) if today.weekday() <= 4 else today
+    if m.group(2):
+        return today + timedelta(days=7 - today.weekday())    # Monday of next week
+    if m.group(3):
+        return today - timedelta(days=today.weekday() + 7)    # Monday of last week
+    return date(today.year, today.month, calendar.monthrange(today.year, today.month)[1])
+
+
+# (pattern, resolver, needs a marker), most specific first; a match overlapping an earlier one is skipped
+_PATTERNS = [
+    (ISO_RE, _iso, False),
+    (DAY_MONTH_RE, _day_month, False),
+    (MONTH_DAY_RE, _month_name_day, False),
+    (DMY_RE, _dmy, False),
+    (DM_RE, _dm, True),  # A bare "2/3" is as often a fraction or a version: only "by 2/3", "due 2/3" ...
+    (RELATIVE_DAY_RE, _relative_day, False),
+    (IN_COUNT_RE, _in_count, False),
+    (AGO_RE, _ago, False),
+    (WEEKDAY_RE, _named_weekday, False),
+    (WEEK_RE, _week_boundary, False),
+]
+
+# "by Friday", "due on the 20th", "deadline is ...", "update for Monday": the date the sentence is about
+MARKER_RE = re.compile(r"\b(by|due|on|before|until|till|deadline|for|from)(\s+(on|by|is|date))?(\s+the)?[\s:]*$")
+# "due tomorrow or Friday": a date listed right after a marked one shares its marker
+LIST_RE = re.compile(r"^\s*(,|/|,?\s*(and|or))?\s*$")
+
+
+def date_expressions(text, today=None, prefer="future"):
+    """
+    Every date phrase in `text`, in order, as (start, date, marked) tuples.
+    `marked` is True when a due / lookup marker ("by", "due", "on", "for" ...) comes right before it.
+    """
+    if not text:
+        return []
+    today = today or get_sri_lanka_date()
+    text = text.lower()
+
+    found, taken = [], []
+    for pattern, resolve, needs_marker in _PATTERNS:
+        for m in pattern.finditer(text):
+            if any(m.start() < end and start < m.end() for start, end in taken):
+                continue
+            marked = bool(MARKER_RE.search(text[:m.start()])) or \
+                (pattern is WEEKDAY_RE and m.group(1) in ("on", "by"))
+            if needs_marker and not marked:
+                continue
+            value = resolve(today, m, prefer)
+            if value is None:
+                continue
+            taken.append(m.span())
+            found.append((m.start(), m.end(), value, marked))
+    found.sort(key=lambda item: item[0])
+
+    result = []
+    for i, (start, _, value, marked) in enumerate(found):
+        if not marked and i and result[-1][2] and LIST_RE.match(text[found[i - 1][1]:start]):
+            marked = True
+        result.append((start, value, marked))
+    return result
+
+
+def parse_date_expression(text, today=None, prefer="future"):
+    """
+    Resolve the date phrase `text` is about, or None if none can be parsed: the first
+    one after a marker ("due by Friday"), else the leftmost one.
+    `today` defaults to the current date in Asia/Colombo.
+    """
+    found = date_expressions(text, today, prefer)
+    marked = [value for _, value, is_marked in found if is_marked]
+    if marked:
+        return marked[0]
+    return found[0][1] if found else None
+
+
+def unambiguous_date(text, today=None, prefer="future"):
+    """
+    Like parse_date_expression, but None when `text` names several different dates
+    and the markers don't single one out ("today ... tomorrow", "on Monday ... by Friday").
+    Tools only let the local parser override the LLM's date with this.
+    """
+    found = date_expressions(text, today, prefer)
+    dates = {value for _, value, marked in found if marked} or {value for _, value, _ in found}
+    return dates.pop() if len(dates) == 1 else None
+
+
+def mentions_date(text):
+    """True if `text` contains anything that looks like a date phrase."""
+    return bool(text and DATE_HINT_RE.search(text.lower()))
@@ -0,0 +1,157 @@
+"""
+Conditional GET for the polled read endpoints.
+
+Every write bumps an in-process version counter for the data it touched
+(a user's tasks, a user's daily updates, a team's member list, the user list,
+a team's compliance inputs).
+A read endpoint's strong ETag is derived from the versions it depends on plus
+the caller and query string, so a poll with a matching If-None-Match gets a
+304 without touching the database.
+
+Opt-in: with RESPONSE_CACHE_SIZE > 0 the last bodies are also kept in memory,
+so a poll from a client without the ETag (e.g. a fresh tab) is answered from
+memory too. That body can be up to ETAG_MAX_AGE old when the write that changed
+it didn't bump a counter here (another worker, or a write path without a bump),
+so it is off by default.
+
+Counters live in this process only. Under several worker processes a write
+handled by one worker isn't seen by the others, so the ETag also rolls over
+every ETAG_MAX_AGE seconds; that bounds how long another worker can keep
+answering 304 for data it hasn't seen change.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import request, session, make_response
+
+ETAG_MAX_AGE = int(os.getenv("ETAG_MAX_AGE", "60"))                # seconds
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "0"))  # Bodies kept in memory; 0 (default) disables
+
+
+class VersionCounters:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions = {}
+
+    def bump(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._versions[key] = self._versions.get(key, 0) + 1
+
+    def get(self, key):
+        with self._lock:
+            return self._versions.get(key, 0)
+
+
+versions = VersionCounters()
+
+
+# --- Keys for the data the read endpoints serve ---
+def tasks_key(user_id):
+    return ("tasks", str(user_id))
+
+
+def updates_key(user_id):
+    return ("updates", str(user_id))
+
+
+def team_key(team):
+    return ("team", team or "")
+
+
+def compliance_key(team):
+    return ("compliance", team or "")
+
+
+USERS_KEY = ("users",)
+
+
+def bump_user_changed(team):
+    """A user was added or changed: the team list and the admin user list are stale."""
+    versions.bump(team_key(team), USERS_KEY)
+
+
+def bump_updates(user_id, team):
+    """A daily update was written: the employee's list and their team's compliance are stale."""
+    versions.bump(updates_key(user_id), compliance_key(team))
+
+
+def bump_tasks(user_id, team):
+    """A task was written: the assignee's list and their team's compliance are stale."""
+    versions.bump(tasks_key(user_id), compliance_key(team))
+
+
+class ResponseCache:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # etag -> (body bytes, mimetype)
+
+    def get(self, etag):
+        with self._lock:
+            entry = self._entries.get(etag)
+            if entry is not None:
+                self._entries.move_to_end(etag)
+            return entry
+
+    def set(self, etag, body, mimetype):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[etag] = (body, mimetype)
+            self._entries.move_to_end(etag)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+response_cache = ResponseCache(RESPONSE_CACHE_SIZE)
+
+
+def _etag(keys):
+    parts = [
+        request.path,
+        request.query_string.decode(),
+        str(session.get("user_id")),
+        str(session.get("role")),
+        str(int(time.time() // ETAG_MAX_AGE)),
+    ] + [f"{key}={versions.get(key)}" for key in keys]
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()[:32]
+
+
+def conditional_get(keys_for_request):
+    """
+    Decorator for GET endpoints. `keys_for_request()` returns the version keys
+    the response depends on, read from the Flask session.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != "GET":
+                return view(*args, **kwargs)
+
+            etag = _etag(keys_for_request())
+
+            if etag in request.if_none_match:
+                response = make_response("", 304)
+                response.set_etag(etag)
+                return response
+
+            cached = response_cache.get(etag)
+            if cached:
+                response = make_response(cached[0], 200)
+                response.mimetype = cached[1]
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                response_cache.set(etag, response.get_data(), response.mimetype)
+
+            response.set_etag(etag)
+            response.headers["Cache-Control"] = "private, no-cache"  # Revalidate every time
+            return response
+        return wrapper
+    return decorator
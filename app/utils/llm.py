@@ -1,15 +1,300 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
+from collections import OrderedDict
 from dotenv import load_dotenv
+import hashlib
+import json
+import sqlite3
+import threading
+import time
 import os
 load_dotenv()
 
+from app.utils.llm_backends import create_llm, LLM_BACKEND  # Reads LLM_* settings, so after load_dotenv()
+from app.utils.metrics import track_llm_call  # Per-call timing / size / cache metrics for /metrics
+
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
 TAVILY_API_KEY = os.getenv('TAVILY_API_KEY')
 
-llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash",
-                            google_api_key=GEMINI_API_KEY , 
-                            temperature=0.7)
+LLM_MODEL = "gemini-2.0-flash"
+LLM_TEMPERATURE = 0.7
+
+# Gemini by default; LLM_BACKEND=stub / replay run the graph offline (see llm_backends.py)
+llm = create_llm(LLM_MODEL, LLM_TEMPERATURE, GEMINI_API_KEY)
+
+
+def get_llm_stats() -> dict:
+    with llm._lock:
+        return {"backend": llm.name, **llm.stats}
+
+
+# ---------------------------------------------------------------------------
+# Response cache
+#
+# Tier 1: in-process LRU (always on unless LLM_CACHE_ENABLED=0)
+# Tier 2: optional SQLite file shared by all worker processes (LLM_CACHE_DB)
+# ---------------------------------------------------------------------------
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") != "0"
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "512"))              # entries kept in memory
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", "3600"))               # seconds
+LLM_CACHE_DB = os.getenv("LLM_CACHE_DB")                              # e.g. llm_cache.db
+LLM_CACHE_DB_MAX_ROWS = int(os.getenv("LLM_CACHE_DB_MAX_ROWS", "10000"))
+
+
+def cache_key(prompt: str, model: str = LLM_MODEL, temperature: float = LLM_TEMPERATURE) -> str:
+    # Non-Gemini backends get their own namespace so a shared LLM_CACHE_DB never mixes answers
+    if LLM_BACKEND != "gemini":
+        model = f"{LLM_BACKEND}:{model}"
+    raw = f"{model}\x00{temperature}\x00{prompt}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    def __init__(self, max_size=LLM_CACHE_SIZE, ttl=LLM_CACHE_TTL,
+                 db_path=LLM_CACHE_DB, db_max_rows=LLM_CACHE_DB_MAX_ROWS):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.db_path = db_path
+        self.db_max_rows = db_max_rows
+        self._entries = OrderedDict()  # key -> (created_at, response)
+        self._lock = threading.Lock()
+        self._local = threading.local()  # one sqlite connection per thread
+        self.stats = {"memory_hits": 0, "db_hits": 0, "misses": 0, "bypassed": 0}
+
+        if self.db_path:
+            conn = self._db()
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_created_at ON llm_cache (created_at)")
+            conn.commit()
+
+    def _db(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                if now - entry[0] < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return entry[1]
+                del self._entries[key]
+
+        if self.db_path:
+            try:
+                row = self._db().execute(
+                    "SELECT response, created_at FROM llm_cache WHERE key = ? AND created_at > ?",
+                    (key, now - self.ttl),
+                ).fetchone()
+            except sqlite3.Error as e:
+                print(f"[LLM CACHE ERROR] {e}")
+                row = None
+            if row:
+                self._remember(key, row[0], row[1])
+                with self._lock:
+                    self.stats["db_hits"] += 1
+                return row[0]
+
+        with self._lock:
+            self.stats["misses"] += 1
+        return None
+
+    def set(self, key, response):
+        now = time.time()
+        self._remember(key, response, now)
+
+        if self.db_path:
+            try:
+                conn = self._db()
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, response, created_at) VALUES (?, ?, ?)",
+                    (key, response, now),
+                )
+                # Evict expired rows, then the oldest rows beyond the size cap
+                conn.execute("DELETE FROM llm_cache WHERE created_at <= ?", (now - self.ttl,))
+                conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN ("
+                    "SELECT key FROM llm_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                    (self.db_max_rows,),
+                )
+                conn.commit()
+            except sqlite3.Error as e:
+                print(f"[LLM CACHE ERROR] {e}")
+
+    def _remember(self, key, response, created_at):
+        with self._lock:
+            self._entries[key] = (created_at, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.db_path:
+            conn = self._db()
+            conn.execute("DELETE FROM llm_cache")
+            conn.commit()
+
+
+llm_cache = LLMCache()
+
+
+def get_cache_stats() -> dict:
+    with llm_cache._lock:
+        stats = dict(llm_cache.stats)
+        stats["memory_entries"] = len(llm_cache._entries)
+    return stats
+
+
+def _json_cache_key(prompt: str, schema: dict) -> str:
+    return cache_key(prompt + "\x00" + json.dumps(schema, sort_keys=True))
+
+
+def _cached(key: str, cache: bool):
+    if cache and LLM_CACHE_ENABLED:
+        return llm_cache.get(key)
+    with llm_cache._lock:
+        llm_cache.stats["bypassed"] += 1
+    return None
+
+
+def _store(key: str, content, cache: bool):
+    if cache and LLM_CACHE_ENABLED and isinstance(content, str) and content:
+        llm_cache.set(key, content)
+
+
+def _usage(message):
+    return getattr(message, "usage_metadata", None)
+
+
+def llm_call(prompt: str, cache: bool = True) -> str:
+    # Pass cache=False for prompts whose answer should not be reused
+    with track_llm_call("text", prompt) as call:
+        key = cache_key(prompt)
+        cached = _cached(key, cache)
+        if cached is not None:
+            call.done(cached, cached=True)
+            return cached
+
+        response = llm.invoke(prompt)
+        _store(key, response.content, cache)
+        call.done(response.content, usage=_usage(response))
+        return response.content
+
+
+def llm_json_call(prompt: str, schema: dict, cache: bool = True) -> dict:
+    # Structured output: Gemini is constrained to return JSON matching `schema`
+    with track_llm_call("json", prompt) as call:
+        key = _json_cache_key(prompt, schema)
+        cached = _cached(key, cache)
+        if cached is not None:
+            call.done(cached, cached=True)
+            return json.loads(cached)
+
+        result = llm.with_structured_output(schema, method="json_schema").invoke(prompt) or {}
+        _store(key, json.dumps(result) if result else "", cache)
+        call.done(json.dumps(result))
+        return result
+
+
+# --- Async variants (used by the async agent graph) ---
+async def allm_call(prompt: str, cache: bool = True) -> str:
+    with track_llm_call("text", prompt) as call:
+        key = cache_key(prompt)
+        cached = _cached(key, cache)
+        if cached is not None:
+            call.done(cached, cached=True)
+            return cached
+
+        response = await llm.ainvoke(prompt)
+        _store(key, response.content, cache)
+        call.done(response.content, usage=_usage(response))
+        return response.content
+
+
+async def allm_json_call(prompt: str, schema: dict, cache: bool = True) -> dict:
+    with track_llm_call("json", prompt) as call:
+        key = _json_cache_key(prompt, schema)
+        cached = _cached(key, cache)
+        if cached is not None:
+            call.done(cached, cached=True)
+            return json.loads(cached)
+
+        result = await llm.with_structured_output(schema, method="json_schema").ainvoke(prompt) or {}
+        _store(key, json.dumps(result) if result else "", cache)
+        call.done(json.dumps(result))
+        return result
+
+
+# --- Streaming variants: tokens go to the graph's "custom" stream as they arrive ---
+def _stream_writer():
+    try:
+        from langgraph.config import get_stream_writer
+        return get_stream_writer()
+    except Exception:  # not running inside a graph
+        return None
+
+
+def _chunk_text(chunk) -> str:
+    return chunk.content if isinstance(chunk.content, str) else ""
+
+
+def llm_stream_call(prompt: str, cache: bool = True) -> str:
+    # Same result as llm_call; use it for user-facing replies so SSE clients see tokens early
+    writer = _stream_writer()
+    if writer is None:
+        return llm_call(prompt, cache)
+
+    with track_llm_call("stream", prompt) as call:
+        key = cache_key(prompt)
+        cached = _cached(key, cache)
+        if cached is not None:
+            writer({"token": cached})
+            call.done(cached, cached=True)
+            return cached
+
+        parts = []
+        for chunk in llm.stream(prompt):
+            text = _chunk_text(chunk)
+            if text:
+                parts.append(text)
+                writer({"token": text})
+
+        content = "".join(parts)
+        _store(key, content, cache)
+        call.done(content)
+        return content
+
+
+async def allm_stream_call(prompt: str, cache: bool = True) -> str:
+    writer = _stream_writer()
+    if writer is None:
+        return await allm_call(prompt, cache)
+
+    with track_llm_call("stream", prompt) as call:
+        key = cache_key(prompt)
+        cached = _cached(key, cache)
+        if cached is not None:
+            writer({"token": cached})
+            call.done(cached, cached=True)
+            return cached
+
+        parts = []
+        async for chunk in llm.astream(prompt):
+            text = _chunk_text(chunk)
+            if text:
+                parts.append(text)
+                writer({"token": text})
 
-def llm_call(prompt: str) -> str:
-    response = llm.invoke(prompt)
-    return response.content
\ No newline at end of file
+        content = "".join(parts)
+        _store(key, content, cache)
+        call.done(content)
+        return content
@@ -0,0 +1,499 @@
+"""
+Chat model backends behind app.utils.llm.
+
+LLM_BACKEND picks one (default gemini):
+  gemini  - ChatGoogleGenerativeAI; needs GEMINI_API_KEY and network access
+  stub    - deterministic, rule-based answers in the format each node's prompt asks for
+  replay  - answers recorded earlier with LLM_RECORD_FILE, looked up by prompt;
+            a miss falls back to the stub (or raises with LLM_REPLAY_MISS=error)
+
+Whatever the backend, calls go through ManagedLLM, which can add latency and
+fail a fraction of calls, so the whole agent pipeline can be load-tested and
+capacity-planned offline:
+  LLM_LATENCY     fixed:150 | uniform:50,300 | normal:200,50 | lognormal:200,0.5   (ms)
+  LLM_ERROR_RATE  0.0 - 1.0, fraction of calls that raise LLMInjectedError
+  LLM_SEED        makes the injected latency / errors reproducible
+  LLM_RECORD_FILE append every answer (JSONL) for the replay backend
+
+Backends only need the part of the LangChain chat model API the helpers use:
+invoke / ainvoke / stream / astream / with_structured_output(schema).
+"""
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from datetime import date
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini").strip().lower()
+LLM_LATENCY = os.getenv("LLM_LATENCY", "")
+LLM_ERROR_RATE = float(os.getenv("LLM_ERROR_RATE", "0"))
+LLM_SEED = os.getenv("LLM_SEED")
+LLM_RECORD_FILE = os.getenv("LLM_RECORD_FILE")
+LLM_REPLAY_FILE = os.getenv("LLM_REPLAY_FILE", LLM_RECORD_FILE or "llm_recordings.jsonl")
+LLM_REPLAY_MISS = os.getenv("LLM_REPLAY_MISS", "stub")   # stub | error
+
+
+class LLMInjectedError(RuntimeError):
+    """Raised by ManagedLLM for the LLM_ERROR_RATE share of calls."""
+
+
+class LLMReplayMiss(LookupError):
+    """The replay backend has no recording for this prompt (LLM_REPLAY_MISS=error)."""
+
+
+def prompt_key(prompt, schema=None):
+    raw = str(prompt) if schema is None else str(prompt) + "\x00" + json.dumps(schema, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _text(result):
+    return result.content if hasattr(result, "content") else result
+
+
+# --- Latency distributions -----------------------------------------------------
+def parse_latency(spec):
+    """'normal:200,50' → function(rng) returning seconds; None for no added latency."""
+    if not spec:
+        return None
+    kind, _, args = spec.partition(":")
+    try:
+        values = [float(v) for v in args.split(",") if v.strip()]
+    except ValueError:
+        raise ValueError(f"Invalid LLM_LATENCY '{spec}'")
+
+    kind = kind.strip().lower()
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0] / 1000
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1]) / 1000
+    if kind == "normal" and len(values) == 2:
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1])) / 1000
+    if kind == "lognormal" and len(values) == 2:
+        # values = median ms, sigma of the underlying normal (long right tail, like real APIs)
+        return lambda rng: rng.lognormvariate(math.log(values[0]), values[1]) / 1000
+    raise ValueError(f"Invalid LLM_LATENCY '{spec}'. Use fixed:ms, uniform:lo,hi, normal:mean,sd or lognormal:median,sigma")
+
+
+# ---------------------------------------------------------------------------------
+# 🧪 Stub backend: reads the prompt, answers in the format that prompt asks for
+# ---------------------------------------------------------------------------------
+INTENT_PATTERNS = [
+    ("create_user", r"\b(add|create|register|onboard)\b"),
+    ("assign_task", r"\b(assign|task)\b"),
+    ("retrieve_updates", r"\b(show|get|see|check|view|retrieve)\b.*\b(update|updates|report)\b|\bwhat did\b"),
+    ("submit_update", r"\b(worked|finished|completed|fixed|built|implemented|submit)\b"),
+]
+ROLES = ["Admin", "Manager", "Employee"]
+_LEADING_VERBS = {"Assign", "Show", "Add", "Create", "Get", "Check", "Give", "Please", "Register",
+                  "See", "View", "Hi", "Hello", "Hey", "Today", "Yesterday", "Submit", "Retrieve",
+                  "Admin", "Manager", "Employee", "Intern"}
+_NAME_RE = re.compile(r"\b([A-Z][a-z]+(?: [A-Z][A-Za-z0-9]+)+)")
+_ISO_RE = re.compile(r"\b(\d{4}-\d{2}-\d{2})\b")
+_URL_RE = re.compile(r"https?://\S+")
+_TODAY_RE = re.compile(r"[Tt]oday(?:'s date)?(?: is|:)?\s*\(?(\d{4}-\d{2}-\d{2})")
+_MESSAGE_RES = [
+    re.compile(r"Latest User Message:\s*\n(.*?)(?:\n\s*\n|\n-{5,}|\nToday is|\Z)", re.DOTALL),
+    re.compile(r"The user just said:\s*\n\"(.*?)\"\s*\n", re.DOTALL),
+    re.compile(r"Message:\s*\n?\s*\"(.*?)\"", re.DOTALL),
+]
+
+
+def _user_message(prompt):
+    for pattern in _MESSAGE_RES:
+        match = pattern.search(prompt)
+        if match:
+            return match.group(1).strip()
+    return ""
+
+
+def _today(prompt):
+    match = _TODAY_RE.search(prompt)
+    return match.group(1) if match else date.today().isoformat()
+
+
+def _pick_intent(message, allowed):
+    for intent, pattern in INTENT_PATTERNS:
+        if intent in allowed and re.search(pattern, message, re.IGNORECASE):
+            return intent
+    return "other" if "other" in allowed else allowed[0]
+
+
+def _name(message):
+    for match in _NAME_RE.finditer(message.replace("'s ", " ")):
+        words = match.group(1).split()
+        while words and words[0] in _LEADING_VERBS:
+            words = words[1:]
+        if len(words) >= 2:
+            return " ".join(words)
+    return ""
+
+
+def _title(text, words=5):
+    title = " ".join(text.split()[:words]).rstrip(".,!?")
+    return title[:1].upper() + title[1:]
+
+
+def _slot_value(field, message, today):
+    """Best local guess for one extraction field; '' when the message doesn't say."""
+    name = _name(message)
+    if field in ("f_name", "l_name"):
+        parts = name.split(" ", 1) if name else ["", ""]
+        return parts[0] if field == "f_name" else parts[-1]
+    if "name" in field:
+        return name
+    if "date" in field:
+        match = _ISO_RE.search(message)
+        return match.group(1) if match else (today if field == "date" else "")
+    if field == "title":
+        return _title(message)
+    if field in ("description", "summary"):
+        return message
+    if field == "reference":
+        match = _URL_RE.search(message)
+        return match.group(0) if match else ""
+    if field == "role":
+        return next((role for role in ROLES if re.search(rf"\b{role}\b", message, re.IGNORECASE)), "")
+    if field == "team":
+        match = re.search(r"\b(?:for|in|to|on) (?:the )?(\w+) team\b", message, re.IGNORECASE)
+        if not match:
+            return ""
+        team = match.group(1)
+        return team if team.isupper() else team.capitalize()  # Keep acronyms like HR
+    return ""
+
+
+def _fill_schema(schema, message, today):
+    """Structured answer: the intent from the message, fields for that intent only, '' elsewhere."""
+    properties = schema.get("properties", {})
+    result = {}
+    intent = None
+    if "enum" in properties.get("intent", {}):
+        intent = result["intent"] = _pick_intent(message, properties["intent"]["enum"])
+    for name, sub in properties.items():
+        if name == "intent":
+            continue
+        if sub.get("type") == "object":
+            active = intent is None or name == intent
+            result[name] = {
+                field: _slot_value(field, message, today) if active else ""
+                for field in sub.get("properties", {})
+            }
+        elif "enum" in sub:
+            result[name] = sub["enum"][0]
+        elif sub.get("type") == "string":
+            result[name] = _slot_value(name, message, today)
+    return result
+
+
+def _stub_classify(prompt):
+    line = prompt.split("Respond with just **one** of these keywords:", 1)[1].splitlines()[0]
+    keywords = re.findall(r"`(\w+)`", line) or ["other"]
+    return _pick_intent(_user_message(prompt), keywords)
+
+
+def _stub_summary(prompt):
+    user_lines = re.findall(r"^User: (.*)$", prompt, re.MULTILINE)
+    last = user_lines[-1] if user_lines else ""
+    intent = _pick_intent(last, [i for i, _ in INTENT_PATTERNS] + ["other"])
+    return f"- Intent: {intent.replace('_', ' ').capitalize()}\n- Provided: Message: {last}\n- Missing: None"
+
+
+def _stub_assign_task(prompt):
+    message, today = _user_message(prompt), _today(prompt)
+    resolved = re.search(r"output exactly (\d{4}-\d{2}-\d{2})", prompt)
+    due = resolved.group(1) if resolved else _slot_value("due_date", message, today)
+    return "\n".join([_name(message) or "None", _title(message), message, due])
+
+
+def _stub_task_title(prompt):
+    match = re.search(r"Description:\s*\n\"(.*?)\"", prompt, re.DOTALL)
+    return _title(match.group(1) if match else "", words=4)
+
+
+def _stub_submit_update(prompt):
+    message = _user_message(prompt)
+    reference = _slot_value("reference", message, "")
+    return f"title: {_title(message)}\nsummary: {message}\nreference: {reference or 'None'}"
+
+
+def _stub_retrieve_update(prompt):
+    message, today = _user_message(prompt), _today(prompt)
+    return f"name: {_name(message)}\ndate: {_slot_value('date', message, today)}"
+
+
+def _stub_add_user(prompt):
+    message = _user_message(prompt)
+    return "\n".join(f"{field}: {_slot_value(field, message, '')}" for field in ("f_name", "l_name", "role", "team"))
+
+
+def _stub_update_summary(prompt):
+    title = re.search(r"• Title: (.*)", prompt)
+    summary = re.search(r"• Summary: (.*)", prompt)
+    return f"{title.group(1) if title else ''}: {summary.group(1) if summary else ''}".strip(": ")
+
+
+ROLE_GUIDES = {
+    "ADMIN": "- ➕ Add new users: `add Employee Jake James for HR team`",
+    "MANAGER": "- 📌 Assign tasks: employee name, task, due date\n- 📅 Retrieve updates: employee name + date",
+    "EMPLOYEE": "- 📝 Submit updates: say \"today\" and describe your work",
+}
+
+
+def _stub_rise_pal(prompt):
+    if re.search(r"how (do i|to|can i) use", _user_message(prompt), re.IGNORECASE):
+        role = re.search(r"current user role is: \*\*(\w+)\*\*", prompt)
+        guide = ROLE_GUIDES.get(role.group(1) if role else "", "- Ask me about users, tasks or daily updates")
+        return f"Here's how to use Rise Pal:\n{guide}"
+    return "Hi! I'm Rise Pal, your assistant here. If you'd like to know how to use Rise Pal, just ask: *how to use Rise Pal*."
+
+
+def _stub_clarification(prompt):
+    missing = re.findall(r"- ([^:\n]+): ❌ missing", prompt)
+    if missing:
+        return f"Could you please share the {', '.join(m.lower() for m in missing)}?"
+    return "Could you please share a bit more detail?"
+
+
+# (marker in the prompt, answer builder) - first match wins
+STUB_RULES = [
+    ("Respond with just **one** of these keywords:", _stub_classify),
+    ("You are a summarizer assistant", _stub_summary),
+    ("You are a task-extracting assistant", _stub_assign_task),
+    ("generating a title from a task description", _stub_task_title),
+    ("submit their daily work update", _stub_submit_update),
+    ("retrieving an employee's daily update", _stub_retrieve_update),
+    ("data extractor helping an admin", _stub_add_user),
+    ("Extract only the feedback comment", _user_message),
+    ("summarizing a daily work update", _stub_update_summary),
+    ("You are **Rise Pal**", _stub_rise_pal),
+]
+
+
+def stub_answer(prompt):
+    for marker, builder in STUB_RULES:
+        if marker in prompt:
+            return builder(prompt)
+    return _stub_clarification(prompt)
+
+
+def _chunks(text):
+    for word in re.findall(r"\S+\s*", text):
+        yield AIMessageChunk(content=word)
+
+
+class _StructuredCall:
+    def __init__(self, answer, aanswer=None):
+        self._answer = answer
+        self._aanswer = aanswer
+
+    def invoke(self, prompt, *args, **kwargs):
+        return self._answer(prompt)
+
+    async def ainvoke(self, prompt, *args, **kwargs):
+        if self._aanswer:
+            return await self._aanswer(prompt)
+        return self._answer(prompt)
+
+
+class StubLLM:
+    """No network, no randomness: the same prompt always gets the same answer."""
+
+    def invoke(self, prompt, *args, **kwargs):
+        return AIMessage(content=stub_answer(str(prompt)))
+
+    async def ainvoke(self, prompt, *args, **kwargs):
+        return self.invoke(prompt)
+
+    def stream(self, prompt, *args, **kwargs):
+        yield from _chunks(stub_answer(str(prompt)))
+
+    async def astream(self, prompt, *args, **kwargs):
+        for chunk in _chunks(stub_answer(str(prompt))):
+            yield chunk
+
+    def with_structured_output(self, schema, **kwargs):
+        return _StructuredCall(lambda prompt: _fill_schema(schema, _user_message(str(prompt)), _today(str(prompt))))
+
+
+# ---------------------------------------------------------------------------------
+# 📼 Replay backend: answers recorded from a real backend (see LLM_RECORD_FILE)
+# ---------------------------------------------------------------------------------
+class ReplayLLM:
+    def __init__(self, path=LLM_REPLAY_FILE, on_miss=LLM_REPLAY_MISS):
+        self.path = path
+        self.on_miss = on_miss
+        self.fallback = StubLLM()
+        self.recordings = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.recordings[entry["key"]] = entry["response"]
+        print(f"📼 Replay backend loaded {len(self.recordings)} recordings from {path}")
+
+    def _lookup(self, prompt, schema=None):
+        key = prompt_key(prompt, schema)
+        if key in self.recordings:
+            return self.recordings[key]
+        if self.on_miss == "error":
+            raise LLMReplayMiss(f"No recording for prompt {key[:12]}")
+        return None
+
+    def invoke(self, prompt, *args, **kwargs):
+        recorded = self._lookup(prompt)
+        return AIMessage(content=recorded) if recorded is not None else self.fallback.invoke(prompt)
+
+    async def ainvoke(self, prompt, *args, **kwargs):
+        return self.invoke(prompt)
+
+    def stream(self, prompt, *args, **kwargs):
+        yield from _chunks(self.invoke(prompt).content)
+
+    async def astream(self, prompt, *args, **kwargs):
+        for chunk in _chunks(self.invoke(prompt).content):
+            yield chunk
+
+    def with_structured_output(self, schema, **kwargs):
+        fallback = self.fallback.with_structured_output(schema)
+
+        def answer(prompt):
+            recorded = self._lookup(prompt, schema)
+            return recorded if recorded is not None else fallback.invoke(prompt)
+        return _StructuredCall(answer)
+
+
+# ---------------------------------------------------------------------------------
+# 🎛️ Latency / fault injection, call counts and recording - wraps every backend
+# ---------------------------------------------------------------------------------
+class ManagedLLM:
+    def __init__(self, inner, name, latency=None, error_rate=0.0, seed=None, record_path=None):
+        self.inner = inner
+        self.name = name
+        self.latency = latency
+        self.error_rate = error_rate
+        self.record_path = record_path
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "injected_errors": 0, "injected_latency_seconds": 0.0}
+
+    def _plan(self):
+        """Count the call and decide its injected (delay, error)."""
+        with self._lock:
+            self.stats["calls"] += 1
+            delay = self.latency(self._rng) if self.latency else 0.0
+            fail = self.error_rate > 0 and self._rng.random() < self.error_rate
+            self.stats["injected_latency_seconds"] += delay
+            if fail:
+                self.stats["injected_errors"] += 1
+        return delay, fail
+
+    def _before(self):
+        delay, fail = self._plan()
+        if delay:
+            time.sleep(delay)
+        if fail:
+            raise LLMInjectedError(f"Injected {self.name} failure")
+
+    async def _abefore(self):
+        delay, fail = self._plan()
+        if delay:
+            await asyncio.sleep(delay)
+        if fail:
+            raise LLMInjectedError(f"Injected {self.name} failure")
+
+    def _record(self, prompt, response, schema=None):
+        if not self.record_path:
+            return
+        line = json.dumps({"key": prompt_key(prompt, schema), "backend": self.name, "response": response})
+        with self._lock:
+            with open(self.record_path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    def invoke(self, prompt, *args, **kwargs):
+        self._before()
+        result = self.inner.invoke(prompt, *args, **kwargs)
+        self._record(prompt, _text(result))
+        return result
+
+    async def ainvoke(self, prompt, *args, **kwargs):
+        await self._abefore()
+        result = await self.inner.ainvoke(prompt, *args, **kwargs)
+        self._record(prompt, _text(result))
+        return result
+
+    def stream(self, prompt, *args, **kwargs):
+        self._before()  # Injected latency lands before the first token
+        parts = []
+        for chunk in self.inner.stream(prompt, *args, **kwargs):
+            text = _text(chunk)
+            parts.append(text if isinstance(text, str) else "")
+            yield chunk
+        self._record(prompt, "".join(parts))
+
+    async def astream(self, prompt, *args, **kwargs):
+        await self._abefore()
+        parts = []
+        async for chunk in self.inner.astream(prompt, *args, **kwargs):
+            text = _text(chunk)
+            parts.append(text if isinstance(text, str) else "")
+            yield chunk
+        self._record(prompt, "".join(parts))
+
+    def with_structured_output(self, schema, **kwargs):
+        structured = self.inner.with_structured_output(schema, **kwargs)
+
+        def answer(prompt):
+            self._before()
+            result = structured.invoke(prompt)
+            self._record(prompt, result, schema)
+            return result
+
+        async def aanswer(prompt):
+            await self._abefore()
+            result = await structured.ainvoke(prompt)
+            self._record(prompt, result, schema)
+            return result
+
+        return _StructuredCall(answer, aanswer)
+
+
+# --- Registry ----------------------------------------------------------------------
+def _gemini(model, temperature, api_key):
+    # Imported here so the stub / replay backends run without the Gemini client
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    return ChatGoogleGenerativeAI(model=model, google_api_key=api_key, temperature=temperature)
+
+
+BACKENDS = {
+    "gemini": _gemini,
+    "stub": lambda model, temperature, api_key: StubLLM(),
+    "replay": lambda model, temperature, api_key: ReplayLLM(),
+}
+
+
+def register_backend(name, factory):
+    """factory(model, temperature, api_key) → object with the chat model methods above."""
+    BACKENDS[name.lower()] = factory
+
+
+def create_llm(model, temperature, api_key, backend=LLM_BACKEND):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown LLM_BACKEND '{backend}'. Choose from: {', '.join(BACKENDS)}")
+    inner = BACKENDS[backend](model, temperature, api_key)
+    print(f"🤖 LLM backend: {backend}")
+    return ManagedLLM(
+        inner,
+        backend,
+        latency=parse_latency(LLM_LATENCY),
+        error_rate=LLM_ERROR_RATE,
+        seed=int(LLM_SEED) if LLM_SEED else None,
+        record_path=LLM_RECORD_FILE
+    )
@@ -0,0 +1,373 @@
+"""
+In-process metrics, served in Prometheus text format on /metrics.
+
+What gets measured:
+- every HTTP request: wall time, and SQL statements it issued (engine events)
+- every agent graph node: wall time and SQL statements, tagged node / role / query_type
+- every LLM helper call: wall time, prompt / response characters and tokens,
+  cache hit or miss, errors, tagged with the node it ran in
+
+The node and request being measured travel in ContextVars, which LangGraph
+and asyncio.to_thread copy into their worker threads, so a query or LLM call
+made deep inside a tool is charged to the right node and request.
+
+Values live in this process; with several workers each one serves its own
+/metrics and Prometheus sums them.
+"""
+import inspect
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+CHAR_BUCKETS = (100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels_text(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, self.labelnames, key, None, value) for key, value in self._values.items()]
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=TIME_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.buckets = tuple(buckets) + (float("inf"),)
+        self._lock = threading.Lock()
+        self._values = {}  # label values -> [bucket counts..., sum, count]
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[i] += 1  # Cumulative, as the exposition format wants
+            entry[-2] += value
+            entry[-1] += 1
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(entry)) for key, entry in self._values.items()]
+        out = []
+        for key, entry in items:
+            for bound, count in zip(self.buckets, entry):
+                out.append((self.name + "_bucket", self.labelnames, key, f'le="{_number(bound)}"', count))
+            out.append((self.name + "_sum", self.labelnames, key, None, round(entry[-2], 6)))
+            out.append((self.name + "_count", self.labelnames, key, None, entry[-1]))
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []  # callables returning [(name, type, help, labelnames, [(label values, value)])]
+
+    def counter(self, *args, **kwargs):
+        metric = Counter(*args, **kwargs)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, *args, **kwargs):
+        metric = Histogram(*args, **kwargs)
+        self.metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector):
+        """For values read at scrape time (pool usage, cache stats)."""
+        self.collectors.append(collector)
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, names, values, extra, value in metric.samples():
+                lines.append(f"{name}{_labels_text(names, values, extra)} {_number(value)}")
+        for collector in self.collectors:
+            try:
+                families = collector()
+            except Exception as e:
+                print(f"[METRICS ERROR] {e}")
+                continue
+            for name, kind, help, names, rows in families:
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for values, value in rows:
+                    if value is not None:
+                        lines.append(f"{name}{_labels_text(names, values)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+NODE_LABELS = ("node", "role", "query_type")
+
+http_seconds = registry.histogram(
+    "rise_http_request_duration_seconds", "Time to produce a response.", ("endpoint", "method", "status"))
+http_queries = registry.histogram(
+    "rise_http_request_db_queries", "SQL statements issued per request.", ("endpoint", "method"), COUNT_BUCKETS)
+node_seconds = registry.histogram(
+    "rise_graph_node_duration_seconds", "Agent graph node wall time.", NODE_LABELS)
+node_errors = registry.counter(
+    "rise_graph_node_errors_total", "Agent graph nodes that raised.", NODE_LABELS)
+node_queries = registry.counter(
+    "rise_graph_node_db_queries_total", "SQL statements issued inside agent graph nodes.", NODE_LABELS)
+llm_seconds = registry.histogram(
+    "rise_llm_call_duration_seconds", "LLM helper call wall time, cache hits included.", NODE_LABELS + ("kind", "cache"))
+llm_errors = registry.counter(
+    "rise_llm_call_errors_total", "LLM helper calls that raised.", NODE_LABELS + ("kind",))
+llm_prompt_chars = registry.histogram(
+    "rise_llm_prompt_chars", "Prompt size in characters.", ("node", "kind"), CHAR_BUCKETS)
+llm_response_chars = registry.histogram(
+    "rise_llm_response_chars", "Response size in characters.", ("node", "kind"), CHAR_BUCKETS)
+llm_tokens = registry.counter(
+    "rise_llm_tokens_total", "Tokens sent and received (provider usage when reported, else chars/4).",
+    ("node", "kind", "direction", "source"))
+
+
+# --- Context: which request / node the current code runs for ---
+_request = ContextVar("metrics_request", default=None)   # {"queries": int}
+_node = ContextVar("metrics_node", default=None)         # {"node", "role", "query_type", "queries"}
+
+
+def _node_labels():
+    node = _node.get()
+    if not node:
+        return {"node": "", "role": "", "query_type": ""}
+    return {"node": node["node"], "role": node["role"], "query_type": node["query_type"]}
+
+
+def count_query(*args, **kwargs):
+    """before_cursor_execute listener."""
+    request_ctx = _request.get()
+    if request_ctx is not None:
+        request_ctx["queries"] += 1  # Same dict object in every copied context
+    node = _node.get()
+    if node is not None:
+        node["queries"] += 1
+
+
+def start_request():
+    _request.set({"queries": 0, "started": time.perf_counter()})
+
+
+def finish_request(endpoint, method, status):
+    request_ctx = _request.get()
+    if request_ctx is None:
+        return
+    _request.set(None)
+    http_seconds.observe(time.perf_counter() - request_ctx["started"], endpoint=endpoint, method=method, status=status)
+    http_queries.observe(request_ctx["queries"], endpoint=endpoint, method=method)
+
+
+# --- Graph nodes ---
+def _begin_node(name, state):
+    context = {
+        "node": name,
+        "role": state.get("user_role") or "",
+        "query_type": state.get("query_type") or "",
+        "queries": 0,
+    }
+    return context, _node.set(context), time.perf_counter()
+
+
+def _end_node(context, token, started, result, failed):
+    _node.reset(token)
+    if isinstance(result, dict) and result.get("query_type"):
+        context["query_type"] = result["query_type"]  # classify_query decides it
+    labels = {"node": context["node"], "role": context["role"], "query_type": context["query_type"]}
+    node_seconds.observe(time.perf_counter() - started, **labels)
+    if context["queries"]:
+        node_queries.inc(context["queries"], **labels)
+    if failed:
+        node_errors.inc(**labels)
+
+
+def instrument_node(name, node):
+    """Wrap a (sync or async) graph node so its time, queries and LLM calls are attributed to it."""
+    if inspect.iscoroutinefunction(node):
+        @wraps(node)
+        async def async_wrapper(state):
+            context, token, started = _begin_node(name, state)
+            result, failed = None, True
+            try:
+                result = await node(state)
+                failed = False
+                return result
+            finally:
+                _end_node(context, token, started, result, failed)
+        return async_wrapper
+
+    @wraps(node)
+    def wrapper(state):
+        context, token, started = _begin_node(name, state)
+        result, failed = None, True
+        try:
+            result = node(state)
+            failed = False
+            return result
+        finally:
+            _end_node(context, token, started, result, failed)
+    return wrapper
+
+
+# --- LLM calls ---
+class _LLMCall:
+    def __init__(self, kind, prompt):
+        self.kind = kind
+        self.prompt = prompt
+        self.started = time.perf_counter()
+
+    def done(self, response, cached=False, usage=None):
+        labels = _node_labels()
+        text = response if isinstance(response, str) else str(response or "")
+        llm_seconds.observe(time.perf_counter() - self.started, kind=self.kind, cache="hit" if cached else "miss", **labels)
+        llm_prompt_chars.observe(len(self.prompt), node=labels["node"], kind=self.kind)
+        llm_response_chars.observe(len(text), node=labels["node"], kind=self.kind)
+        if cached:
+            return  # Nothing was sent to the provider
+        if usage and usage.get("input_tokens") is not None:
+            sent, received, source = usage.get("input_tokens", 0), usage.get("output_tokens", 0), "provider"
+        else:
+            sent, received, source = len(self.prompt) // 4, len(text) // 4, "estimate"
+        llm_tokens.inc(sent, node=labels["node"], kind=self.kind, direction="prompt", source=source)
+        llm_tokens.inc(received, node=labels["node"], kind=self.kind, direction="response", source=source)
+
+
+@contextmanager
+def track_llm_call(kind, prompt):
+    """`with track_llm_call("text", prompt) as call: ... call.done(content, cached=...)`"""
+    call = _LLMCall(kind, prompt)
+    try:
+        yield call
+    except Exception:
+        llm_errors.inc(kind=kind, **_node_labels())
+        raise
+
+
+# --- Flask / SQLAlchemy wiring (called from create_app) ---
+def _pool_families():
+    from app.database import pool_stats
+    stats = pool_stats()
+    pools = list(stats)
+    return [
+        ("rise_db_pool_checked_out", "gauge", "Pooled connections currently checked out.", ("pool",),
+         [((p,), stats[p]["checked_out"]) for p in pools]),
+        ("rise_db_pool_size", "gauge", "Configured pool size.", ("pool",),
+         [((p,), stats[p]["pool_size"]) for p in pools]),
+        ("rise_db_pool_longest_held_seconds", "gauge", "Longest current checkout.", ("pool",),
+         [((p,), stats[p]["longest_held_seconds"]) for p in pools]),
+        ("rise_db_pool_suspected_leaks", "gauge", "Checkouts held longer than DB_LEAK_WARN_SECONDS.", ("pool",),
+         [((p,), stats[p]["suspected_leaks"]) for p in pools]),
+    ]
+
+
+def _llm_families():
+    # Nothing to report before the first chat loads the LLM stack (and a scrape shouldn't load it)
+    if "app.utils.llm" not in sys.modules:
+        return []
+    from app.utils.llm import get_cache_stats, get_llm_stats
+    cache = get_cache_stats()
+    backend = get_llm_stats()
+    return [
+        ("rise_llm_cache_lookups_total", "counter", "LLM response cache lookups by result.", ("result",),
+         [((result,), cache[key]) for result, key in
+          (("memory_hit", "memory_hits"), ("db_hit", "db_hits"), ("miss", "misses"), ("bypassed", "bypassed"))]),
+        ("rise_llm_cache_entries", "gauge", "Entries in the in-process LLM cache.", (),
+         [((), cache["memory_entries"])]),
+        ("rise_llm_backend_calls_total", "counter", "Calls that reached the LLM backend.", ("backend",),
+         [((backend["backend"],), backend["calls"])]),
+        ("rise_llm_backend_injected_errors_total", "counter", "Failures injected by LLM_ERROR_RATE.", ("backend",),
+         [((backend["backend"],), backend["injected_errors"])]),
+    ]
+
+
+def _chat_families():
+    if "app.agents.tools.memory" not in sys.modules:
+        return []
+    from app.agents.tools.memory import chat_writer
+    return [
+        ("rise_chat_write_queue_depth", "gauge", "Chat messages waiting for the write-behind flush.", (),
+         [((), chat_writer.depth())]),
+        ("rise_chat_write_batches_total", "counter", "Write-behind batches flushed.", (),
+         [((), chat_writer.stats["batches"])]),
+        ("rise_chat_write_errors_total", "counter", "Write-behind batches that failed.", (),
+         [((), chat_writer.stats["errors"])]),
+    ]
+
+
+def _agent_families():
+    from app.agents.loader import agents_loaded
+    return [
+        ("rise_agent_graphs_loaded", "gauge", "1 once the agent graphs are compiled (first chat or AGENT_WARMUP).", (),
+         [((), 1 if agents_loaded() else 0)]),
+    ]
+
+
+_instrumented_engines = set()
+
+
+def init_metrics(app):
+    from flask import request
+    from sqlalchemy import event
+    from app.database import ENGINES
+
+    for engine in ENGINES.values():
+        if id(engine) not in _instrumented_engines:
+            event.listen(engine, "before_cursor_execute", count_query)
+            _instrumented_engines.add(id(engine))
+
+    @app.before_request
+    def metrics_start():
+        start_request()
+
+    @app.after_request
+    def metrics_finish(response):
+        # Streamed (SSE) bodies are still running here; their node metrics cover the rest
+        endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        finish_request(endpoint, request.method, response.status_code)
+        return response
+
+    if not registry.collectors:
+        registry.register_collector(_pool_families)
+        registry.register_collector(_llm_families)
+        registry.register_collector(_chat_families)
+        registry.register_collector(_agent_families)
@@ -0,0 +1,136 @@
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+
+from app.database import unit_of_work
+from app.models import User
+
+# Rebuild at least this often so other worker processes' writes show up
+NAME_INDEX_TTL = int(os.getenv("NAME_INDEX_TTL", "300"))
+
+MIN_TOKEN_SIMILARITY = 0.5   # trigram Jaccard needed for a fuzzy token hit
+MIN_MATCH_SCORE = 0.5        # share of a user's name tokens that must be matched
+AMBIGUITY_MARGIN = 0.15      # top score must beat the runner-up by this much
+
+_WORD_RE = re.compile(r"[a-z]+")
+
+
+def _tokens(text):
+    return _WORD_RE.findall(text.lower())
+
+
+def _trigrams(token):
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class EmployeeNameIndex:
+    """Process-local token/trigram index over active users' full names."""
+
+    def __init__(self, ttl=NAME_INDEX_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._built_at = None
+        self._users = {}                         # id -> {"id", "full_name", "email", "team", "role"}
+        self._token_users = defaultdict(set)     # name token -> user ids
+        self._trigram_tokens = defaultdict(set)  # trigram -> name tokens
+        self._by_full_name = {}                  # lowercased full name -> user id
+
+    def invalidate(self):
+        with self._lock:
+            self._built_at = None
+
+    def _ensure_built(self):
+        with self._lock:
+            if self._built_at is not None and time.monotonic() - self._built_at < self.ttl:
+                return
+
+            with unit_of_work(read_only=True) as db:
+                rows = db.query(User.id, User.full_name, User.email, User.team, User.role)\
+                    .filter(User.status == "active").all()
+
+            users, token_users, trigram_tokens, by_full_name = {}, defaultdict(set), defaultdict(set), {}
+            for row in rows:
+                users[row.id] = {
+                    "id": row.id,
+                    "full_name": row.full_name,
+                    "email": row.email,
+                    "team": row.team,
+                    "role": row.role,
+                }
+                by_full_name[row.full_name.lower()] = row.id
+                for token in set(_tokens(row.full_name)):
+                    token_users[token].add(row.id)
+                    for gram in _trigrams(token):
+                        trigram_tokens[gram].add(token)
+
+            self._users, self._token_users = users, token_users
+            self._trigram_tokens, self._by_full_name = trigram_tokens, by_full_name
+            self._built_at = time.monotonic()
+
+    def _similar_tokens(self, token):
+        # Exact token first, otherwise the closest name tokens by trigram overlap
+        if token in self._token_users:
+            return [(token, 1.0)]
+        grams = _trigrams(token)
+        counts = defaultdict(int)
+        for gram in grams:
+            for name_token in self._trigram_tokens.get(gram, ()):
+                counts[name_token] += 1
+        similar = []
+        for name_token, shared in counts.items():
+            score = shared / len(grams | _trigrams(name_token))
+            if score >= MIN_TOKEN_SIMILARITY:
+                similar.append((name_token, score))
+        return similar
+
+    def find(self, message, team=None):
+        """
+        Find the employee mentioned in `message`.
+        Returns (match, candidates): `match` is a user dict when exactly one
+        user stands out; otherwise `candidates` lists the close contenders.
+        """
+        self._ensure_built()
+        users = self._users
+        in_scope = (lambda uid: users[uid]["team"] == team) if team else (lambda uid: True)
+
+        # uid -> {name token: best similarity seen in the message}
+        hits = defaultdict(dict)
+        for token in set(_tokens(message)):
+            if len(token) < 3:
+                continue
+            for name_token, similarity in self._similar_tokens(token):
+                for uid in self._token_users[name_token]:
+                    if in_scope(uid):
+                        hits[uid][name_token] = max(hits[uid].get(name_token, 0), similarity)
+
+        ranked = []
+        for uid, matched in hits.items():
+            name_len = len(set(_tokens(users[uid]["full_name"]))) or 1
+            ranked.append((sum(matched.values()) / name_len, uid))
+        ranked = [r for r in ranked if r[0] >= MIN_MATCH_SCORE]
+        ranked.sort(reverse=True)
+
+        if not ranked:
+            return None, []
+        if len(ranked) == 1 or ranked[0][0] - ranked[1][0] >= AMBIGUITY_MARGIN:
+            return dict(users[ranked[0][1]]), []
+
+        top = ranked[0][0]
+        return None, [dict(users[uid]) for score, uid in ranked if top - score < AMBIGUITY_MARGIN]
+
+    def resolve(self, name, team=None):
+        """Canonical full_name for a (possibly misspelled or mis-cased) name, or None."""
+        if not name:
+            return None
+        self._ensure_built()
+        uid = self._by_full_name.get(name.strip().lower())
+        if uid is not None and (not team or self._users[uid]["team"] == team):
+            return self._users[uid]["full_name"]
+        match, _ = self.find(name, team)
+        return match["full_name"] if match else None
+
+
+employee_index = EmployeeNameIndex()
@@ -0,0 +1,338 @@
+"""
+Opt-in per-request profiling.
+
+A request is profiled when
+- an admin sends `X-Profile: 1` (or `?profile=1`), or
+- it falls in the PROFILE_SAMPLE_PERCENT random sample.
+The header / parameter value can pick the mode: `cprofile` or `sample`.
+
+Modes
+  cprofile  deterministic cProfile → .pstats (snakeviz, `python -m pstats`).
+            cProfile only sees the thread it runs in, so every agent graph node
+            also profiles the thread it runs on (LangGraph worker threads, the
+            async graph's event loop) and the per-thread results are merged.
+            A thread runs one profiler at a time: while one request's profile
+            owns a shared thread (the ASGI event loop), another cprofile request
+            on it isn't profiled, and its nodes skip threads already taken.
+  sample    a background thread snapshots every busy thread's stack each
+            PROFILE_SAMPLE_INTERVAL_MS → collapsed stacks (.folded) for
+            flamegraph.pl / speedscope. Covers everything, including DB work in
+            asyncio.to_thread, but under concurrent load other requests' threads
+            show up too (each stack starts with its thread name).
+
+Profiles go to PROFILE_DIR as a ring buffer of PROFILE_MAX_FILES; the oldest
+is deleted when a new one is written. Admins list and download them through
+/api/admin/profiles.
+"""
+import cProfile
+import inspect
+import io
+import json
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "50"))
+PROFILE_SAMPLE_PERCENT = float(os.getenv("PROFILE_SAMPLE_PERCENT", "0"))   # 0 disables sampling
+PROFILE_DEFAULT_MODE = os.getenv("PROFILE_MODE", "cprofile")               # cprofile | sample
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+
+MODES = {"cprofile": "pstats", "sample": "folded"}
+PROFILE_ID_RE = re.compile(r"^[0-9]{8}-[0-9]{6}-[0-9a-f]{6}$")
+
+# Innermost frames that mean "this thread is parked, not working for anyone"
+_IDLE_FRAMES = {
+    ("threading.py", "wait"), ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"), ("queue.py", "get"), ("socketserver.py", "serve_forever"),
+    ("thread.py", "_worker"),  # concurrent.futures worker blocked on its (C) work queue
+}
+
+_current = ContextVar("profile_session", default=None)
+_ring_lock = threading.Lock()
+
+# Thread id -> the ProfileSession whose cProfile is enabled on it. Only one
+# profiler may run per thread; on the ASGI event loop that is one for the process.
+_profiled_threads = {}
+_threads_lock = threading.Lock()
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class ProfileSession:
+    def __init__(self, mode, meta):
+        self.mode = mode
+        self.meta = meta
+        self.started = time.perf_counter()
+        self._profilers = {}     # thread id -> [cProfile.Profile, depth]
+        self._stacks = Counter()  # collapsed stack -> samples
+        self._stop = threading.Event()
+        self._sampler = None
+
+    # --- cProfile: one profiler per thread that does work for this request ---
+    @contextmanager
+    def thread(self):
+        if self.mode != "cprofile" or not self._enter_thread():
+            yield
+            return
+        try:
+            yield
+        finally:
+            self._exit_thread()
+
+    def _enter_thread(self):
+        """Profile this thread for the session; False if another profiler already runs on it."""
+        thread_id = threading.get_ident()
+        with _threads_lock:
+            entry = self._profilers.get(thread_id)
+            if entry is None or entry[1] == 0:
+                # A shared thread (the ASGI event loop) may be busy with another request's
+                # profile: a second profiler would replace the first (3.11) or raise (3.12+)
+                if _profiled_threads.get(thread_id) is not None:
+                    self.meta["skipped_threads"] = self.meta.get("skipped_threads", 0) + 1
+                    return False
+                profiler = entry[0] if entry else cProfile.Profile()
+                try:
+                    profiler.enable()
+                except ValueError:
+                    # 3.12+: another profiler (sys.monitoring tool) is active in the process
+                    self.meta["skipped_threads"] = self.meta.get("skipped_threads", 0) + 1
+                    return False
+                entry = self._profilers.setdefault(thread_id, [profiler, 0])
+                _profiled_threads[thread_id] = self
+            entry[1] += 1
+            return True
+
+    def _exit_thread(self):
+        thread_id = threading.get_ident()
+        with _threads_lock:
+            entry = self._profilers[thread_id]
+            entry[1] -= 1
+            if entry[1] == 0:
+                entry[0].disable()
+                del _profiled_threads[thread_id]
+
+    def profiles_current_thread(self):
+        return _profiled_threads.get(threading.get_ident()) is self
+
+    # --- Stack sampling ---
+    def _sample_loop(self):
+        interval = PROFILE_SAMPLE_INTERVAL_MS / 1000
+        me = threading.get_ident()
+        names = {}
+        while not self._stop.wait(interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in _IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self._stacks[";".join(reversed(stack))] += 1
+
+    def start(self):
+        if self.mode == "sample":
+            self._sampler = threading.Thread(target=self._sample_loop, name="profile-sampler", daemon=True)
+            self._sampler.start()
+
+    def stop(self):
+        self.meta["duration_ms"] = round((time.perf_counter() - self.started) * 1000, 1)
+        if self._sampler:
+            self._stop.set()
+            self._sampler.join()
+
+    def write(self, directory=PROFILE_DIR):
+        os.makedirs(directory, exist_ok=True)
+        profile_id = self.meta["id"]
+        path = os.path.join(directory, f"{profile_id}.{MODES[self.mode]}")
+
+        if self.mode == "cprofile":
+            stats = None
+            for profiler, _ in self._profilers.values():
+                if stats is None:
+                    stats = pstats.Stats(profiler)
+                else:
+                    stats.add(profiler)
+            if stats is None:
+                return None
+            stats.dump_stats(path)
+            self.meta["threads"] = len(self._profilers)
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                for stack, count in self._stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            self.meta["samples"] = sum(self._stacks.values())
+
+        self.meta["file"] = os.path.basename(path)
+        with open(os.path.join(directory, f"{profile_id}.json"), "w", encoding="utf-8") as f:
+            json.dump(self.meta, f)
+        _trim_ring(directory)
+        return path
+
+
+def _trim_ring(directory):
+    # Oldest first thanks to the timestamped ids
+    with _ring_lock:
+        ids = sorted(name[:-5] for name in os.listdir(directory) if name.endswith(".json"))
+        for old in ids[:max(0, len(ids) - PROFILE_MAX_FILES)]:
+            for ext in ("json", "pstats", "folded"):
+                try:
+                    os.remove(os.path.join(directory, f"{old}.{ext}"))
+                except FileNotFoundError:
+                    pass
+
+
+def _new_id():
+    return time.strftime("%Y%m%d-%H%M%S") + "-" + f"{random.getrandbits(24):06x}"
+
+
+def requested_mode(value, is_admin):
+    """Mode asked for by header / parameter (admins only), else the random sample, else None."""
+    if value and is_admin and value.lower() not in ("0", "false", "off"):
+        return value.lower() if value.lower() in MODES else PROFILE_DEFAULT_MODE
+    if PROFILE_SAMPLE_PERCENT > 0 and random.random() * 100 < PROFILE_SAMPLE_PERCENT:
+        return PROFILE_DEFAULT_MODE
+    return None
+
+
+def start_session(mode, meta):
+    session = ProfileSession(mode, dict(meta, id=_new_id(), mode=mode, created=time.strftime("%Y-%m-%dT%H:%M:%S")))
+    session.start()
+    _current.set(session)
+    return session
+
+
+def profiled_node(node):
+    """Graph node wrapper: profile the thread the node runs on when its request is being profiled."""
+    if inspect.iscoroutinefunction(node):
+        @wraps(node)
+        async def async_wrapper(state):
+            session = _current.get()
+            if session is None:
+                return await node(state)
+            with session.thread():
+                return await node(state)
+        return async_wrapper
+
+    @wraps(node)
+    def wrapper(state):
+        session = _current.get()
+        if session is None:
+            return node(state)
+        with session.thread():
+            return node(state)
+    return wrapper
+
+
+# --- Reading the ring buffer (admin endpoints) ---
+def list_profiles(directory=PROFILE_DIR):
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        if name.endswith(".json"):
+            try:
+                with open(os.path.join(directory, name), encoding="utf-8") as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue  # Being written or trimmed right now
+    return profiles
+
+
+def profile_path(profile_id, directory=PROFILE_DIR):
+    """Path of a stored profile, or None (also for ids that aren't ours, e.g. path tricks)."""
+    if not PROFILE_ID_RE.match(profile_id or ""):
+        return None
+    for ext in MODES.values():
+        path = os.path.join(directory, f"{profile_id}.{ext}")
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def pstats_text(path, limit=60):
+    out = io.StringIO()
+    stats = pstats.Stats(path, stream=out)
+    stats.sort_stats("cumulative").print_stats(limit)
+    return out.getvalue()
+
+
+# --- Request wiring: Flask hooks below, and the native ASGI chatbot routes (app/asgi.py) ---
+SKIP_PATHS = ("/metrics", "/api/admin/profiles")
+
+
+def begin_request(value, role, method, path):
+    """Start profiling a request if asked for (or sampled); returns (session, thread context) or None."""
+    _current.set(None)  # Never inherit a finished profile from this thread's last request
+    mode = requested_mode(value, role == "admin")
+    if not mode:
+        return None
+    profile = start_session(mode, {
+        "method": method,
+        "path": path,
+        "role": role,
+        "trigger": "request" if value else "sample",
+    })
+    context = profile.thread()
+    context.__enter__()
+    if mode == "cprofile" and not profile.profiles_current_thread():
+        # This thread is the shared event loop and another request's profile owns it
+        context.__exit__(None, None, None)
+        _current.set(None)
+        profile.stop()
+        print(f"[PROFILE] Skipped {method} {path}: another cprofile request is running on this thread")
+        return None
+    return profile, context
+
+
+def end_request(profiled, status):
+    """Stop and store a profile from begin_request, once the response body has been sent."""
+    profile, context = profiled
+    context.__exit__(None, None, None)
+    _current.set(None)
+    profile.stop()
+    profile.meta["status"] = status
+    try:
+        profile.write()
+    except OSError as e:
+        print(f"[PROFILE ERROR] {e}")
+
+
+def init_profiling(app):
+    from flask import request, session
+
+    @app.before_request
+    def profile_start():
+        if request.method == "OPTIONS" or request.path.startswith(SKIP_PATHS):
+            _current.set(None)
+            return
+        value = request.headers.get("X-Profile") or request.args.get("profile")
+        profiled = begin_request(value, session.get("role"), request.method, request.path)
+        if profiled:
+            request.environ["profile.session"] = profiled
+
+    @app.after_request
+    def profile_finish(response):
+        if "profile.session" not in request.environ:
+            return response
+        profiled = request.environ.pop("profile.session")
+        response.headers["X-Profile-Id"] = profiled[0].meta["id"]
+        # On close, so streamed (SSE) bodies - and the graph run inside them - are included
+        response.call_on_close(lambda: end_request(profiled, response.status_code))
+        return response
@@ -0,0 +1,77 @@
+"""
+Write-behind queue: callers hand over items and return immediately; one
+background thread collects them into batches (up to `batch_size` items, or
+whatever arrived within `max_delay_ms` of the first one) and passes each
+batch to `flush`.
+
+Items are flushed in the order they were put, so a later item can rely on an
+earlier one being written first. With `enabled=False` every put() flushes
+inline, the old synchronous behaviour (handy when debugging).
+
+Anything still queued when the process exits is flushed by an atexit hook;
+a hard kill loses at most the items that hadn't been flushed yet.
+"""
+import atexit
+import queue
+import threading
+import time
+
+
+class WriteBehindQueue:
+    def __init__(self, name, flush, batch_size=50, max_delay_ms=50, enabled=True):
+        self.name = name
+        self._flush = flush
+        self.batch_size = batch_size
+        self.max_delay = max_delay_ms / 1000
+        self.enabled = enabled
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.stats = {"items": 0, "batches": 0, "errors": 0}
+        atexit.register(self.drain)
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def put(self, item):
+        if not self.enabled:
+            self._write([item])
+            return
+        self._start()
+        self._queue.put(item)
+
+    def depth(self):
+        return self._queue.qsize()
+
+    def drain(self):
+        """Block until everything put so far has been flushed."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def _write(self, batch):
+        try:
+            self._flush(batch)
+            self.stats["batches"] += 1
+            self.stats["items"] += len(batch)
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"[WRITE-BEHIND ERROR] {self.name}: {e}")
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write(batch)
+            for _ in batch:
+                self._queue.task_done()
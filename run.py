@@ -2,5 +2,7 @@ from app import create_app
 
 app = create_app()
 
+# WSGI mode. For the ASGI serving mode (concurrent chatbot requests on one
+# event loop) run: uvicorn asgi:app  — see app/asgi.py
 if __name__ == "__main__":
     app.run(debug=True)
@@ -0,0 +1,288 @@
+"""
+Offline load test for the REST and chatbot endpoints.
+
+Generates a throwaway SQLite database, starts the app with create_app() on an
+offline LLM backend (LLM_BACKEND=stub by default, with injected latency and
+errors; see app/utils/llm_backends.py), and drives each endpoint with N concurrent clients
+(one Flask test client per thread). For every endpoint it reports req/s,
+p50/p95/p99 latency, error count and SQL statements per request (counted
+with a before_cursor_execute listener on both engines).
+
+Results are written as JSON; pass --compare with an earlier file to print
+the change per endpoint.
+
+Usage:
+    python scripts/bench_api.py [--clients 8] [--requests 200] [--llm-latency normal:150,30]
+                                [--employees 200] [--days 60] [--only chat]
+                                [--out bench.json] [--compare old.json]
+"""
+import argparse
+import contextvars
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+TEAMS = ["Software", "Support", "Sales", "Finance"]
+
+# (name, role, method, path, json body or None, streamed response)
+SCENARIOS = [
+    ("admin users", "admin", "GET", "/api/admin/users?limit=50", None, False),
+    ("team members", "manager", "GET", "/api/manager/team-members?limit=50", None, False),
+    ("team compliance", "manager", "GET", "/api/manager/team-compliance", None, False),
+    ("employee tasks", "employee", "GET", "/api/employee/tasks", None, False),
+    ("employee daily updates", "employee", "GET", "/api/employee/daily-updates", None, False),
+    ("chat other", "employee", "POST", "/api/employee/chatbot", {"message": "Hi, what can you help me with?"}, False),
+    ("chat retrieve update", "manager", "POST", "/api/manager/chatbot",
+     {"message": "Show me Emp No1's update for yesterday"}, False),
+    ("chat stream", "employee", "POST", "/api/employee/chatbot/stream", {"message": "Hello there"}, True),
+]
+
+
+# --- Data -----------------------------------------------------------------------
+def generate_database(employees, days, tasks_per_employee):
+    """Bulk-insert users, tasks and daily updates; returns {role: session dict} for the benchmark clients."""
+    from sqlalchemy import insert
+    from app.database import SessionLocal
+    from app.models import User, Task, DailyUpdate
+
+    db = SessionLocal()
+    people = []
+    for role in ("admin", "manager"):
+        people.append(dict(f_name=role.title(), l_name="User", full_name=f"{role.title()} User",
+                           email=f"{role}@example.com", pword="x", role=role, team=TEAMS[0], status="active"))
+    for i in range(employees):
+        people.append(dict(f_name="Emp", l_name=f"No{i}", full_name=f"Emp No{i}", email=f"emp{i}@example.com",
+                           pword="x", role="employee", team=TEAMS[i % len(TEAMS)],
+                           status="active" if i % 10 else "inactive"))
+    db.execute(insert(User), people)
+    db.commit()
+
+    ids = dict(db.query(User.full_name, User.id).all())
+    manager_id = ids["Manager User"]
+    today = date.today()
+
+    tasks, updates = [], []
+    for i in range(employees):
+        user_id = ids[f"Emp No{i}"]
+        for t in range(tasks_per_employee):
+            tasks.append(dict(title=f"Task {i}-{t}", description="generated", assigned_date=today - timedelta(days=t),
+                              due_date=today + timedelta(days=t - tasks_per_employee // 2),
+                              status=random.choice(["open", "in_progress", "completed"]),
+                              assigned_to_id=user_id, assigned_by_id=manager_id))
+        for d in range(days):
+            if random.random() < 0.8:  # Some missing days for the compliance report
+                updates.append(dict(user_id=user_id, date=today - timedelta(days=d), title=f"Update {d}",
+                                    work_done="generated work"))
+    db.execute(insert(Task), tasks)
+    db.execute(insert(DailyUpdate), updates)
+    db.commit()
+    SessionLocal.remove()
+    print(f"🗃️ Generated {len(people)} users, {len(tasks)} tasks, {len(updates)} daily updates")
+
+    employee_id = ids["Emp No1"]
+    return {
+        "admin": {"user_id": ids["Admin User"], "role": "admin", "team": TEAMS[0], "full_name": "Admin User"},
+        "manager": {"user_id": manager_id, "role": "manager", "team": TEAMS[0], "full_name": "Manager User"},
+        "employee": {"user_id": employee_id, "role": "employee", "team": TEAMS[1], "full_name": "Emp No1"},
+    }
+
+
+# --- Measurement ----------------------------------------------------------------
+current_scenario = contextvars.ContextVar("current_scenario", default=None)
+query_counts = {}
+query_lock = threading.Lock()
+
+
+def count_query(*args, **kwargs):
+    # The ContextVar follows the request into the graph's async tasks and worker threads
+    name = current_scenario.get()
+    if name:
+        with query_lock:
+            query_counts[name] = query_counts.get(name, 0) + 1
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def run_scenario(app, sessions, scenario, clients, total):
+    name, role, method, path, body, streamed = scenario
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    remaining = [total]
+
+    def worker():
+        nonlocal errors
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess.update(sessions[role])
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            token = current_scenario.set(name)
+            started = time.perf_counter()
+            try:
+                response = client.open(path, method=method, json=body, buffered=streamed)
+                response.get_data()  # Drain streamed bodies too
+                ok = response.status_code < 400
+            except Exception as e:
+                print(f"[BENCH ERROR] {name}: {e}")
+                ok = False
+            finally:
+                current_scenario.reset(token)
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                if not ok:
+                    errors += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        for future in [pool.submit(worker) for _ in range(clients)]:
+            future.result()
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    ms = lambda seconds: round(seconds * 1000, 2) if seconds is not None else None
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "req_per_s": round(len(latencies) / wall, 2) if wall else None,
+        "mean_ms": ms(statistics.mean(latencies)) if latencies else None,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "queries_per_request": round(query_counts.get(name, 0) / len(latencies), 2) if latencies else None,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except Exception:
+        return None
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline_path} (commit {baseline.get('commit')}):")
+    for name, now in results["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(name)
+        if not before:
+            print(f"  {name:24} (new)")
+            continue
+        parts = []
+        for key in ("req_per_s", "p95_ms", "queries_per_request"):
+            if before.get(key) and now.get(key) is not None:
+                parts.append(f"{key} {before[key]} → {now[key]} ({(now[key] - before[key]) / before[key] * 100:+.1f}%)")
+        print(f"  {name:24} " + ", ".join(parts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Flask API and agent graph offline")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent clients per endpoint")
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint")
+    parser.add_argument("--llm-backend", default="stub", help="stub | replay | gemini")
+    parser.add_argument("--llm-latency", default="normal:150,30", help="LLM_LATENCY spec, e.g. lognormal:200,0.5")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--llm-cache", action="store_true", help="keep the LLM response cache on")
+    parser.add_argument("--response-cache", action="store_true", help="keep the ETag response body cache on")
+    parser.add_argument("--employees", type=int, default=200)
+    parser.add_argument("--days", type=int, default=60, help="days of daily updates per employee")
+    parser.add_argument("--tasks", type=int, default=10, help="tasks per employee")
+    parser.add_argument("--only", help="comma-separated substrings; run matching endpoints only")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="results file (default: bench-<commit>.json in the current directory)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    out = os.path.abspath(args.out or f"bench-{git_commit() or 'local'}.json")
+    baseline = os.path.abspath(args.compare) if args.compare else None
+    random.seed(args.seed)
+
+    # Settings read at import time: fresh DB in a temp dir, caches off unless asked for
+    workdir = tempfile.mkdtemp(prefix="rise_bench_")
+    os.chdir(workdir)
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ.pop("READ_DATABASE_URL", None)
+    os.environ["LLM_BACKEND"] = args.llm_backend
+    os.environ["LLM_LATENCY"] = args.llm_latency
+    os.environ["LLM_ERROR_RATE"] = str(args.llm_error_rate)
+    os.environ["LLM_SEED"] = str(args.seed)
+    os.environ["LLM_CACHE_ENABLED"] = "1" if args.llm_cache else "0"
+    os.environ["LLM_CACHE_DB"] = ""
+    os.environ["RESPONSE_CACHE_SIZE"] = os.getenv("RESPONSE_CACHE_SIZE", "256") if args.response_cache else "0"
+
+    import builtins
+    from sqlalchemy import event
+    from app import create_app
+    from app.utils.llm import get_llm_stats
+    from app.database import engine, read_engine
+
+    from app.agents.loader import get_agents
+
+    app = create_app()
+    get_agents()  # Load the graphs up front so the first chat scenario doesn't pay for it (see bench_startup.py)
+    sessions = generate_database(args.employees, args.days, args.tasks)
+    for counted in {engine, read_engine}:
+        event.listen(counted, "before_cursor_execute", count_query)
+
+    scenarios = SCENARIOS
+    if args.only:
+        wanted = [w.strip() for w in args.only.split(",") if w.strip()]
+        scenarios = [s for s in SCENARIOS if any(w in s[0] for w in wanted)]
+
+    # The app logs every chat turn with print(); silence it while measuring
+    real_print = builtins.print
+    results = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "settings": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        "endpoints": {},
+    }
+    for scenario in scenarios:
+        real_print(f"▶️ {scenario[0]} ({scenario[2]} {scenario[3]})")
+        calls_before = get_llm_stats()["calls"]
+        builtins.print = lambda *a, **k: None
+        try:
+            result = run_scenario(app, sessions, scenario, args.clients, args.requests)
+        finally:
+            builtins.print = real_print
+        result["llm_calls_per_request"] = round((get_llm_stats()["calls"] - calls_before) / result["requests"], 2) if result["requests"] else None
+        results["endpoints"][scenario[0]] = result
+
+    print(f"\n{'endpoint':24} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'SQL/req':>8} {'LLM/req':>8} {'errors':>7}")
+    for name, r in results["endpoints"].items():
+        print(f"{name:24} {r['req_per_s']:>8} {r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8} "
+              f"{r['queries_per_request']:>8} {r['llm_calls_per_request']:>8} {r['errors']:>7}")
+
+    with open(out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n💾 Results saved to {out}")
+
+    if baseline:
+        compare(results, baseline)
+
+
+if __name__ == "__main__":
+    main()
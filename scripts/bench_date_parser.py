@@ -0,0 +1,84 @@
+"""
+Benchmark the local date-expression parser (app/utils/date.py) against the LLM path.
+
+Reads phrases as JSON lines: {"text": ..., "today": "YYYY-MM-DD", "prefer": "future"|"past",
+"expected": "YYYY-MM-DD" or null} and reports accuracy plus throughput. Phrases are scored
+with unambiguous_date, the call the tools make; null means the LLM should decide. The LLM side is
+either measured live with the assign_task extraction prompt (--live, needs GOOGLE_API_KEY)
+or credited at --llm-latency-ms per call.
+
+Usage:
+    python scripts/bench_date_parser.py [phrases.jsonl] [--rounds 2000] [--llm-latency-ms 900] [--live 5]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.date import unambiguous_date
+
+DEFAULT_PHRASES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "date_phrases.jsonl")
+
+
+def measure_llm(records, samples):
+    # Real Gemini round-trips with the same prompt assign_task used before the local parser
+    from app.utils.llm import llm_call
+    from app.agents.tools.assign_task import _extraction_prompt
+
+    timings = []
+    for rec in records[:samples]:
+        start = time.perf_counter()
+        llm_call(_extraction_prompt(rec["text"], rec["today"]), cache=False)
+        timings.append(time.perf_counter() - start)
+    return sum(timings) / len(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the local date parser")
+    parser.add_argument("phrases", nargs="?", default=DEFAULT_PHRASES)
+    parser.add_argument("--rounds", type=int, default=2000, help="Passes over the phrase list for timing")
+    parser.add_argument("--llm-latency-ms", type=float, default=900.0,
+                        help="Assumed Gemini extraction latency when not measuring live")
+    parser.add_argument("--live", type=int, default=0, metavar="N",
+                        help="Measure N real LLM calls instead of assuming --llm-latency-ms")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print every wrong answer")
+    args = parser.parse_args()
+
+    with open(args.phrases) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    for rec in records:
+        rec["today"] = date.fromisoformat(rec["today"])
+
+    correct = 0
+    for rec in records:
+        got = unambiguous_date(rec["text"], rec["today"], rec["prefer"])
+        got = got.isoformat() if got else None
+        if got == rec["expected"]:
+            correct += 1
+        elif args.verbose:
+            print(f"  MISS {rec['text']!r}: got {got}, expected {rec['expected']}")
+
+    start = time.perf_counter()
+    for _ in range(args.rounds):
+        for rec in records:
+            unambiguous_date(rec["text"], rec["today"], rec["prefer"])
+    elapsed = time.perf_counter() - start
+    parses = args.rounds * len(records)
+
+    llm_ms = measure_llm(records, args.live) if args.live else args.llm_latency_ms
+    local_us = elapsed / parses * 1e6
+
+    print(f"Phrases:              {len(records)}")
+    print(f"Local accuracy:       {correct}/{len(records)} ({correct / max(len(records), 1):.0%})")
+    print(f"Local parser:         {local_us:.1f} us/parse, {parses / elapsed:,.0f} parses/s")
+    print(f"LLM path:             {llm_ms:.0f} ms/call ({'measured' if args.live else 'assumed'}), "
+          f"{1000 / llm_ms:.2f} calls/s per worker")
+    print(f"Speed-up:             {llm_ms * 1000 / local_us:,.0f}x")
+
+
+if __name__ == "__main__":
+    main()
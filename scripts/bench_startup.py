@@ -0,0 +1,193 @@
+"""
+Cold-start benchmark: how long a worker takes to boot, and to get the agent
+graphs ready for the first chat.
+
+Each phase runs in a fresh interpreter under `python -X importtime`, several
+times (after one untimed run that writes the .pyc files). For each phase it
+reports the median wall time and the median import time, plus the slowest
+packages and modules from the importtime output, so a new heavy import shows
+up by name. It also flags a boot that already compiled the agent graphs,
+which should only happen on the first chat.
+
+Phases
+  boot        from app import create_app; create_app()   (what a worker does before serving /api/login)
+  first chat  boot + loading and compiling the agent graphs (the first chatbot request)
+
+Results are written as JSON; pass --compare with an earlier file to print
+the change per phase.
+
+Usage:
+    python scripts/bench_startup.py [--runs 5] [--top 15] [--llm-backend stub]
+                                    [--out startup.json] [--compare old.json]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BOOT = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+started = time.perf_counter()
+from app import create_app
+create_app()
+timings = {{"wall": time.perf_counter() - started}}
+from app.agents.loader import agents_loaded
+timings["agents_loaded_at_boot"] = agents_loaded()
+"""
+
+PHASES = {
+    "boot": BOOT + """
+print(json.dumps(timings))
+""",
+    "first chat": BOOT + """
+from app.agents.loader import get_agents
+loading = time.perf_counter()
+get_agents()
+timings["agents"] = time.perf_counter() - loading
+timings["wall"] = time.perf_counter() - started
+print(json.dumps(timings))
+""",
+}
+
+
+def parse_importtime(stderr):
+    """[(name, self_us, cumulative_us)] from `python -X importtime` output."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        head, cumulative_us, name = line.split("|", 2)
+        self_us = head.split(":", 1)[1]
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+def run_phase(code, env):
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            env=env, capture_output=True, text=True, cwd=env["BENCH_WORKDIR"])
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    return timings, parse_importtime(result.stderr)
+
+
+def summarize(runs, top):
+    walls = [timings["wall"] for timings, _ in runs]
+    imports = [sum(m[1] for m in modules) for _, modules in runs]
+
+    # Self time per module / top-level package, median across runs
+    per_module, per_package = {}, {}
+    for _, modules in runs:
+        packages = {}
+        for name, self_us, _ in modules:
+            per_module.setdefault(name, []).append(self_us)
+            package = name.split(".")[0]
+            packages[package] = packages.get(package, 0) + self_us
+        for package, total in packages.items():
+            per_package.setdefault(package, []).append(total)
+
+    ms = lambda us: round(us / 1000, 1)
+    result = {
+        "wall_ms": round(statistics.median(walls) * 1000, 1),
+        "import_ms": ms(statistics.median(imports)),
+        "modules_imported": len(runs[0][1]),
+        "top_packages": [(name, ms(statistics.median(values)))
+                         for name, values in sorted(per_package.items(), key=lambda kv: -statistics.median(kv[1]))[:top]],
+        "top_modules": [(name, ms(statistics.median(values)))
+                        for name, values in sorted(per_module.items(), key=lambda kv: -statistics.median(kv[1]))[:top]],
+    }
+    # Boot should leave the graphs for the first chat (app/agents/loader.py)
+    result["agents_loaded_at_boot"] = any(t["agents_loaded_at_boot"] for t, _ in runs)
+    if "agents" in runs[0][0]:
+        result["agents_ms"] = round(statistics.median(t["agents"] for t, _ in runs) * 1000, 1)
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except Exception:
+        return None
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline_path} (commit {baseline.get('commit')}):")
+    for name, now in results["phases"].items():
+        before = baseline.get("phases", {}).get(name)
+        if not before:
+            print(f"  {name:12} (new)")
+            continue
+        parts = []
+        for key in ("wall_ms", "import_ms", "modules_imported"):
+            if before.get(key) and now.get(key) is not None:
+                parts.append(f"{key} {before[key]} → {now[key]} ({(now[key] - before[key]) / before[key] * 100:+.1f}%)")
+        print(f"  {name:12} " + ", ".join(parts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure worker boot and agent graph load time")
+    parser.add_argument("--runs", type=int, default=5, help="timed runs per phase (median is reported)")
+    parser.add_argument("--top", type=int, default=15, help="slowest packages / modules to list")
+    parser.add_argument("--llm-backend", default="stub", help="stub | replay | gemini")
+    parser.add_argument("--only", help="run one phase: boot | first chat")
+    parser.add_argument("--out", help="results file (default: startup-<commit>.json in the current directory)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    out = os.path.abspath(args.out or f"startup-{git_commit() or 'local'}.json")
+    workdir = tempfile.mkdtemp(prefix="rise_startup_")
+    env = dict(os.environ,
+               BENCH_WORKDIR=workdir,
+               DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'startup.db')}",
+               LLM_BACKEND=args.llm_backend,
+               AGENT_WARMUP="0")
+    for name in ("READ_DATABASE_URL", "PYTHONDONTWRITEBYTECODE", "PYTHONPROFILEIMPORTTIME"):
+        env.pop(name, None)
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "settings": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        "phases": {},
+    }
+    phases = {name: code for name, code in PHASES.items() if not args.only or name == args.only}
+    for name, code in phases.items():
+        code = code.format(root=ROOT)
+        print(f"▶️ {name}")
+        run_phase(code, env)  # Untimed: writes .pyc files and creates the database
+        runs = [run_phase(code, env) for _ in range(args.runs)]
+        results["phases"][name] = summarize(runs, args.top)
+
+    for name, r in results["phases"].items():
+        agents = f", agent graphs {r['agents_ms']} ms" if "agents_ms" in r else ""
+        print(f"\n{name}: {r['wall_ms']} ms wall, {r['import_ms']} ms importing {r['modules_imported']} modules{agents}")
+        if r["agents_loaded_at_boot"]:
+            print("  ⚠️ create_app() loaded the agent graphs; something imports app.agents.graph at boot")
+        print(f"  {'package':32} {'ms':>8}")
+        for package, value in r["top_packages"]:
+            print(f"  {package:32} {value:>8}")
+        print(f"  {'module':48} {'self ms':>8}")
+        for module, value in r["top_modules"]:
+            print(f"  {module:48} {value:>8}")
+
+    with open(out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n💾 Results saved to {out}")
+
+    if args.compare:
+        compare(results, os.path.abspath(args.compare))
+
+
+if __name__ == "__main__":
+    main()
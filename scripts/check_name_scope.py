@@ -0,0 +1,82 @@
+"""
+Check that a manager's employee names only resolve within their own team.
+
+Seeds a throwaway SQLite database with two teams that each have a "Sam Wil(l)son"
+and resolves names the way the agent tools do (app/agents/tools/extract_info.py),
+as the HR manager, the Software manager and an admin. Exits non-zero if a manager
+ever gets someone from another team.
+
+Usage:
+    python scripts/check_name_scope.py
+
+Also run by scripts/run_checks.py with the other regression checks.
+"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PEOPLE = [
+    # full name, role, team
+    ("Sam Wilson", "employee", "Software"),
+    ("Sam Willson", "employee", "HR"),
+    ("Dana Software", "manager", "Software"),
+    ("Dana HR", "manager", "HR"),
+    ("Ada Admin", "admin", None),
+]
+
+# (who asks, message, name the LLM extracted, expected full name; None = nobody found)
+CASES = [
+    ("Dana HR", "assign Sam Wilson the payroll review by Friday", "Sam Wilson", "Sam Willson"),
+    ("Dana HR", "what did sam wilsn do yesterday", "Sam Wilsn", "Sam Willson"),
+    ("Dana Software", "assign Sam Willson the API docs by Friday", "Sam Willson", "Sam Wilson"),
+    ("Dana Software", "show sam willsn's update", "Sam Willsn", "Sam Wilson"),
+    ("Ada Admin", "Sam Willson", "Sam Willson", "Sam Willson"),
+]
+
+
+def main():
+    # The app opens employee_task4.db relative to the working directory
+    os.chdir(tempfile.mkdtemp(prefix="rise_name_scope_"))
+    os.environ.setdefault("GOOGLE_API_KEY", "unused")
+
+    from langchain_core.messages import HumanMessage
+    from app import create_app
+    from app.database import SessionLocal
+    from app.models import User
+    from app.agents.tools.extract_info import extract_info, resolve_employee_name
+
+    create_app()
+    db = SessionLocal()
+    users = {}
+    for i, (full_name, role, team) in enumerate(PEOPLE):
+        first, last = full_name.split(" ", 1)
+        users[full_name] = User(f_name=first, l_name=last, full_name=full_name, email=f"user{i}@example.com",
+                                pword="x", role=role, team=team, status="active")
+        db.add(users[full_name])
+    db.commit()
+    sessions = {name: {"id": u.id, "full_name": u.full_name, "role": u.role, "team": u.team}
+                for name, u in users.items()}
+    db.close()
+
+    failed = 0
+    for who, message, extracted, expected in CASES:
+        state = {"messages": [HumanMessage(content=message)], "session_user": sessions[who]}
+        state.update(extract_info(state))
+        found = {
+            "extracted": resolve_employee_name(state, extracted),
+            "in message": (state["target_employee"] or {}).get("full_name"),
+        }
+        for source, got in found.items():
+            # Not spotting anyone in the message is fine: the extracted name decides then
+            ok = got == expected or (source == "in message" and got is None)
+            failed += not ok
+            print(f"{'OK  ' if ok else 'FAIL'} {who:14} {source:10} {message!r}: {got} (expected {expected})")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
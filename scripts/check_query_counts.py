@@ -0,0 +1,111 @@
+"""
+Check that list endpoints issue a constant number of SQL queries as data grows.
+
+Seeds a throwaway SQLite database, calls each endpoint at two data sizes and
+compares the number of statements executed (counted with a SQLAlchemy
+before_cursor_execute listener). Exits non-zero if any count grows.
+
+Usage:
+    python scripts/check_query_counts.py [--small 5] [--large 200]
+
+Also run by scripts/run_checks.py with the other regression checks.
+"""
+import argparse
+import os
+import sys
+import tempfile
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+ENDPOINTS = [
+    ("admin", "/api/admin/users"),
+    ("manager", "/api/manager/team-members"),
+    ("employee", "/api/employee/tasks"),
+    ("employee", "/api/employee/daily-updates"),
+]
+
+
+def seed(db, models, employee_id, manager_ids, start, count):
+    User, Task, DailyUpdate = models
+    for i in range(start, start + count):
+        db.add(User(f_name="Emp", l_name=f"No{i}", full_name=f"Emp No{i}", email=f"emp{i}@example.com",
+                    pword="x", role="employee", team="Software", status="active"))
+        task = Task(title=f"Task {i}", description="seeded", assigned_date=date(2025, 1, 1),
+                    due_date=date(2025, 1, 1) + timedelta(days=i), status="open",
+                    assigned_to_id=employee_id, assigned_by_id=manager_ids[i % len(manager_ids)])
+        db.add(task)
+        db.flush()
+        db.add(DailyUpdate(user_id=employee_id, date=date(2024, 1, 1) + timedelta(days=i),
+                           title=f"Update {i}", work_done="seeded", task_id=task.id))
+    db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check per-endpoint query counts stay constant")
+    parser.add_argument("--small", type=int, default=5)
+    parser.add_argument("--large", type=int, default=200)
+    args = parser.parse_args()
+
+    # The app opens employee_task4.db relative to the working directory
+    os.chdir(tempfile.mkdtemp(prefix="rise_query_counts_"))
+    os.environ.setdefault("GOOGLE_API_KEY", "unused")
+    os.environ["RESPONSE_CACHE_SIZE"] = "0"  # Measure the queries, not the ETag body cache
+
+    from sqlalchemy import event
+    from app import create_app
+    from app.database import SessionLocal, engine, read_engine
+    from app.models import User, Task, DailyUpdate
+
+    app = create_app()
+    db = SessionLocal()
+    people = {}
+    for role in ("admin", "manager", "employee"):
+        people[role] = User(f_name=role.title(), l_name="User", full_name=f"{role.title()} User",
+                            email=f"{role}@example.com", pword="x", role=role, team="Software", status="active")
+        db.add(people[role])
+    managers = [people["manager"]] + [
+        User(f_name="Boss", l_name=f"No{i}", full_name=f"Boss No{i}", email=f"boss{i}@example.com",
+             pword="x", role="manager", team="Software", status="active") for i in range(3)
+    ]
+    db.add_all(managers[1:])
+    db.commit()
+    # Plain ids: each request's teardown removes the thread's session and detaches these objects
+    ids = {role: user.id for role, user in people.items()}
+    manager_ids = [m.id for m in managers]
+
+    statements = []
+    for counted in {engine, read_engine}:
+        event.listen(counted, "before_cursor_execute", lambda *a, **k: statements.append(a[2]))
+
+    def counts():
+        result = {}
+        for role, path in ENDPOINTS:
+            client = app.test_client()
+            with client.session_transaction() as sess:
+                sess.update({"user_id": ids[role], "role": role, "team": "Software"})
+            statements.clear()
+            response = client.get(path)
+            assert response.status_code == 200, (path, response.status_code, response.get_data(as_text=True))
+            result[path] = len(statements)
+        return result
+
+    models = (User, Task, DailyUpdate)
+    seed(SessionLocal(), models, ids["employee"], manager_ids, 0, args.small)
+    small = counts()
+    seed(SessionLocal(), models, ids["employee"], manager_ids, args.small, args.large - args.small)
+    large = counts()
+    SessionLocal.remove()
+
+    failed = False
+    for _, path in ENDPOINTS:
+        ok = small[path] == large[path]
+        failed |= not ok
+        print(f"{'OK  ' if ok else 'FAIL'} {path:32} {small[path]:3} queries @ {args.small} rows, "
+              f"{large[path]:3} @ {args.large} rows")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Offline evaluation of the local intent fast path (app/agents/fast_classifier.py).
+
+Reads recorded queries as JSON lines: {"role": ..., "message": ..., "expected": ...}
+and reports how many would skip the Gemini call, how accurate those skips are,
+and the latency saved. Exits non-zero if the fast path would send a query to a
+write tool (create_user / assign_task / submit_update) it didn't ask for.
+
+Usage:
+    python scripts/eval_intent_classifier.py [queries.jsonl] [--llm-latency-ms 900] [--threshold 0.85]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.agents.fast_classifier import fast_classify, FAST_PATH_THRESHOLD, ROLE_TOOL_MAP, WRITE_TOOLS
+
+DEFAULT_QUERIES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "intent_queries.jsonl")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the local intent classifier")
+    parser.add_argument("queries", nargs="?", default=DEFAULT_QUERIES)
+    parser.add_argument("--llm-latency-ms", type=float, default=900.0,
+                        help="Average Gemini classification latency to credit per skipped call")
+    parser.add_argument("--threshold", type=float, default=FAST_PATH_THRESHOLD)
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print every misclassification")
+    args = parser.parse_args()
+
+    with open(args.queries) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+
+    fast_hits = fast_correct = wrong_writes = 0
+    local_time = 0.0
+    for rec in records:
+        tools = ROLE_TOOL_MAP.get(rec["role"], ["other"])
+        start = time.perf_counter()
+        tool, confidence = fast_classify(rec["message"], tools)
+        local_time += time.perf_counter() - start
+
+        if tool and confidence >= args.threshold:
+            fast_hits += 1
+            if tool == rec["expected"]:
+                fast_correct += 1
+                continue
+            if tool in WRITE_TOOLS:
+                wrong_writes += 1  # Would have created / assigned / submitted something unasked
+            if args.verbose:
+                print(f"  MISS [{rec['role']}] {rec['message']!r}: got {tool} ({confidence:.2f}), expected {rec['expected']}")
+
+    total = len(records)
+    saved_ms = fast_hits * args.llm_latency_ms
+    print(f"Queries:              {total}")
+    print(f"Threshold:            {args.threshold}")
+    print(f"Fast-path coverage:   {fast_hits}/{total} ({fast_hits / max(total, 1):.0%})")
+    print(f"Fast-path accuracy:   {fast_correct}/{fast_hits} ({fast_correct / max(fast_hits, 1):.0%})")
+    print(f"Local classify time:  {local_time * 1000 / max(total, 1):.3f} ms/query")
+    print(f"LLM latency saved:    {saved_ms / 1000:.1f} s total, {saved_ms / max(total, 1):.0f} ms/query avg")
+    print(f"Wrong write-tool hits: {wrong_writes}")
+    sys.exit(1 if wrong_writes else 0)
+
+
+if __name__ == "__main__":
+    main()
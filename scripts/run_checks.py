@@ -0,0 +1,83 @@
+"""
+Regression checks to run before pushing: exits non-zero if any of them fails.
+
+Each check runs in a fresh interpreter against its own throwaway database and
+the offline stub LLM, so nothing here needs a Gemini key or the real data.
+
+  query counts    scripts/check_query_counts.py - list endpoints don't grow N+1 queries
+  intent safety   scripts/eval_intent_classifier.py - the fast path never routes
+                  a question to a write tool
+  lazy boot       create_app() doesn't import the agent graphs (app/agents/loader.py)
+  name scope      scripts/check_name_scope.py - a manager's employee names resolve
+                  within their own team only
+
+Usage:
+    python scripts/run_checks.py [--only "query counts"] [-v]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = os.path.join(ROOT, "scripts")
+
+LAZY_BOOT = f"""
+import sys
+sys.path.insert(0, {ROOT!r})
+from app import create_app
+create_app()
+loaded = [m for m in ("app.agents.graph", "langgraph", "langchain_core") if m in sys.modules]
+print("loaded at boot:", loaded or "nothing")
+sys.exit(1 if loaded else 0)
+"""
+
+# (name, command)
+CHECKS = [
+    ("query counts", [sys.executable, os.path.join(SCRIPTS, "check_query_counts.py")]),
+    ("intent safety", [sys.executable, os.path.join(SCRIPTS, "eval_intent_classifier.py"), "-v"]),
+    ("lazy boot", [sys.executable, "-c", LAZY_BOOT]),
+    ("name scope", [sys.executable, os.path.join(SCRIPTS, "check_name_scope.py")]),
+]
+
+
+def run_check(name, command, verbose):
+    workdir = tempfile.mkdtemp(prefix="rise_check_")
+    env = dict(os.environ,
+               DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'check.db')}",
+               LLM_BACKEND="stub",
+               AGENT_WARMUP="0")
+    env.pop("READ_DATABASE_URL", None)
+
+    started = time.perf_counter()
+    result = subprocess.run(command, env=env, cwd=workdir, capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+
+    ok = result.returncode == 0
+    print(f"{'OK  ' if ok else 'FAIL'} {name:16} ({elapsed:.1f}s)")
+    if verbose or not ok:
+        for line in (result.stdout + result.stderr).strip().splitlines()[-30:]:
+            print(f"     {line}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the repo's regression checks")
+    parser.add_argument("--only", help="comma-separated check names")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print each check's output")
+    args = parser.parse_args()
+
+    checks = CHECKS
+    if args.only:
+        wanted = [w.strip() for w in args.only.split(",")]
+        checks = [c for c in CHECKS if c[0] in wanted]
+
+    failed = [name for name, command in checks if not run_check(name, command, args.verbose)]
+    print(f"\n{len(checks) - len(failed)}/{len(checks)} checks passed" + (f"; failed: {', '.join(failed)}" if failed else ""))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()